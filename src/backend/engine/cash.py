@@ -1,33 +1,263 @@
-from PyQt5.QtCore import QMutex
+import enum
+import random
+
 from bitarray import bitarray
 
+from src.backend.engine.trace import AccessTrace, AccessKind
 from src.backend.model.memory import Memory
-from src.backend.utils.exceptions import CashWrongBlockException, CashUnblockException
+from src.backend.utils.exceptions import CashWrongBlockException, CashUnblockException, CashWrongConfiguration
+from src.backend.utils.statistics import CashStatistics
+
+
+class ReplacementPolicy(enum.Enum):
+    LRU = enum.auto()
+    PLRU = enum.auto()
+    FIFO = enum.auto()
+    RANDOM = enum.auto()
+    LFU = enum.auto()
+
+
+class WritePolicy(enum.Enum):
+    # Stores allocate lines and mark them modified; modified lines are written back when ejected
+    WRITE_BACK = enum.auto()
+    # Every store is a bus write; store misses do not allocate
+    WRITE_THROUGH = enum.auto()
+
+
+class CashConfig:
+    def __init__(self, sets: int = 64, ways: int = 2, line_size: int = 8,
+                 replacement: ReplacementPolicy = ReplacementPolicy.LRU,
+                 write: WritePolicy = WritePolicy.WRITE_BACK, seed: int = 0):
+        if not CashConfig._power_of_two(sets) or not CashConfig._power_of_two(line_size) or line_size < 2 \
+                or ways < 1 or sets * line_size > Memory.SIZE:
+            raise CashWrongConfiguration(what="sets and line size must be powers of two fitting into memory, "
+                                              "line size at least a word and ways positive")
+        if replacement is ReplacementPolicy.PLRU and not CashConfig._power_of_two(ways):
+            raise CashWrongConfiguration(what="tree PLRU requires a power of two number of ways")
+
+        self._sets = sets
+        self._ways = ways
+        self._line_size = line_size
+        self._replacement = replacement
+        self._write = write
+        self._seed = seed
+
+    @property
+    def sets(self) -> int:
+        return self._sets
+
+    @property
+    def ways(self) -> int:
+        return self._ways
+
+    @property
+    def line_size(self) -> int:
+        return self._line_size
+
+    @property
+    def replacement(self) -> ReplacementPolicy:
+        return self._replacement
+
+    @property
+    def write(self) -> WritePolicy:
+        return self._write
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    @property
+    def layout(self) -> tuple:
+        # Everything a cash snapshot depends on; the seed only starts the random replacement state
+        return self._sets, self._ways, self._line_size, self._replacement, self._write
+
+    @property
+    def bits_for_words(self) -> int:
+        return self._line_size.bit_length() - 1
+
+    @property
+    def bits_for_string(self) -> int:
+        return self._sets.bit_length() - 1
+
+    @property
+    def bits_for_tag(self) -> int:
+        return 16 - self.bits_for_string - self.bits_for_words
+
+    @property
+    def words_in_line(self) -> int:
+        return self._line_size // 2
+
+    @staticmethod
+    def _power_of_two(value: int) -> bool:
+        return value > 0 and value & (value - 1) == 0
+
+
+class Replacer:
+    # Chooses the way to eject among valid lines of a string. touch() is called on every hit, fill() when a
+    # line has been loaded from memory. Per-way state is kept in flat lists indexed by string * ways + way
+    def __init__(self, config: CashConfig):
+        self._ways = config.ways
+
+    def touch(self, string: int, way: int) -> None:
+        pass
+
+    def fill(self, string: int, way: int) -> None:
+        self.touch(string, way)
+
+    def victim(self, string: int) -> int:
+        raise NotImplementedError()
+
+    def state(self) -> list:
+        # Replacement state as a flat list of ints, for snapshots
+        return []
+
+    def set_state(self, state: list) -> None:
+        pass
+
+
+class LRUReplacer(Replacer):
+    def __init__(self, config: CashConfig):
+        super(LRUReplacer, self).__init__(config)
+        self._clock = 0
+        self._stamps = [way - config.ways for _ in range(config.sets) for way in range(config.ways)]
+
+    def touch(self, string: int, way: int) -> None:
+        self._clock += 1
+        self._stamps[string * self._ways + way] = self._clock
+
+    def victim(self, string: int) -> int:
+        return _argmin(self._stamps, string * self._ways, self._ways)
+
+    def state(self) -> list:
+        return [self._clock] + self._stamps
+
+    def set_state(self, state: list) -> None:
+        self._clock = state[0]
+        self._stamps = list(state[1:])
+
+
+class FIFOReplacer(LRUReplacer):
+    def __init__(self, config: CashConfig):
+        super(FIFOReplacer, self).__init__(config)
+
+    def touch(self, string: int, way: int) -> None:
+        pass
+
+    def fill(self, string: int, way: int) -> None:
+        super(FIFOReplacer, self).touch(string, way)
+
+
+class PLRUReplacer(Replacer):
+    def __init__(self, config: CashConfig):
+        super(PLRUReplacer, self).__init__(config)
+        self._levels = config.ways.bit_length() - 1
+        # Heap-ordered tree bits per string, node 1 is the root; a bit points to the half holding the victim
+        self._trees = [[0] * config.ways for _ in range(config.sets)]
+
+    def touch(self, string: int, way: int) -> None:
+        tree = self._trees[string]
+        node = 1
+        for level in range(self._levels - 1, -1, -1):
+            bit = (way >> level) & 1
+            tree[node] = bit ^ 1
+            node = node * 2 + bit
+
+    def victim(self, string: int) -> int:
+        tree = self._trees[string]
+        node = 1
+        way = 0
+        for _ in range(self._levels):
+            bit = tree[node]
+            way = way * 2 + bit
+            node = node * 2 + bit
+        return way
+
+    def state(self) -> list:
+        return [bit for tree in self._trees for bit in tree]
+
+    def set_state(self, state: list) -> None:
+        ways = len(self._trees[0])
+        self._trees = [list(state[i: i + ways]) for i in range(0, len(state), ways)]
+
+
+class RandomReplacer(Replacer):
+    def __init__(self, config: CashConfig):
+        super(RandomReplacer, self).__init__(config)
+        self._random = random.Random(config.seed)
+
+    def victim(self, string: int) -> int:
+        return self._random.randrange(self._ways)
+
+    def state(self) -> list:
+        return list(self._random.getstate()[1])
+
+    def set_state(self, state: list) -> None:
+        self._random.setstate((self._random.VERSION, tuple(state), None))
+
+
+class LFUReplacer(Replacer):
+    def __init__(self, config: CashConfig):
+        super(LFUReplacer, self).__init__(config)
+        self._counts = [0] * (config.sets * config.ways)
+
+    def touch(self, string: int, way: int) -> None:
+        self._counts[string * self._ways + way] += 1
+
+    def fill(self, string: int, way: int) -> None:
+        self._counts[string * self._ways + way] = 1
+
+    def victim(self, string: int) -> int:
+        return _argmin(self._counts, string * self._ways, self._ways)
 
+    def state(self) -> list:
+        return list(self._counts)
 
+    def set_state(self, state: list) -> None:
+        self._counts = list(state)
 
-class CashLine:
-    def __init__(self, string: int, lru: int):
-        self.reliable = False
-        self.tag = 0
-        self.string = string
-        self.lru = lru
-        self.modified = False
-        self.missed = False
+
+def _argmin(values: list, base: int, count: int) -> int:
+    best = 0
+    best_value = values[base]
+    for way in range(1, count):
+        if values[base + way] < best_value:
+            best = way
+            best_value = values[base + way]
+    return best
+
+
+REPLACERS = {ReplacementPolicy.LRU: LRUReplacer,
+             ReplacementPolicy.PLRU: PLRUReplacer,
+             ReplacementPolicy.FIFO: FIFOReplacer,
+             ReplacementPolicy.RANDOM: RandomReplacer,
+             ReplacementPolicy.LFU: LFUReplacer}
 
 
 class BusRequest:
     CPU_CYCLES_PER_BUS_CYCLE = 5
 
-    def __init__(self, num_bus_cycles, line: CashLine = None):
+    def __init__(self, num_bus_cycles, slot: int = -1):
         self._num_bus_cycles_left = num_bus_cycles
         self.done = (num_bus_cycles == 0)
         self._cpu_cycle = 0
-        self._line = line
+        self._slot = slot
+
+    @property
+    def slot(self) -> int:
+        return self._slot
 
     @property
-    def line(self):
-        return self._line
+    def cycles_left(self) -> int:
+        if self.done:
+            return 0
+        return (self._num_bus_cycles_left - 1) * self.CPU_CYCLES_PER_BUS_CYCLE \
+            + self.CPU_CYCLES_PER_BUS_CYCLE - self._cpu_cycle
+
+    def skip(self, cycles: int) -> None:
+        assert cycles < self.cycles_left
+        cpu_cycles = self._cpu_cycle + cycles
+        self._num_bus_cycles_left -= cpu_cycles // self.CPU_CYCLES_PER_BUS_CYCLE
+        self._cpu_cycle = cpu_cycles % self.CPU_CYCLES_PER_BUS_CYCLE
 
     def cycle(self) -> None:
         if self.done:
@@ -42,74 +272,56 @@ class BusRequest:
             return
 
         self.done = True
-        if self._line is not None:
-            self._line.blocked = False
-            self._line.reliable = True
-            self._line.modified = False
-            self._line.missed = True
 
 
 class CashMemory:
-    BITS_FOR_TAG = 7
-    BITS_FOR_STRING = 6
-    BITS_FOR_WORDS = 3
-    ASSOCIATION_DEGREE = 2
-
-    LRU_NOT_EJECT = -1
-
-    WORDS_IN_LINE = (2 ** BITS_FOR_WORDS) // 2
-    NUM_STRINGS = 2 ** BITS_FOR_STRING
-
-    def __init__(self, memory: Memory, enabled=True):
+    def __init__(self, memory: Memory, enabled=True, config: CashConfig = None):
         self._memory = memory
+        self._config = config if config is not None else CashConfig()
         self._bus_request = BusRequest(0)
         self.enabled = enabled
-        self._strings = []
         self._busy = False
         self._address = -1
         self._rw: str = None
-        self._lock = QMutex()
-        self._hits = 0
-        self._misses = 0
-        for string in range(0, self.NUM_STRINGS):
-            self._strings.append([CashLine(string, self.ASSOCIATION_DEGREE - i - 1)
-                                  for i in range(0, self.ASSOCIATION_DEGREE)])
+        self._statistics = CashStatistics()
+        self._ways = self._config.ways
+        self._offset_bits = self._config.bits_for_words
+        self._tag_shift = self._config.bits_for_words + self._config.bits_for_string
+        self._string_mask = self._config.sets - 1
+        # Line state, indexed by slot = string * ways + way
+        self._tags = [0] * (self._config.sets * self._ways)
+        self._valid = bytearray(self._config.sets * self._ways)
+        self._dirty = bytearray(self._config.sets * self._ways)
+        self._missed = bytearray(self._config.sets * self._ways)
+        self._replacer: Replacer = REPLACERS[self._config.replacement](self._config)
 
         self._pool_addr_blocked = set()
+        self._trace: AccessTrace = None
+        self._load_kind = AccessKind.LOAD
 
     @property
     def memory(self):
         return self._memory
 
+    @property
+    def config(self) -> CashConfig:
+        return self._config
+
     @property
     def busy(self):
         return self._busy
 
     @property
-    def hits(self):
-        self._lock.lock()
-        res = self._hits
-        self._lock.unlock()
-        return res
+    def statistics(self) -> CashStatistics:
+        return self._statistics
 
-    @hits.setter
-    def hits(self, value):
-        self._lock.lock()
-        self._hits = value
-        self._lock.unlock()
+    @property
+    def hits(self):
+        return self._statistics.snapshot()[0]
 
     @property
     def misses(self):
-        self._lock.lock()
-        res = self._misses
-        self._lock.unlock()
-        return res
-
-    @misses.setter
-    def misses(self, value):
-        self._lock.lock()
-        self._misses = value
-        self._lock.unlock()
+        return self._statistics.snapshot()[1]
 
     @property
     def address(self):
@@ -120,10 +332,36 @@ class CashMemory:
         return self._rw
 
     def clear_statistics(self):
-        self._lock.lock()
-        self._hits = 0
-        self._misses = 0
-        self._lock.unlock()
+        self._statistics.clear()
+
+    def snapshot(self) -> tuple:
+        return (self.enabled, self._config.layout, tuple(self._tags), bytes(self._valid), bytes(self._dirty),
+                bytes(self._missed), tuple(self._replacer.state()), self._statistics.snapshot())
+
+    def restore(self, state: tuple):
+        # A bus request in flight is dropped: the pipe is drained before a snapshot is taken
+        enabled, layout, tags, valid, dirty, missed, replacer, statistics = state
+        if layout != self._config.layout or len(tags) != len(self._tags) \
+                or len(replacer) != len(self._replacer.state()):
+            raise CashWrongConfiguration(what="snapshot was taken with another cash configuration")
+
+        self.enabled = enabled
+        self._tags = list(tags)
+        self._valid[:] = valid
+        self._dirty[:] = dirty
+        self._missed[:] = missed
+        self._replacer.set_state(replacer)
+        self._statistics.restore(statistics)
+        self._bus_request = BusRequest(0)
+        self._busy = False
+        self._address = -1
+        self._rw = None
+        self._pool_addr_blocked.clear()
+
+    def set_trace(self, trace: AccessTrace, load_kind: AccessKind = AccessKind.LOAD):
+        # Completed cacheable accesses are appended to trace; accesses to devices bypass the cash and are skipped
+        self._trace = trace
+        self._load_kind = load_kind
 
     def clear_address(self):
         self._address = -1
@@ -139,18 +377,16 @@ class CashMemory:
             return self._load_if_disabled(address, size)
 
         (string, tag) = self._get_string_tag(address)
-        line = self._find(string, tag)
+        slot = self._find(string, tag)
 
-        if line is not None:
-            self._change_lru(line)
+        if slot != -1:
+            self._replacer.touch(string, slot - string * self._ways)
             if not self._busy:
                 self._address = -1
 
-            if line.missed:
-                line.missed = False
-                self.misses += 1
-            else:
-                self.hits += 1
+            self._count_access(slot)
+            if self._trace is not None:
+                self._trace.record(self._load_kind, address)
             return True, self._memory.load(address, size)
 
         if not self._busy:
@@ -165,22 +401,23 @@ class CashMemory:
         if not self.enabled or self._memory.operation_on_device(address):
             return self._store_if_disabled(address, size, value)
 
+        if self._config.write is WritePolicy.WRITE_THROUGH:
+            return self._store_through(address, size, value)
+
         (string, tag) = self._get_string_tag(address)
-        line = self._find(string, tag)
+        slot = self._find(string, tag)
 
-        if line is not None:
-            self._change_lru(line)
+        if slot != -1:
+            self._replacer.touch(string, slot - string * self._ways)
             if not self._busy:
                 self._address = -1
 
             self._memory.store(address, size, value)
-            line.modified = True
+            self._dirty[slot] = True
 
-            if line.missed:
-                line.missed = False
-                self.misses += 1
-            else:
-                self.hits += 1
+            self._count_access(slot)
+            if self._trace is not None:
+                self._trace.record(AccessKind.STORE, address)
             return True
 
         if not self._busy:
@@ -188,6 +425,14 @@ class CashMemory:
 
         return False
 
+    @property
+    def cycles_to_ready(self) -> int:
+        return self._bus_request.cycles_left if self._busy else 0
+
+    def skip(self, cycles: int) -> None:
+        if self._busy:
+            self._bus_request.skip(cycles)
+
     def cycle(self) -> bool:
         if self._bus_request.done:
             return not self._busy
@@ -195,8 +440,12 @@ class CashMemory:
         self._bus_request.cycle()
         if self._bus_request.done:
             self._busy = False
-            if self._bus_request.line is not None:
-                self._change_lru(self._bus_request.line)
+            slot = self._bus_request.slot
+            if slot != -1:
+                self._valid[slot] = True
+                self._dirty[slot] = False
+                self._missed[slot] = True
+                self._replacer.fill(slot // self._ways, slot % self._ways)
 
         return not self._busy
 
@@ -220,7 +469,9 @@ class CashMemory:
         if self._address == address and self._rw == 'r':
             self._rw = None
             self._address = -1
-            self.misses += 1
+            self._statistics.misses += 1
+            if self._trace is not None and not self._memory.operation_on_device(address):
+                self._trace.record(self._load_kind, address)
             return True, self._memory.load(address, size)
 
         if self._address == -1:
@@ -238,7 +489,36 @@ class CashMemory:
         if self._address == address and self._rw == 'w':
             self._rw = None
             self._address = -1
-            self.misses += 1
+            self._statistics.misses += 1
+            if self._trace is not None and not self._memory.operation_on_device(address):
+                self._trace.record(AccessKind.STORE, address)
+            self._memory.store(address, size, value)
+            return True
+
+        if self._address == -1:
+            self._rw = 'w'
+            self._address = address
+            self._bus_request = BusRequest(2)
+            self._busy = True
+
+        return False
+
+    def _store_through(self, address: int, size: str, value: bitarray) -> bool:
+        if self._busy:
+            return False
+
+        if self._address == address and self._rw == 'w':
+            self._rw = None
+            self._address = -1
+            (string, tag) = self._get_string_tag(address)
+            slot = self._find(string, tag)
+            if slot != -1:
+                self._replacer.touch(string, slot - string * self._ways)
+                self._count_access(slot)
+            else:
+                self._statistics.misses += 1
+            if self._trace is not None:
+                self._trace.record(AccessKind.STORE, address)
             self._memory.store(address, size, value)
             return True
 
@@ -250,60 +530,41 @@ class CashMemory:
 
         return False
 
-    def _find(self, string: int, tag: int):
-        for line in self._strings[string]:
-            if line.reliable and line.tag == tag:
-                return line
+    def _count_access(self, slot: int):
+        if self._missed[slot]:
+            self._missed[slot] = False
+            self._statistics.misses += 1
+        else:
+            self._statistics.hits += 1
+
+    def _find(self, string: int, tag: int) -> int:
+        base = string * self._ways
+        for slot in range(base, base + self._ways):
+            if self._valid[slot] and self._tags[slot] == tag:
+                return slot
 
-        return None
+        return -1
 
     def _get_string_tag(self, address) -> (int, int):
-        bitarr = bitarray(endian='big')
-        bitarr.frombytes(address.to_bytes(2, byteorder='big', signed=False))
-        string = int(bitarr[self.BITS_FOR_TAG: self.BITS_FOR_TAG + self.BITS_FOR_STRING].to01(), 2)
-        tag = int(bitarr[0: self.BITS_FOR_TAG].to01(), 2)
-        return string, tag
+        return (address >> self._offset_bits) & self._string_mask, address >> self._tag_shift
 
     def _eject(self, string: int, tag: int, address: int, rw: str):
         assert not self._busy
 
-        line_for_ejection: CashLine = self._strings[string][0]
-        if line_for_ejection.lru == self.LRU_NOT_EJECT:
-            print("warning: cannot eject cash line")
-            return
+        base = string * self._ways
+        for slot in range(base, base + self._ways):
+            if not self._valid[slot]:
+                break
+        else:
+            slot = base + self._replacer.victim(string)
 
         self._address = address
         self._rw = rw
 
-        line_for_ejection.lru = self.LRU_NOT_EJECT
-        self._strings[string].sort(key=lambda ln: ln.lru, reverse=True)
-
-        line_for_ejection.reliable = False
-        line_for_ejection.tag = tag
-        num_memory_cycles = 2 + self.WORDS_IN_LINE
-        if line_for_ejection.modified:
-            num_memory_cycles += 2 + self.WORDS_IN_LINE
-        self._bus_request = BusRequest(num_memory_cycles, line_for_ejection)
+        self._valid[slot] = False
+        self._tags[slot] = tag
+        num_memory_cycles = 2 + self._config.words_in_line
+        if self._dirty[slot]:
+            num_memory_cycles += 2 + self._config.words_in_line
+        self._bus_request = BusRequest(num_memory_cycles, slot)
         self._busy = True
-
-    def _lru_normalize(self, string: int):
-        lines = self._strings[string]
-        lines.sort(key=lambda ln: ln.lru, reverse=True)
-        assert lines[self.ASSOCIATION_DEGREE - 1].lru in (self.LRU_NOT_EJECT, 0)
-
-        for i in range(self.ASSOCIATION_DEGREE - 1, -1, -1):
-            if lines[i].lru == self.LRU_NOT_EJECT:
-                continue
-            elif i != self.ASSOCIATION_DEGREE - 1:
-                assert lines[i].lru > lines[i+1].lru
-                lines[i].lru = lines[i+1].lru + 1
-
-    def _change_lru(self, line_lru: CashLine):
-        assert line_lru.reliable
-
-        for line in self._strings[line_lru.string]:
-            if line is not line_lru and line.lru != self.LRU_NOT_EJECT:
-                line.lru += 1
-
-        line_lru.lru = 0
-        self._lru_normalize(line_lru.string)
@@ -0,0 +1,257 @@
+"""Replays an AccessTrace through cash configurations without running the pipe.
+
+Write-back LRU configurations, and direct-mapped ones of any policy, are resolved in array form from LRU stack
+distances (_StackDistances): about 0.6 s per million accesses, and sweep() shares the distances between
+configurations that differ only in ways, e.g. 7 s for 48 configurations over a million accesses instead of 48 s.
+Other replacement policies and write-through keep a Python loop over the accesses, about 1.5 s per million.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from src.backend.engine.cash import CashConfig, ReplacementPolicy, WritePolicy, REPLACERS
+from src.backend.engine.trace import AccessTrace, AccessKind
+
+INSTRUCTION_STREAM = (AccessKind.FETCH,)
+DATA_STREAM = (AccessKind.LOAD, AccessKind.STORE)
+
+# Re-touching the most recently used line leaves the replacement state of these policies unchanged
+_REPEAT_INVARIANT = (ReplacementPolicy.LRU, ReplacementPolicy.PLRU, ReplacementPolicy.FIFO, ReplacementPolicy.RANDOM)
+
+
+class SimulationResult:
+    def __init__(self, config: CashConfig, accesses: int, hits: int, misses: int, write_backs: int):
+        self.config = config
+        self.accesses = accesses
+        self.hits = hits
+        self.misses = misses
+        self.write_backs = write_backs
+
+    @property
+    def miss_rate(self) -> float:
+        return self.misses / self.accesses if self.accesses != 0 else 0.0
+
+
+def simulate(trace: AccessTrace, config: CashConfig, kinds: tuple = DATA_STREAM) -> SimulationResult:
+    # Replays the accesses of the given kinds through one cash in trace order. The cash in the pipe serves hits
+    # while a line is being filled, so its counts may differ slightly for policies other than LRU
+    return _simulate(*_select(trace, kinds), config)
+
+
+def sweep(trace: AccessTrace, configs: list, kinds: tuple = DATA_STREAM, processes: int = None) -> list:
+    # Configs that differ only in ways are simulated together when the stack distances serve all of them
+    groups = {}
+    for index, config in enumerate(configs):
+        key = (config.sets, config.line_size) if _stack_simulated(config) else index
+        groups.setdefault(key, []).append(index)
+    batches = list([configs[index] for index in group] for group in groups.values())
+
+    if processes == 1 or len(batches) <= 1:
+        addresses, stores = _select(trace, kinds)
+        results = [_simulate_batch(addresses, stores, batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(trace.addresses.tobytes(), trace.kinds.tobytes(), kinds)) as executor:
+            results = list(executor.map(_simulate_in_worker, batches))
+
+    ordered = [None] * len(configs)
+    for group, batch_results in zip(groups.values(), results):
+        for index, result in zip(group, batch_results):
+            ordered[index] = result
+    return ordered
+
+
+def _select(trace: AccessTrace, kinds: tuple) -> tuple:
+    addresses = numpy.frombuffer(trace.addresses, dtype=numpy.uint16)
+    access_kinds = numpy.frombuffer(trace.kinds, dtype=numpy.uint8)
+    selected = numpy.isin(access_kinds, numpy.array([int(kind) for kind in kinds], dtype=numpy.uint8))
+    return addresses[selected].astype(numpy.int64), access_kinds[selected] == AccessKind.STORE
+
+
+_worker_trace: AccessTrace = None
+_worker_kinds: tuple = None
+
+
+def _init_worker(addresses: bytes, kinds: bytes, stream: tuple):
+    global _worker_trace, _worker_kinds
+    trace = AccessTrace()
+    trace.addresses.frombytes(addresses)
+    trace.kinds.frombytes(kinds)
+    _worker_trace = trace
+    _worker_kinds = stream
+
+
+def _simulate_in_worker(configs: list) -> list:
+    return _simulate_batch(*_select(_worker_trace, _worker_kinds), configs)
+
+
+def _simulate_batch(addresses: numpy.ndarray, stores: numpy.ndarray, configs: list) -> list:
+    # configs share the geometry when there is more than one of them, see sweep()
+    if len(configs) == 1 or len(addresses) == 0:
+        return [_simulate(addresses, stores, config) for config in configs]
+    stacks = _StackDistances(addresses, stores, configs[0])
+    return [stacks.result(config) for config in configs]
+
+
+def _stack_simulated(config: CashConfig) -> bool:
+    return config.write is WritePolicy.WRITE_BACK and \
+        (config.replacement is ReplacementPolicy.LRU or config.ways == 1)
+
+
+def _simulate(addresses: numpy.ndarray, stores: numpy.ndarray, config: CashConfig) -> SimulationResult:
+    accesses = len(addresses)
+    if accesses == 0:
+        return SimulationResult(config, 0, 0, 0, 0)
+
+    if _stack_simulated(config):
+        return _StackDistances(addresses, stores, config).result(config)
+
+    write_back = config.write is WritePolicy.WRITE_BACK
+
+    lines = addresses >> config.bits_for_words
+    strings = lines & (config.sets - 1)
+    tags = addresses >> (config.bits_for_words + config.bits_for_string)
+
+    if write_back and config.replacement in _REPEAT_INVARIANT:
+        # A run of accesses to one line costs at most one miss; the rest are hits that only mark the line dirty
+        starts = numpy.flatnonzero(numpy.concatenate(([True], lines[1:] != lines[:-1])))
+        repeats = numpy.diff(numpy.append(starts, accesses)) - 1
+        stored = numpy.logical_or.reduceat(stores, starts)
+        strings, tags, stores = strings[starts], tags[starts], stored
+    else:
+        repeats = numpy.zeros(accesses, dtype=numpy.int64)
+
+    ways = config.ways
+    replacer = REPLACERS[config.replacement](config)
+    line_tags = [-1] * (config.sets * ways)
+    dirty = bytearray(config.sets * ways)
+    hits, misses, write_backs = int(repeats.sum()), 0, 0
+
+    for string, tag, store in zip(strings.tolist(), tags.tolist(), stores.tolist()):
+        base = string * ways
+        for slot in range(base, base + ways):
+            if line_tags[slot] == tag:
+                hits += 1
+                replacer.touch(string, slot - base)
+                break
+        else:
+            misses += 1
+            if store and not write_back:
+                continue
+
+            for slot in range(base, base + ways):
+                if line_tags[slot] == -1:
+                    break
+            else:
+                slot = base + replacer.victim(string)
+            if dirty[slot]:
+                write_backs += 1
+            line_tags[slot] = tag
+            dirty[slot] = False
+            replacer.fill(string, slot - base)
+            replacer.touch(string, slot - base)
+
+        if store and write_back:
+            dirty[slot] = True
+
+    return SimulationResult(config, accesses, hits, misses, write_backs)
+
+
+class _StackDistances:
+    """The LRU stack distances of the accesses of a trace for one cash geometry: sets and line size.
+
+    An access of a write-back LRU cash hits iff fewer than ways other lines of its set were used since the
+    previous access to its line, so one instance serves every number of ways; with one way every policy is LRU.
+    """
+
+    def __init__(self, addresses: numpy.ndarray, stores: numpy.ndarray, config: CashConfig):
+        self.accesses = len(addresses)
+        lines = addresses >> config.bits_for_words
+        strings = lines & (config.sets - 1)
+
+        # The accesses of each set in trace order, a run of accesses to one line merged into its first: the
+        # rest are hits that only mark the line dirty
+        order = numpy.argsort(strings, kind="stable")
+        lines, strings, stores = lines[order], strings[order], stores[order]
+        starts = numpy.flatnonzero(numpy.concatenate(([True], lines[1:] != lines[:-1])))
+        self.stored = numpy.logical_or.reduceat(stores, starts)
+        lines, strings = lines[starts], strings[starts]
+        count = len(lines)
+        self.positions = numpy.arange(count)
+        # Position after the last access of the set
+        self.set_ends = numpy.searchsorted(strings, strings, side="right")
+
+        # Previous and next access to the same line, -1 if there is none
+        self.by_line = numpy.argsort(lines, kind="stable")
+        same = lines[self.by_line[1:]] == lines[self.by_line[:-1]]
+        self.previous = numpy.full(count, -1)
+        self.previous[self.by_line[1:][same]] = self.by_line[:-1][same]
+        self.following = numpy.full(count, -1)
+        self.following[self.by_line[:-1][same]] = self.by_line[1:][same]
+        self.reused = self.previous >= 0
+        self.last = self.following < 0
+        self._distances = None
+
+    def distances(self) -> tuple:
+        # The number of other lines of the set used since the previous access to the line of every reused
+        # access, and after the last access to the line of every last access. Lines used in (previous, position)
+        # are the accesses there whose own previous access is before previous, lines used after a position up to
+        # the end of the set are those whose previous access is before it.
+        if self._distances is None:
+            reused, last = self.reused, self.last
+            counts = _count_less(self.previous + 1,
+                                 numpy.concatenate((self.positions[reused], self.set_ends[last])),
+                                 numpy.concatenate((self.previous[reused] + 1, self.positions[last] + 1)))
+            split = int(reused.sum())
+            self._distances = (counts[:split] - (self.previous[reused] + 1),
+                               counts[split:] - (self.positions[last] + 1))
+        return self._distances
+
+    def result(self, config: CashConfig) -> SimulationResult:
+        count = len(self.positions)
+        hits = numpy.zeros(count, dtype=bool)
+        evicted_at_end = numpy.zeros(count, dtype=bool)
+        if config.ways == 1:
+            evicted_at_end[self.last] = self.positions[self.last] + 1 < self.set_ends[self.last]
+        else:
+            reuse, after = self.distances()
+            hits[self.reused] = reuse < config.ways
+            evicted_at_end[self.last] = after >= config.ways
+
+        # A line stays from a miss until it is evicted: before its next miss, or at the end when enough other
+        # lines of the set were used after it. It is written back if it was stored to meanwhile.
+        misses = ~hits
+        evicted = evicted_at_end
+        evicted[~self.last] = misses[self.following[~self.last]]
+        stays = numpy.cumsum(misses[self.by_line])
+        dirty = numpy.zeros(stays[-1] + 1, dtype=bool)
+        numpy.logical_or.at(dirty, stays, self.stored[self.by_line])
+        write_backs = int((evicted[self.by_line] & dirty[stays]).sum())
+
+        num_misses = int(misses.sum())
+        return SimulationResult(config, self.accesses, self.accesses - num_misses, num_misses, write_backs)
+
+
+def _count_less(values: numpy.ndarray, bounds: numpy.ndarray, limits: numpy.ndarray) -> numpy.ndarray:
+    # For every query k the number of j < bounds[k] with values[j] < limits[k], all of them non-negative. The
+    # values are partitioned by one bit at a time from the highest, as in a wavelet matrix, following the
+    # prefix of every query down the levels.
+    bits = int(max(values.max(), limits.max())).bit_length()
+    values = values.astype(numpy.int32)
+    limits = limits.astype(numpy.int32)
+    result = numpy.zeros(len(bounds), dtype=numpy.int32)
+    begins = numpy.zeros(len(bounds), dtype=numpy.int32)
+    ends = bounds.astype(numpy.int32)
+    zeros_before = numpy.zeros(len(values) + 1, dtype=numpy.int32)
+    for bit in reversed(range(bits)):
+        ones = (values >> bit) & 1
+        numpy.cumsum(1 - ones, out=zeros_before[1:])
+        zeros = zeros_before[-1]
+        zero_begins, zero_ends = zeros_before.take(begins), zeros_before.take(ends)
+        greater = (limits >> bit) & 1
+        result += greater * (zero_ends - zero_begins)
+        begins = zero_begins + greater * (zeros + begins - 2 * zero_begins)
+        ends = zero_ends + greater * (zeros + ends - 2 * zero_ends)
+        ones = ones.astype(bool)
+        values = numpy.concatenate((values[~ones], values[ones]))
+    return result
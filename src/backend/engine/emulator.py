@@ -1,7 +1,13 @@
-from src.backend.engine.cash import CashMemory
+import enum
+import inspect
+
+from src.backend.engine.cash import CashMemory, CashConfig
+from src.backend.engine.functional import FunctionalEngine
 from src.backend.engine.keyboard import Keyboard
 from src.backend.engine.pipe import Pipe
 from src.backend.engine.pool_registers import PoolRegisters
+from src.backend.engine.snapshot import Snapshot
+from src.backend.engine.trace import AccessTrace, AccessKind
 from src.backend.model.commands import Commands
 from src.backend.model.video import VideoMode
 from src.backend.utils.assembler import Assembler
@@ -9,6 +15,7 @@ from src.backend.utils.exceptions import EmulatorOddBreakpoint, EmulatorWrongAdd
     UnknownCommand, EmulatorWrongConfiguration
 from src.backend.utils.disasm_instruction import DisasmInstruction, DisasmState
 from src.backend.utils.romfiller import ROMFiller
+from src.backend.utils.romimage import ROMImage
 
 from src.backend.model.memory import Memory, MemoryPart
 from src.backend.model.registers import Register, StackPointer, ProgramCounter
@@ -17,11 +24,22 @@ from src.backend.model.programstatus import ProgramStatus
 from src.backend.utils.routines import Routines
 
 
+class EngineKind(enum.Enum):
+    PIPE = enum.auto()
+    FUNCTIONAL = enum.auto()
+
+
 class Emulator:
     SIZE_FONT_16_WIDTH = 26
     MAX_INIT_LENGTH = 100
 
-    def __init__(self, video_on_show=None):
+    # BR .-0: an unconditional branch to itself has no side effects, so the machine can only leave it on an
+    # interrupt. run() blocks on keyboard input instead of spinning through it.
+    IDLE_LOOP_INSTRUCTION = 0o000777
+    IDLE_WAIT_MS = 100
+
+    def __init__(self, video_on_show=None, engine: EngineKind=EngineKind.PIPE, icash: CashConfig = None,
+                 dcash: CashConfig = None):
         self._memory = Memory()
         self._memory.video.set_on_show(video_on_show)
 
@@ -38,28 +56,45 @@ class Emulator:
 
         self._breakpoints = set()
         self._instructions = {}
-        self._commands = {}
 
         self._fill_ROM()
-        self._icash = CashMemory(self._memory)
-        self._dcash = CashMemory(self._memory)
+        self._icash = CashMemory(self._memory, config=icash)
+        self._dcash = CashMemory(self._memory, config=dcash)
         self._pool_registers = PoolRegisters(self._registers)
-        self._pipe = Pipe(dmem=self._dcash, imem=self._icash, pool_registers=self._pool_registers,
-                          ps=self._program_status, commands=self._commands, enabled=True)
+        self._engine_kind = engine
+        if engine is EngineKind.FUNCTIONAL:
+            self._pipe = FunctionalEngine(memory=self._memory, registers=self._registers, ps=self._program_status)
+        else:
+            self._pipe = Pipe(dmem=self._dcash, imem=self._icash, pool_registers=self._pool_registers,
+                              ps=self._program_status, enabled=True)
 
         self._keyboard = Keyboard(register=self._memory.keyboard_register, pipe=self._pipe, memory=self._memory,
                                   program_status=self._program_status, program_counter=self._pc, stack_pointer=self._sp)
-        self.stopped = False
+        self._stopped = False
         self._writing_glyph = False
 
     @property
     def keyboard(self):
         return self._keyboard
 
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    @stopped.setter
+    def stopped(self, value: bool):
+        self._stopped = value
+        if value:
+            self._keyboard.wake()
+
     @property
     def pipe(self):
         return self._pipe
 
+    @property
+    def engine_kind(self) -> EngineKind:
+        return self._engine_kind
+
     @property
     def icash(self):
         return self._icash
@@ -68,25 +103,78 @@ class Emulator:
     def dcash(self):
         return self._dcash
 
-    def step(self):
+    def start_trace(self) -> AccessTrace:
+        trace = AccessTrace()
+        self._icash.set_trace(trace, load_kind=AccessKind.FETCH)
+        self._dcash.set_trace(trace, load_kind=AccessKind.LOAD)
+        return trace
+
+    def stop_trace(self):
+        self._icash.set_trace(None)
+        self._dcash.set_trace(None)
+
+    def snapshot(self) -> Snapshot:
+        # The engine is drained first if it has started executing the pending instruction
+        engine = self._pipe.snapshot()
+        return Snapshot(engine_kind=self._engine_kind,
+                        registers=tuple(r.snapshot() for r in self._registers),
+                        program_status=self._program_status.get(size="word", signed=False),
+                        memory=self._memory.snapshot(), icash=self._icash.snapshot(),
+                        dcash=self._dcash.snapshot(), engine=engine, keyboard=self._keyboard.snapshot(),
+                        writing_glyph=self._writing_glyph)
+
+    def restore(self, snapshot: Snapshot):
+        if snapshot.engine_kind is not self._engine_kind:
+            raise EmulatorWrongConfiguration(what="snapshot was taken with the {} engine".format(
+                snapshot.engine_kind.name))
+
+        for register, value in zip(self._registers, snapshot.registers):
+            register.restore(value)
+        self._program_status.set(size="word", signed=False, value=snapshot.program_status)
+        self._memory.restore(snapshot.memory)
+        self._icash.restore(snapshot.icash)
+        self._dcash.restore(snapshot.dcash)
+        self._pipe.restore(snapshot.engine)
+        self._keyboard.restore(snapshot.keyboard)
+        self._writing_glyph = snapshot.writing_glyph
+
+    def step(self, block: bool=False):
+        # block=True lets the functional engine run a whole translated basic block; interrupts are then taken
+        # only at block boundaries
+        self._memory.video.present_due()
         while True:
-            if self._keyboard.interrupt_permitted and self._writing_glyph:
-                self._writing_glyph = False
-                self._memory.video.show()
+            self._show_written_glyph()
 
             if self._keyboard.interrupt():
                 self._writing_glyph = True
                 return
 
-            if self._pipe.cycle():
+            if self._pipe.run_block(self._breakpoints) if block else self._pipe.cycle():
                 return
 
     def run(self):
+        block = self._engine_kind is EngineKind.FUNCTIONAL
         while True:
-            self.step()
+            self.step(block=block)
             if self.current_pc in self._breakpoints or self.stopped:
+                self._memory.video.flush()
                 break
 
+            if self.idle:
+                self._show_written_glyph()
+                self._memory.video.flush()
+                self._keyboard.wait_for_interrupt(self.IDLE_WAIT_MS)
+
+    @property
+    def idle(self) -> bool:
+        return self._memory.load_word(self.current_pc) == self.IDLE_LOOP_INSTRUCTION \
+            and not self._keyboard.interrupt_pending
+
+    def _show_written_glyph(self):
+        if self._keyboard.interrupt_permitted and self._writing_glyph:
+            self._writing_glyph = False
+            self._memory.video.show()
+
     def toggle_breakpoint(self, address: int):
         if address % 2 == 1 or address < 0 or address >= Memory.SIZE:
             raise EmulatorOddBreakpoint()
@@ -120,7 +208,7 @@ class Emulator:
                 dis_instr = DisasmInstruction()
                 dis_instr.set_state(state=DisasmState.NOT_AN_INSTRUCTION,
                                     representation="{:06o}".format(
-                                        int(self._memory.load(size="word", address=address).to01(), 2)
+                                        self._memory.load_word(address)
                                     ))
                 result.append((address, dis_instr, breakpoint_set))
 
@@ -141,7 +229,7 @@ class Emulator:
                 dis_instr = DisasmInstruction()
                 dis_instr.set_state(state=DisasmState.NOT_AN_INSTRUCTION,
                                     representation="{:06o}".format(
-                                        int(self._memory.load(size="word", address=address).to01(), 2)
+                                        self._memory.load_word(address)
                                     ))
                 result.insert(0, (address, dis_instr, breakpoint_set))
 
@@ -174,9 +262,39 @@ class Emulator:
     def _fill_ROM(self):
         self._glyphs = ROMFiller.get_glyphs(size=self.SIZE_FONT_16_WIDTH)
         self._glyphs_start = MemoryPart.ROM.end - len(self._glyphs["data"])
-        for i, v in enumerate(self._glyphs["data"]):
-            self._memory.store(address=self._glyphs_start + i, size="byte", value=v)
-
+        self._memory.store_block(self._glyphs_start, self._glyphs["data"])
+
+        # Everything that shapes the linked code or its listing is part of the key
+        code = [Emulator, Routines, Assembler, Commands, DisasmInstruction, ROMImage]
+        digest = ROMImage.digest(Routines.sources() + [inspect.getfile(source) for source in code],
+                                 self._ROM_layout())
+        image = ROMImage.get(digest)
+        if image is None:
+            start, end = self._link_ROM()
+            self._disasm_from_to(start, end)
+            image = dict(start=start, code=bytes(self._memory.data[start: end]),
+                         listing=[ROMImage.entry(self._instructions[address]) for address in range(start, end, 2)])
+            ROMImage.put(digest, image)
+            return
+
+        start = image["start"]
+        self._memory.store_block(start, image["code"])
+        for i, entry in enumerate(image["listing"]):
+            self._instructions[start + i * 2] = ROMImage.instruction(entry)
+
+    def _ROM_layout(self) -> dict:
+        # Everything besides the routine sources that the linked ROM depends on
+        video = self._memory.video.mode
+        return dict(ROM=(MemoryPart.ROM.start, MemoryPart.ROM.end), VRAM_start=MemoryPart.VRAM.start,
+                    glyphs_start=self._glyphs_start, max_init_length=self.MAX_INIT_LENGTH,
+                    glyphs=tuple(self._glyphs[key] for key in ("width", "min_height", "max_height", "bitmap_size")),
+                    monitor=(video.width, video.height, video.depth), video_mode=VideoMode.MODE_O.mode,
+                    video_register_mode_start_address=self._memory.video_register_mode_start_address,
+                    video_register_offset_address=self._memory.video_register_offset_address,
+                    keyboard_register_address=self._memory.keyboard_register_address,
+                    monitor_structure_start=self._sp.lower_bound)
+
+    def _link_ROM(self) -> (int, int):
         init_start = MemoryPart.ROM.start
         draw_glyph_start = init_start + self.MAX_INIT_LENGTH
         draw_glyph = Routines.draw_glyph_mode_0(glyphs_start=self._glyphs_start, glyph_width=self._glyphs["width"],
@@ -237,24 +355,24 @@ class Emulator:
             raise EmulatorWrongConfiguration(what="programs don't fit to ROM!")
 
         for i, v in enumerate(init):
-            self._memory.store(address=init_start + i*2, size="word", value=v)
+            self._memory.store_word(init_start + i*2, v)
 
-        self._memory.store(address=init_end - 4, size="word", value=jump_to_mainloop[0])
-        self._memory.store(address=init_end - 2, size="word", value=jump_to_mainloop[1])
+        self._memory.store_word(init_end - 4, jump_to_mainloop[0])
+        self._memory.store_word(init_end - 2, jump_to_mainloop[1])
 
         for i, v in enumerate(draw_glyph):
-            self._memory.store(address=draw_glyph_start + i*2, size="word", value=v)
+            self._memory.store_word(draw_glyph_start + i*2, v)
 
         for i, v in enumerate(print_help_message):
-            self._memory.store(address=print_help_message_start + i * 2, size="word", value=v)
+            self._memory.store_word(print_help_message_start + i * 2, v)
 
         for i, v in enumerate(keyboard_interrupt):
-            self._memory.store(address=keyboard_interrupt_start + i*2, size="word", value=v)
+            self._memory.store_word(keyboard_interrupt_start + i*2, v)
 
         for i, v in enumerate(mainloop):
-            self._memory.store(address=mainloop_start + i*2, size="word", value=v)
+            self._memory.store_word(mainloop_start + i*2, v)
 
-        self._disasm_from_to(init_start, mainloop_end)
+        return init_start, mainloop_end
 
     def _disasm_from_to(self, from_: int, to: int):
         stored = True
@@ -265,7 +383,8 @@ class Emulator:
         for addr in range(from_, to, 2):
             self._instructions[addr] = DisasmInstruction()
             if not stored:
-                data.append(int(self._memory.load(size=sizes[cur_next_instruction], address=addr).to01(), 2))
+                data.append(self._memory.load_word(addr) if sizes[cur_next_instruction] == "word"
+                            else self._memory.load_byte(addr))
                 cur_next_instruction += 1
                 if cur_next_instruction == num_next_instructions:
                     self._instructions[tmp_addr].set_state(state=DisasmState.DISASSEMBLED,
@@ -277,9 +396,7 @@ class Emulator:
                 continue
 
             try:
-                com = Commands.get_command_by_code(code=self._memory.load(size="word", address=addr),
-                                                   program_status=self._program_status)
-                self._commands[addr] = com
+                com = Commands.get_command_by_word(code=self._memory.load_word(addr))
 
             except UnknownCommand:
                 self._instructions[addr].set_state(state=DisasmState.NOT_AN_INSTRUCTION)
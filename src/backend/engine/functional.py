@@ -0,0 +1,505 @@
+from src.backend.engine.translator import BlockTranslator, Block
+from src.backend.model.commands import Commands, InstanceCommand, AbstractCommand, Operand
+from src.backend.model.memory import Memory
+from src.backend.model.programstatus import ProgramStatus
+from src.backend.utils.statistics import PipeStatistics
+
+
+class FunctionalEngine:
+    """Executes whole instructions directly against registers and memory.
+
+    Architectural results match the Pipe model, but neither pipeline, bus nor cache timing is simulated, so
+    the cycle counter stays at zero. The interface mirrors Pipe so the emulator and the keyboard can drive
+    either engine.
+    """
+
+    PC = 7
+    SP = 6
+
+    MASKS = {"byte": 0xFF, "word": 0xFFFF}
+    SIGNS = {"byte": 0x80, "word": 0x8000}
+
+    def __init__(self, memory: Memory, registers: list, ps: ProgramStatus):
+        self._memory = memory
+        self._registers = registers
+        self._program_status = ps
+        self._pc = registers[self.PC]
+
+        self.enabled = True
+        self._handlers = {
+            InstanceCommand.CLR: self._single_operand, InstanceCommand.COM: self._single_operand,
+            InstanceCommand.INC: self._single_operand, InstanceCommand.DEC: self._single_operand,
+            InstanceCommand.NEG: self._single_operand, InstanceCommand.TST: self._single_operand,
+            InstanceCommand.ASR: self._single_operand, InstanceCommand.ASL: self._single_operand,
+            InstanceCommand.ROR: self._single_operand, InstanceCommand.ROL: self._single_operand,
+            InstanceCommand.SWAB: self._single_operand, InstanceCommand.ADC: self._single_operand,
+            InstanceCommand.SBC: self._single_operand, InstanceCommand.SXT: self._single_operand,
+            InstanceCommand.MOV: self._mov, InstanceCommand.CMP: self._double_operand,
+            InstanceCommand.ADD: self._double_operand, InstanceCommand.SUB: self._double_operand,
+            InstanceCommand.BIT: self._double_operand, InstanceCommand.BIC: self._double_operand,
+            InstanceCommand.BIS: self._double_operand, InstanceCommand.XOR: self._double_operand,
+            InstanceCommand.MUL: self._mul,
+            InstanceCommand.BR: self._branch, InstanceCommand.BNE: self._branch, InstanceCommand.BEQ: self._branch,
+            InstanceCommand.BPL: self._branch, InstanceCommand.BMI: self._branch, InstanceCommand.BVC: self._branch,
+            InstanceCommand.BVS: self._branch, InstanceCommand.BCC: self._branch, InstanceCommand.BCS: self._branch,
+            InstanceCommand.BGE: self._branch, InstanceCommand.BLT: self._branch, InstanceCommand.BGT: self._branch,
+            InstanceCommand.BLE: self._branch, InstanceCommand.BHI: self._branch, InstanceCommand.BLOS: self._branch,
+            InstanceCommand.JMP: self._jmp, InstanceCommand.JSR: self._jsr, InstanceCommand.RTS: self._rts,
+            InstanceCommand.MARK: self._mark, InstanceCommand.SOB: self._sob, InstanceCommand.RTI: self._rti
+        }
+        self._alu = {
+            InstanceCommand.CLR: self._clr, InstanceCommand.COM: self._com, InstanceCommand.INC: self._inc,
+            InstanceCommand.DEC: self._dec, InstanceCommand.NEG: self._neg, InstanceCommand.TST: self._tst,
+            InstanceCommand.ASR: self._asr, InstanceCommand.ASL: self._asl, InstanceCommand.ROR: self._ror,
+            InstanceCommand.ROL: self._rol, InstanceCommand.SWAB: self._swab, InstanceCommand.ADC: self._adc,
+            InstanceCommand.SBC: self._sbc, InstanceCommand.SXT: self._sxt, InstanceCommand.CMP: self._cmp,
+            InstanceCommand.ADD: self._add, InstanceCommand.SUB: self._sub, InstanceCommand.BIT: self._bit,
+            InstanceCommand.BIC: self._bic, InstanceCommand.BIS: self._bis, InstanceCommand.XOR: self._xor
+        }
+        self._conditions = {
+            InstanceCommand.BR: lambda n, z, v, c: True,
+            InstanceCommand.BNE: lambda n, z, v, c: not z,
+            InstanceCommand.BEQ: lambda n, z, v, c: z,
+            InstanceCommand.BPL: lambda n, z, v, c: not n,
+            InstanceCommand.BMI: lambda n, z, v, c: n,
+            InstanceCommand.BVC: lambda n, z, v, c: not v,
+            InstanceCommand.BVS: lambda n, z, v, c: v,
+            InstanceCommand.BCC: lambda n, z, v, c: not c,
+            InstanceCommand.BCS: lambda n, z, v, c: c,
+            InstanceCommand.BGE: lambda n, z, v, c: not (n ^ v),
+            InstanceCommand.BLT: lambda n, z, v, c: n ^ v,
+            InstanceCommand.BGT: lambda n, z, v, c: not (z or (n ^ v)),
+            InstanceCommand.BLE: lambda n, z, v, c: z or (n ^ v),
+            InstanceCommand.BHI: lambda n, z, v, c: not c and not z,
+            InstanceCommand.BLOS: lambda n, z, v, c: c or z
+        }
+        self._decoded = {}
+
+        # Basic blocks translated by run_block, keyed by entry address, and the blocks covering each code word
+        self._translator = BlockTranslator(memory=memory, registers=registers, ps=ps)
+        self._blocks = {}
+        self._block_words = {}
+        memory.set_code_watcher(self._on_code_store)
+
+        self._pending = False
+        self._last_instruction_address = self._pc.get(size="word", signed=False)
+        self._statistics = PipeStatistics()
+        self._add_command()
+
+    @property
+    def statistics(self) -> PipeStatistics:
+        return self._statistics
+
+    @property
+    def cycles(self):
+        return self._statistics.snapshot()[0]
+
+    @property
+    def instructions(self):
+        return self._statistics.snapshot()[1]
+
+    @property
+    def last_instruction_address(self):
+        return self._last_instruction_address
+
+    def clear_statistics(self):
+        self._statistics.clear()
+
+    def snapshot(self) -> tuple:
+        return self.enabled, self._pending, self._last_instruction_address, self._statistics.snapshot()
+
+    def restore(self, state: tuple):
+        self.enabled, self._pending, self._last_instruction_address, statistics = state
+        self._statistics.restore(statistics)
+        self.flush_translations()
+
+    def cycle(self) -> bool:
+        if self._pending:
+            self._execute()
+        self._add_command()
+        return True
+
+    def run_block(self, stops=frozenset()) -> bool:
+        # Like cycle(), but runs the whole translated block starting at the pending instruction. Falls back to
+        # one interpreted instruction when the block can't be translated or passes one of the stop addresses.
+        if self._pending:
+            pc = self._pc.get(size="word", signed=False)
+            block = self._blocks.get(pc)
+            if block is None:
+                block = self._translate(pc)
+
+            if block.function is None or not block.addresses.isdisjoint(stops):
+                self._execute()
+            else:
+                self._statistics.instructions += block.function() - 1
+        self._add_command()
+        return True
+
+    def flush_translations(self):
+        self._blocks.clear()
+        self._block_words.clear()
+        self._memory.set_code_watcher(self._on_code_store)
+
+    def _translate(self, pc: int) -> Block:
+        block = self._blocks[pc] = self._translator.translate(pc)
+        for word in range(block.start >> 1, (block.end + 1) >> 1):
+            self._block_words.setdefault(word, []).append(pc)
+        self._memory.watch_code(block.start, block.end)
+        return block
+
+    def _on_code_store(self, address: int):
+        for start in self._block_words.pop(address >> 1, ()):
+            block = self._blocks.pop(start, None)
+            if block is None:
+                continue
+            for word in range(block.start >> 1, (block.end + 1) >> 1):
+                starts = self._block_words.get(word)
+                if starts is None:
+                    continue
+                if start in starts:
+                    starts.remove(start)
+                if len(starts) == 0:
+                    del self._block_words[word]
+                    self._memory.watch_code(word * 2, word * 2 + 2, watched=False)
+        self._memory.watch_code(address & ~1, (address & ~1) + 2, watched=False)
+
+    def barrier(self) -> int:
+        if self._pending:
+            self._execute()
+            self._pending = False
+        return 0
+
+    def empty(self) -> bool:
+        return not self._pending
+
+    def add_command(self):
+        self.barrier()
+        self._add_command()
+
+    def _add_command(self):
+        self._statistics.instructions += 1
+        self._last_instruction_address = self._pc.get(size="word", signed=False)
+        self._pending = True
+
+    def _execute(self):
+        pc = self._pc.get(size="word", signed=False)
+        code = self._load(pc, "word")
+        decoded = self._decoded.get(code)
+        if decoded is None:
+            command = Commands.get_command_by_word(code=code)
+            decoded = self._decoded[code] = (self._handlers[command.type], command)
+
+        self._set_register(self.PC, pc + 2)
+        decoded[0](decoded[1])
+
+    def _load(self, address: int, size: str) -> int:
+        return self._memory.load_word(address) if size == "word" else self._memory.load_byte(address)
+
+    def _store(self, address: int, size: str, value: int):
+        if size == "word":
+            self._memory.store_word(address, value)
+        else:
+            self._memory.store_byte(address, value)
+
+    def _get_register(self, regnum: int) -> int:
+        return self._registers[regnum].get(size="word", signed=False)
+
+    def _set_register(self, regnum: int, value: int):
+        # The stack pointer doesn't wrap around: stepping it out of the address space raises, as in the pipe
+        if regnum != self.SP:
+            value &= 0xFFFF
+        self._registers[regnum].set(size="word", signed=False, value=value)
+
+    def _extension_words(self, command: AbstractCommand) -> tuple:
+        # The pipe fetches every extension word before any operand, so PC-relative operands
+        # see PC past the whole instruction
+        words = []
+        for operand in (command.src_operand, command.dest_operand):
+            if operand is None or not operand.require_next_instruction:
+                words.append(None)
+                continue
+
+            pc = self._get_register(self.PC)
+            size = "byte" if operand.reg == self.PC and operand.mode == 2 and command.on_byte else "word"
+            words.append(self._load(pc, size))
+            self._set_register(self.PC, pc + 2)
+
+        return tuple(words)
+
+    def _fetch(self, operand: Operand, size: str, extension: int, fetch_value=True) -> tuple:
+        reg, mode = operand.reg, operand.mode
+        if mode == 0:
+            if not fetch_value:
+                return None, None
+            value = self._get_register(reg)
+            return (value & 0xFF if size == "byte" else value), None
+
+        if reg == self.PC and mode == 2:
+            return extension, None
+
+        if reg == self.PC and mode == 3:
+            address = extension
+        else:
+            step = 1 if size == "byte" and mode in (2, 4) and reg not in (self.SP, self.PC) else 2
+            value = self._get_register(reg)
+            if mode in (1, 2, 3):
+                address = value
+                if mode != 1:
+                    self._set_register(reg, value + step)
+            elif mode in (4, 5):
+                address = (value - step) & 0xFFFF
+                self._set_register(reg, value - step)
+            else:
+                address = (value + extension) & 0xFFFF
+
+            if mode in (3, 5, 7):
+                address = self._load(address, "word")
+
+        if not fetch_value:
+            return None, address
+        return self._load(address, size), address
+
+    def _store_operand(self, operand: Operand, size: str, address: int, value: int):
+        if operand.mode != 0:
+            self._store(address, size, value)
+        elif size == "byte":
+            self._registers[operand.reg].set(size="byte", signed=False, value=value)
+        else:
+            self._set_register(operand.reg, value)
+
+    def _set_flags(self, n: bool, z: bool, v: bool=None, c: bool=None):
+        ps = self._program_status
+        ps.set_status(bit="N", value=n)
+        ps.set_status(bit="Z", value=z)
+        if v is not None:
+            ps.set_status(bit="V", value=v)
+        if c is not None:
+            ps.set_status(bit="C", value=c)
+
+    def _single_operand(self, command: AbstractCommand):
+        _, extension = self._extension_words(command)
+        size = command.size
+        value, address = self._fetch(command.dest_operand, size, extension)
+        result = self._alu[command.type](value, size)
+        if command.dest_stored:
+            self._store_operand(command.dest_operand, size, address, result)
+
+    def _double_operand(self, command: AbstractCommand):
+        src_extension, dest_extension = self._extension_words(command)
+        size = command.size
+        src, _ = self._fetch(command.src_operand, size, src_extension)
+        dest, address = self._fetch(command.dest_operand, size, dest_extension)
+        result = self._alu[command.type](src, dest, size)
+        if command.dest_stored:
+            self._store_operand(command.dest_operand, size, address, result)
+
+    def _mov(self, command: AbstractCommand):
+        src_extension, dest_extension = self._extension_words(command)
+        size = command.size
+        value, _ = self._fetch(command.src_operand, size, src_extension)
+        _, address = self._fetch(command.dest_operand, size, dest_extension, fetch_value=False)
+
+        negative = value & self.SIGNS[size] != 0
+        self._set_flags(n=negative, z=value == 0, v=False)
+        if command.on_byte and command.dest_operand.mode == 0:
+            size = "word"
+            value = value | 0xFF00 if negative else value
+        self._store_operand(command.dest_operand, size, address, value)
+
+    def _mul(self, command: AbstractCommand):
+        src_extension, _ = self._extension_words(command)
+        src, _ = self._fetch(command.src_operand, "word", src_extension)
+        reg = command.dest_operand.reg
+        dest = self._get_register(reg)
+
+        result = _signed(dest, "word") * _signed(src, "word")
+        self._set_flags(n=result < 0, z=result == 0, v=False)
+        if not -0x8000 <= result <= 0x7FFF:
+            self._program_status.set_status(bit="C", value=True)
+
+        result &= 0xFFFFFFFF
+        self._set_register(reg, result & 0xFFFF)
+        if reg % 2 == 0:
+            self._set_register(reg + 1, result >> 16)
+
+    def _branch(self, command: AbstractCommand):
+        ps = self._program_status
+        if self._conditions[command.type](ps.get_status(bit="N"), ps.get_status(bit="Z"),
+                                          ps.get_status(bit="V"), ps.get_status(bit="C")):
+            self._set_register(self.PC, self._get_register(self.PC) + command.offset * 2)
+
+    def _sob(self, command: AbstractCommand):
+        reg = command.dest_operand.reg
+        value = (self._get_register(reg) - 1) & 0xFFFF
+        self._set_register(reg, value)
+        if value != 0:
+            self._set_register(self.PC, self._get_register(self.PC) - command.offset * 2)
+
+    def _jmp(self, command: AbstractCommand):
+        _, extension = self._extension_words(command)
+        _, address = self._fetch(command.dest_operand, "word", extension, fetch_value=False)
+        self._set_register(self.PC, address)
+
+    def _jsr(self, command: AbstractCommand):
+        _, extension = self._extension_words(command)
+        _, address = self._fetch(command.dest_operand, "word", extension, fetch_value=False)
+        reg = command.src_operand.reg
+        value = self._get_register(reg)
+        sp = self._get_register(self.SP) - 2
+        self._set_register(self.SP, sp)
+        self._store(sp, "word", value)
+        self._set_register(reg, self._get_register(self.PC))
+        self._set_register(self.PC, address)
+
+    def _rts(self, command: AbstractCommand):
+        reg = command.src_operand.reg
+        value = self._get_register(reg)
+        sp = self._get_register(self.SP)
+        self._set_register(self.SP, sp + 2)
+        popped = self._load(sp, "word")
+        self._set_register(self.PC, value)
+        self._set_register(reg, popped)
+
+    def _mark(self, command: AbstractCommand):
+        sp = (self._get_register(self.SP) + command.number * 2) & 0xFFFF
+        r5 = self._get_register(5)
+        value = self._load(sp, "word")
+        self._set_register(self.SP, sp + 2)
+        self._set_register(5, value)
+        self._set_register(self.PC, r5)
+
+    def _rti(self, command: AbstractCommand):
+        sp = self._get_register(self.SP)
+        pc = self._load(sp, "word")
+        ps = self._load((sp + 2) & 0xFFFF, "word")
+        self._program_status.set(size="word", signed=False, value=ps)
+        self._set_register(self.SP, sp + 4)
+        self._set_register(self.PC, pc)
+
+    def _clr(self, value: int, size: str) -> int:
+        self._program_status.clear()
+        self._program_status.set_status(bit="Z", value=True)
+        return 0
+
+    def _com(self, value: int, size: str) -> int:
+        result = ~value & self.MASKS[size]
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=False, c=True)
+        return result
+
+    def _inc(self, value: int, size: str) -> int:
+        result = (value + 1) & self.MASKS[size]
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=result == self.SIGNS[size])
+        return result
+
+    def _dec(self, value: int, size: str) -> int:
+        result = (value - 1) & self.MASKS[size]
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=value == self.SIGNS[size])
+        return result
+
+    def _neg(self, value: int, size: str) -> int:
+        result = -value & self.MASKS[size]
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=result == self.SIGNS[size],
+                        c=result != 0)
+        return result
+
+    def _tst(self, value: int, size: str) -> int:
+        self._program_status.clear()
+        self._set_flags(n=value & self.SIGNS[size] != 0, z=value == 0)
+        return value
+
+    def _asr(self, value: int, size: str) -> int:
+        result = (value >> 1) | (value & self.SIGNS[size])
+        carry = value & 1 == 1
+        negative = result & self.SIGNS[size] != 0
+        self._set_flags(n=negative, z=result == 0, v=carry ^ negative, c=carry)
+        return result
+
+    def _asl(self, value: int, size: str) -> int:
+        carry = value & self.SIGNS[size] != 0
+        result = (value << 1) & self.MASKS[size]
+        negative = result & self.SIGNS[size] != 0
+        self._set_flags(n=negative, z=result == 0, v=carry ^ negative, c=carry)
+        return result
+
+    def _ror(self, value: int, size: str) -> int:
+        carry = value & 1 == 1
+        result = (value >> 1) | (self.SIGNS[size] if self._program_status.get_status(bit="C") else 0)
+        negative = result & self.SIGNS[size] != 0
+        self._set_flags(n=negative, z=result == 0, v=carry ^ negative, c=carry)
+        return result
+
+    def _rol(self, value: int, size: str) -> int:
+        carry = value & self.SIGNS[size] != 0
+        result = ((value << 1) & self.MASKS[size]) | (1 if self._program_status.get_status(bit="C") else 0)
+        negative = result & self.SIGNS[size] != 0
+        self._set_flags(n=negative, z=result == 0, v=carry ^ negative, c=carry)
+        return result
+
+    def _swab(self, value: int, size: str) -> int:
+        result = ((value & 0xFF) << 8) | (value >> 8)
+        self._program_status.clear()
+        self._set_flags(n=result & 0x80 != 0, z=result & 0xFF == 0)
+        return result
+
+    def _adc(self, value: int, size: str) -> int:
+        carry = self._program_status.get_status(bit="C")
+        result = (value + (1 if carry else 0)) & self.MASKS[size]
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0,
+                        v=carry and value == self.SIGNS[size] - 1, c=carry and value == self.MASKS[size])
+        return result
+
+    def _sbc(self, value: int, size: str) -> int:
+        carry = self._program_status.get_status(bit="C")
+        result = (value - (1 if carry else 0)) & self.MASKS[size]
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=value == self.SIGNS[size],
+                        c=not (value == 0 and carry))
+        return result
+
+    def _sxt(self, value: int, size: str) -> int:
+        result = 0xFFFF if self._program_status.get_status(bit="N") else 0
+        self._program_status.set_status(bit="Z", value=result == 0)
+        return result
+
+    def _cmp(self, src: int, dest: int, size: str) -> int:
+        result = (src - dest) & self.MASKS[size]
+        sign = self.SIGNS[size]
+        self._set_flags(n=result & sign != 0, z=result == 0, v=(dest ^ src) & sign != 0 and (dest ^ result) & sign == 0,
+                        c=src < dest)
+        return result
+
+    def _add(self, src: int, dest: int, size: str) -> int:
+        result = (dest + src) & 0xFFFF
+        self._set_flags(n=result & 0x8000 != 0, z=result == 0,
+                        v=(dest ^ src) & 0x8000 == 0 and (src ^ result) & 0x8000 != 0, c=dest + src > 0xFFFF)
+        return result
+
+    def _sub(self, src: int, dest: int, size: str) -> int:
+        result = (dest - src) & 0xFFFF
+        self._set_flags(n=result & 0x8000 != 0, z=result == 0,
+                        v=(dest ^ src) & 0x8000 != 0 and (src ^ result) & 0x8000 == 0, c=dest < src)
+        return result
+
+    def _bit(self, src: int, dest: int, size: str) -> int:
+        result = src & dest
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=False)
+        return result
+
+    def _bic(self, src: int, dest: int, size: str) -> int:
+        result = ~src & dest
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=False)
+        return result
+
+    def _bis(self, src: int, dest: int, size: str) -> int:
+        result = src | dest
+        self._set_flags(n=result & self.SIGNS[size] != 0, z=result == 0, v=False)
+        return result
+
+    def _xor(self, src: int, dest: int, size: str) -> int:
+        result = src ^ dest
+        self._set_flags(n=result & 0x8000 != 0, z=result == 0, v=False)
+        return result
+
+
+def _signed(value: int, size: str) -> int:
+    sign = FunctionalEngine.SIGNS[size]
+    return value - (sign << 1) if value & sign else value
@@ -1,7 +1,6 @@
+import threading
 from collections import deque
 
-from PyQt5.QtCore import QMutex
-
 from src.backend.engine.pipe import Pipe
 from src.backend.model.memory import Memory
 from src.backend.model.programstatus import ProgramStatus
@@ -25,16 +24,49 @@ class Keyboard:
         self._pc = program_counter
         self._sp = stack_pointer
         self._buffer = deque()
-        self._lock = QMutex()
+        self._lock = threading.Lock()
+        self._input_added = threading.Condition(self._lock)
 
     @property
     def interrupt_permitted(self) -> bool:
         return self._register.interrupt_permitted
 
+    @property
+    def interrupt_pending(self) -> bool:
+        self._lock.acquire()
+        pending = self._register.interrupt_permitted and len(self._buffer) != 0
+        self._lock.release()
+        return pending
+
+    def wait_for_interrupt(self, timeout: int) -> bool:
+        self._lock.acquire()
+        if not self._register.interrupt_permitted or len(self._buffer) == 0:
+            self._input_added.wait(timeout / 1000)
+        pending = self._register.interrupt_permitted and len(self._buffer) != 0
+        self._lock.release()
+        return pending
+
+    def wake(self):
+        self._lock.acquire()
+        self._input_added.notify_all()
+        self._lock.release()
+
+    def snapshot(self) -> tuple:
+        self._lock.acquire()
+        keys = tuple(self._buffer)
+        self._lock.release()
+        return keys
+
+    def restore(self, keys: tuple):
+        self._lock.acquire()
+        self._buffer.clear()
+        self._buffer.extend(keys)
+        self._lock.release()
+
     def interrupt(self) -> bool:
-        self._lock.lock()
+        self._lock.acquire()
         if not self._register.interrupt_permitted or len(self._buffer) == 0:
-            self._lock.unlock()
+            self._lock.release()
             return False
 
         self._register.interrupt_permitted = False
@@ -42,44 +74,50 @@ class Keyboard:
         self._pipe.barrier()
 
         self._sp.dec(value=2)
-        self._memory.store(address=self._sp.get(size="word", signed=False), size="word", value=self._ps.word())
+        self._memory.store_word(self._sp.get(size="word", signed=False), self._ps.get(size="word", signed=False))
 
         self._sp.dec(value=2)
-        self._memory.store(address=self._sp.get(size="word", signed=False), size="word", value=self._pc.word())
+        self._memory.store_word(self._sp.get(size="word", signed=False), self._pc.get(size="word", signed=False))
 
-        self._pc.set_word(value=self._memory.load(address=self.INTERRUPT_VECTOR["PC"], size="word"))
-        self._ps.set_word(value=self._memory.load(address=self.INTERRUPT_VECTOR["PS"], size="word"))
+        self._pc.set(size="word", signed=False, value=self._memory.load_word(self.INTERRUPT_VECTOR["PC"]))
+        self._ps.set(size="word", signed=False, value=self._memory.load_word(self.INTERRUPT_VECTOR["PS"]))
 
         self._pipe.add_command()
-        self._lock.unlock()
+        self._lock.release()
         return True
 
     def add_alpha(self, alpha: str):
-        self._lock.lock()
+        self._lock.acquire()
         key_index = self.ALPHABET.find(alpha)
         if key_index == -1:
+            self._lock.release()
             print("warning: symbol is not an alpha or is not lower cased")
             return
 
         self._buffer.append(key_index)
-        self._lock.unlock()
+        self._input_added.notify_all()
+        self._lock.release()
 
     def add_enter(self):
-        self._lock.lock()
+        self._lock.acquire()
         self._buffer.append(self.ENTER)
-        self._lock.unlock()
+        self._input_added.notify_all()
+        self._lock.release()
 
     def add_backspace(self):
-        self._lock.lock()
+        self._lock.acquire()
         self._buffer.append(self.BACKSPACE)
-        self._lock.unlock()
+        self._input_added.notify_all()
+        self._lock.release()
 
     def add_space(self):
-        self._lock.lock()
+        self._lock.acquire()
         self._buffer.append(self.SPACE)
-        self._lock.unlock()
+        self._input_added.notify_all()
+        self._lock.release()
 
     def add_hyphen(self):
-        self._lock.lock()
+        self._lock.acquire()
         self._buffer.append(self.HYPHEN)
-        self._lock.unlock()
+        self._input_added.notify_all()
+        self._lock.release()
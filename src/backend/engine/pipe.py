@@ -1,14 +1,16 @@
 import enum
-from PyQt5.QtCore import QMutex
+import sys
 from collections import deque
 
 from bitarray import bitarray
 
 from src.backend.engine.cash import CashMemory
 from src.backend.engine.pool_registers import PoolRegisters
-from src.backend.model.commands import AbstractCommand, Operation, JumpCommand, BranchCommand, Commands
+from src.backend.model.commands import AbstractCommand, Operation, JumpCommand, BranchCommand, Commands, \
+    CommandContext
 from src.backend.model.programstatus import ProgramStatus
 from src.backend.utils.exceptions import EmulatorException
+from src.backend.utils.statistics import PipeStatistics
 
 
 class PipeComponentState(enum.Enum):
@@ -20,6 +22,10 @@ class PipeComponentState(enum.Enum):
     FINISHED = enum.auto()
 
 
+# Returned by PipeComponent.countdown() when a component waits on others and has no event of its own
+NO_EVENT = sys.maxsize
+
+
 class Execution:
     def __init__(self, cycles: int, callback=None):
         self._cycles_left = cycles
@@ -34,6 +40,14 @@ class Execution:
         if self._callback is not None:
             self._callback()
 
+    @property
+    def cycles_left(self) -> int:
+        return self._cycles_left
+
+    def skip(self, cycles: int) -> None:
+        assert cycles < self._cycles_left
+        self._cycles_left -= cycles
+
     def cycle(self) -> None:
         if self._done:
             return
@@ -42,6 +56,86 @@ class Execution:
         self._done = self._cycles_left == 0
 
 
+# Integer opcodes of micro-ops
+OP_DECODE = Operation.DECODE.value
+OP_EXECUTE = Operation.EXECUTE.value
+OP_FETCH_NEXT_INSTRUCTION = Operation.FETCH_NEXT_INSTRUCTION.value
+OP_FETCH_REGISTER = Operation.FETCH_REGISTER.value
+OP_FETCH_ADDRESS = Operation.FETCH_ADDRESS.value
+OP_STORE_REGISTER = Operation.STORE_REGISTER.value
+OP_STORE_ADDRESS = Operation.STORE_ADDRESS.value
+OP_INCREMENT_REGISTER = Operation.INCREMENT_REGISTER.value
+OP_DECREMENT_REGISTER = Operation.DECREMENT_REGISTER.value
+OP_BRANCH_IF = Operation.BRANCH_IF.value
+OP_ALU = Operation.ALU.value
+
+
+class MicroOp:
+    __slots__ = ("code", "size", "register", "value", "cycles", "callback", "address", "condition", "offset",
+                 "unblock")
+
+    def __init__(self, operation):
+        self.code = operation["operation"].value
+        self.size = operation.get("size")
+        self.register = operation.get("register")
+        self.value = operation.get("value")
+        self.cycles = operation.get("cycles")
+        self.callback = operation.get("callback")
+        self.address = operation.get("address")
+        self.condition = operation.get("if")
+        self.offset = operation.get("offset")
+        # DataWriter: the register stored by this op may be unblocked once it is written
+        self.unblock = False
+
+
+class CompiledCommand:
+    # Operations of a command split into the micro-op sequence of every pipe component. Built once per
+    # instruction word; per-instruction state lives in the CommandContext
+    PC = 7
+
+    __slots__ = ("command", "fetches", "next", "operands", "blreg", "blmem", "alu", "writes", "stored_addresses",
+                 "branch")
+
+    FIRST_FETCH = MicroOp({"operation": Operation.FETCH_NEXT_INSTRUCTION, "size": "word",
+                           "callback": lambda ctx, instr: None})
+
+    def __init__(self, command: AbstractCommand):
+        operations = list(MicroOp(op) for op in command)
+        self.command = command
+        self.branch = isinstance(command, (JumpCommand, BranchCommand))
+
+        self.fetches = (self.FIRST_FETCH,) + tuple(op for op in operations if op.code == OP_FETCH_NEXT_INSTRUCTION)
+
+        assert sum(1 for op in operations if op.code == OP_DECODE) == 1
+        self.next = command.num_next_instructions != 0
+
+        self.operands = tuple(op for op in operations
+                              if op.code in (OP_FETCH_REGISTER, OP_FETCH_ADDRESS, OP_INCREMENT_REGISTER,
+                                             OP_DECREMENT_REGISTER, OP_EXECUTE))
+        blreg, blmem = [], []
+        for op in operations:
+            if op.code == OP_STORE_REGISTER:
+                blreg.append(op.register)
+            elif op.code == OP_BRANCH_IF:
+                blreg.append(self.PC)
+            elif op.code == OP_STORE_ADDRESS:
+                blmem.append(op.address)
+        self.blreg = tuple(blreg)
+        self.blmem = tuple(blmem)
+
+        self.alu = tuple(op for op in operations if op.code == OP_ALU)
+
+        writes = list(op for op in operations if op.code in (OP_STORE_REGISTER, OP_STORE_ADDRESS, OP_BRANCH_IF))
+        for num, op in enumerate(writes):
+            if op.code == OP_STORE_ADDRESS:
+                continue
+            reg = op.register if op.code == OP_STORE_REGISTER else self.PC
+            op.unblock = all(later.code == OP_STORE_REGISTER and later.register != reg or
+                             later.code == OP_BRANCH_IF and reg != self.PC for later in writes[num + 1:])
+        self.writes = tuple(writes)
+        self.stored_addresses = tuple(op.address for op in writes if op.code == OP_STORE_ADDRESS)
+
+
 class PipeComponent:
     def __init__(self):
         self._worked = False
@@ -70,7 +164,15 @@ class PipeComponent:
     def new_cycle(self):
         self._worked = False
 
-    def add_command(self, command: AbstractCommand):
+    def countdown(self) -> int:
+        # Cycles until an in-progress component changes state on its own: 0 if it may progress on the next
+        # cycle, NO_EVENT if it only waits for another component
+        return 0
+
+    def skip(self, cycles: int) -> None:
+        pass
+
+    def add_command(self, compiled: CompiledCommand, ctx: CommandContext):
         raise NotImplementedError()
 
     def cycle(self) -> bool:
@@ -104,21 +206,16 @@ class InstructionFetcher(PipeComponent):
     def set_decoder(self, decoder):
         self._decoder = decoder
 
+    def countdown(self) -> int:
+        return NO_EVENT if self._next_instruction is not None and not self._decoded else 0
+
     def command_decoded(self):
         self._decoded = True
         if self._state == PipeComponentState.IN_PROGRESS and self._next_instruction is not None:
             self._worked = True
 
-    def add_command(self, command: AbstractCommand):
-        com = [{"operation": Operation.FETCH_NEXT_INSTRUCTION,
-                "size": "word",
-                "callback": lambda instr: None}]
-
-        for op in command:
-            if op["operation"] == Operation.FETCH_NEXT_INSTRUCTION:
-                com.append(op)
-
-        self._commandsQueue.append(com)
+    def add_command(self, compiled: CompiledCommand, ctx: CommandContext):
+        self._commandsQueue.append((compiled.fetches, ctx))
         if self._state == PipeComponentState.WAIT_NEXT_COMMAND:
             assert len(self._commandsQueue) == 1
             self._state = PipeComponentState.IN_PROGRESS
@@ -129,10 +226,11 @@ class InstructionFetcher(PipeComponent):
             return False
 
         self._worked = True
+        ops, ctx = self._commandsQueue[0]
         if self._state == PipeComponentState.IN_PROGRESS:
             if self._next_instruction is not None:
                 if self._decoded:
-                    self._commandsQueue[0][self._opnum]["callback"](self._next_instruction)
+                    ops[self._opnum].callback(ctx, self._next_instruction)
                     self._opnum += 1
                     self._next_instruction = None
 
@@ -143,8 +241,7 @@ class InstructionFetcher(PipeComponent):
                 success, self._address = self._registers.get(regnum=self.PC, size="word", signed=False)
                 assert success
 
-                success, instr = self._imem.load(address=self._address,
-                                                 size=self._commandsQueue[0][self._opnum]["size"])
+                success, instr = self._imem.load(address=self._address, size=ops[self._opnum].size)
 
                 if success and self._opnum != 0:
                     self._next_instruction = instr
@@ -160,8 +257,7 @@ class InstructionFetcher(PipeComponent):
                     self._rw = 'r'
 
         elif self._state == PipeComponentState.WAIT_INSTRUCTION:
-            success, instr = self._imem.load(address=self._address,
-                                             size=self._commandsQueue[0][self._opnum]["size"])
+            success, instr = self._imem.load(address=self._address, size=ops[self._opnum].size)
 
             if success and self._opnum != 0:
                 self._next_instruction = instr
@@ -174,7 +270,7 @@ class InstructionFetcher(PipeComponent):
                 success, _ = self._registers.inc_fetch(regnum=self.PC, value=2)
                 assert success
 
-        if self._opnum == len(self._commandsQueue[0]) and self._state != PipeComponentState.FINISHED:
+        if self._opnum == len(ops) and self._state != PipeComponentState.FINISHED:
             self._commandsQueue.popleft()
             self._state = PipeComponentState.WAIT_NEXT_COMMAND
             self._decoded = False
@@ -184,7 +280,7 @@ class InstructionFetcher(PipeComponent):
 
     def continue_(self):
         assert self._state == PipeComponentState.FINISHED
-        if self._opnum == len(self._commandsQueue[0]):
+        if self._opnum == len(self._commandsQueue[0][0]):
             self._commandsQueue.popleft()
             self._state = PipeComponentState.WAIT_NEXT_COMMAND
 
@@ -201,25 +297,17 @@ class Decoder(PipeComponent):
     def set_fetcher(self, fetcher: InstructionFetcher):
         self._fetcher = fetcher
 
+    def countdown(self) -> int:
+        return NO_EVENT if self._wait_for_fetching else 0
+
     def instruction_fetched(self):
         assert self._wait_for_fetching
         self._state = PipeComponentState.FINISHED
         self._wait_for_fetching = False
         self._worked = True
 
-    def add_command(self, command: AbstractCommand):
-        com = dict(ops=[])
-        if command.num_next_instructions != 0:
-            com["next"] = True
-        else:
-            com["next"] = False
-
-        for op in command:
-            if op["operation"] == Operation.DECODE:
-                com["ops"].append(op)
-
-        assert len(com["ops"]) == 1
-        self._commandsQueue.append(com)
+    def add_command(self, compiled: CompiledCommand, ctx: CommandContext):
+        self._commandsQueue.append(compiled.next)
         if self._state == PipeComponentState.WAIT_NEXT_COMMAND:
             assert len(self._commandsQueue) == 1
             self._state = PipeComponentState.WAIT_PREV_COMPONENT
@@ -233,7 +321,7 @@ class Decoder(PipeComponent):
 
         self._worked = True
         assert self._state == PipeComponentState.IN_PROGRESS
-        if self._commandsQueue[0]["next"]:
+        if self._commandsQueue[0]:
             self._fetcher.command_decoded()
             self._wait_for_fetching = True
 
@@ -255,22 +343,17 @@ class OperandsFetcher(PipeComponent):
         self._num_block = 0
         self._execution: Execution = None
 
-    def add_command(self, command: AbstractCommand):
-        com = dict(ops=[], blreg=[], blmem=[])
-
-        for op in command:
-            if op["operation"] in (Operation.FETCH_REGISTER, Operation.FETCH_ADDRESS, Operation.INCREMENT_REGISTER,
-                                   Operation.DECREMENT_REGISTER, Operation.EXECUTE):
-                com["ops"].append(op)
+    def countdown(self) -> int:
+        if self._execution is None or self._blocking_reg or self._blocking_mem:
+            return 0
+        return self._execution.cycles_left
 
-            elif op["operation"] == Operation.STORE_REGISTER:
-                com["blreg"].append(op["register"])
-            elif op["operation"] == Operation.BRANCH_IF:
-                com["blreg"].append(self.PC)
-            elif op["operation"] == Operation.STORE_ADDRESS:
-                com["blmem"].append(op["address"])
+    def skip(self, cycles: int) -> None:
+        if self._execution is not None:
+            self._execution.skip(cycles)
 
-        self._commandsQueue.append(com)
+    def add_command(self, compiled: CompiledCommand, ctx: CommandContext):
+        self._commandsQueue.append((compiled.operands, compiled.blreg, compiled.blmem, ctx))
         if self._state == PipeComponentState.WAIT_NEXT_COMMAND:
             assert len(self._commandsQueue) == 1
             self._state = PipeComponentState.WAIT_PREV_COMPONENT
@@ -281,8 +364,8 @@ class OperandsFetcher(PipeComponent):
                                            PipeComponentState.WAIT_NEXT_COMMAND):
             return False
 
-        if len(self._commandsQueue[0]["ops"]) == 0 and len(self._commandsQueue[0]["blreg"]) == 0 \
-                and len(self._commandsQueue[0]["blmem"]) == 0:
+        ops, blreg, blmem, ctx = self._commandsQueue[0]
+        if not ops and not blreg and not blmem:
             self._state = PipeComponentState.FINISHED
             return False
 
@@ -296,19 +379,19 @@ class OperandsFetcher(PipeComponent):
             self._block_mem()
             return True
 
-        if len(self._commandsQueue[0]["ops"]) == 0:
+        if not ops:
             self._num_block = 0
             self._block_reg()
             return True
 
         self._execute_null_cycle_operations()
-        if self._opnum == len(self._commandsQueue[0]["ops"]):
+        if self._opnum == len(ops):
             self._num_block = 0
             self._block_reg()
             return True
 
-        op = self._commandsQueue[0]["ops"][self._opnum]
-        optype = op["operation"]
+        op = ops[self._opnum]
+        code = op.code
         if self._state == PipeComponentState.IN_PROGRESS:
             if self._execution is not None:
                 self._execution.cycle()
@@ -317,86 +400,88 @@ class OperandsFetcher(PipeComponent):
                     self._opnum += 1
                     self._execution = None
 
-            elif optype == Operation.FETCH_REGISTER:
-                reg = op["register"]
-                success, bitarr = self._registers.byte(regnum=reg) if op["size"] == "byte" \
+            elif code == OP_FETCH_REGISTER:
+                reg = op.register
+                success, bitarr = self._registers.byte(regnum=reg) if op.size == "byte" \
                     else self._registers.word(regnum=reg)
                 if success:
-                    op["callback"](bitarr)
+                    op.callback(ctx, bitarr)
                     self._opnum += 1
 
-            elif optype == Operation.FETCH_ADDRESS:
-                self._address = op["address"]()
-                success, data = self._dmem.load(address=self._address, size=op["size"])
+            elif code == OP_FETCH_ADDRESS:
+                self._address = op.address(ctx)
+                success, data = self._dmem.load(address=self._address, size=op.size)
                 if success:
                     if self._address % 2 == 1:
-                        self._execution = Execution(2, lambda: op["callback"](data))
+                        self._execution = Execution(2, lambda: op.callback(ctx, data))
                     else:
-                        op["callback"](data)
+                        op.callback(ctx, data)
                         self._opnum += 1
                 else:
                     self._state = PipeComponentState.WAIT_DATA
                     self._rw = 'r'
 
-            elif optype == Operation.INCREMENT_REGISTER:
-                reg = op["register"]
+            elif code == OP_INCREMENT_REGISTER:
+                reg = op.register
                 assert reg != 7
-                success, _ = self._registers.inc_fetch(regnum=reg, value=op["value"])
+                success, _ = self._registers.inc_fetch(regnum=reg, value=op.value)
                 if success:
                     self._opnum += 1
 
-            elif optype == Operation.DECREMENT_REGISTER:
-                reg = op["register"]
+            elif code == OP_DECREMENT_REGISTER:
+                reg = op.register
                 assert reg != 7
-                success, _ = self._registers.dec_fetch(regnum=reg, value=op["value"])
+                success, _ = self._registers.dec_fetch(regnum=reg, value=op.value)
                 if success:
                     self._opnum += 1
 
-            elif optype == Operation.EXECUTE:
-                cycles = op["cycles"]
+            elif code == OP_EXECUTE:
+                cycles = op.cycles
                 if cycles == 1:
-                    op["callback"]()
+                    op.callback(ctx)
                     self._opnum += 1
 
                 if cycles > 1:
-                    self._execution = Execution(cycles, lambda: op["callback"]())
+                    self._execution = Execution(cycles, lambda: op.callback(ctx))
                     self._execution.cycle()
 
         elif self._state == PipeComponentState.WAIT_DATA:
-            assert optype == Operation.FETCH_ADDRESS
-            success, data = self._dmem.load(address=self._address, size=op["size"])
+            assert code == OP_FETCH_ADDRESS
+            success, data = self._dmem.load(address=self._address, size=op.size)
             if success:
                 self._state = PipeComponentState.IN_PROGRESS
                 if self._address % 2 == 1:
-                    self._execution = Execution(2, lambda: op["callback"](data))
+                    self._execution = Execution(2, lambda: op.callback(ctx, data))
                 else:
-                    op["callback"](data)
+                    op.callback(ctx, data)
                     self._opnum += 1
 
-        if self._opnum == len(self._commandsQueue[0]["ops"]):
+        if self._opnum == len(ops):
             self._num_block = 0
             self._block_reg()
 
         return True
 
     def _execute_null_cycle_operations(self):
-        while self._opnum < len(self._commandsQueue[0]["ops"]):
-            op = self._commandsQueue[0]["ops"][self._opnum]
-            if op["operation"] == Operation.EXECUTE and op["cycles"] == 0:
-                op["callback"]()
+        ops, _, _, ctx = self._commandsQueue[0]
+        while self._opnum < len(ops):
+            op = ops[self._opnum]
+            if op.code == OP_EXECUTE and op.cycles == 0:
+                op.callback(ctx)
                 self._opnum += 1
             else:
                 break
 
     def _block_reg(self):
-        while self._num_block < len(self._commandsQueue[0]["blreg"]):
-            success = self._registers.block(self._commandsQueue[0]["blreg"][self._num_block], True)
+        blreg = self._commandsQueue[0][1]
+        while self._num_block < len(blreg):
+            success = self._registers.block(blreg[self._num_block], True)
             if not success:
                 break
             else:
                 self._num_block += 1
 
-        if self._num_block < len(self._commandsQueue[0]["blreg"]):
+        if self._num_block < len(blreg):
             self._blocking_reg = True
         else:
             self._blocking_reg = False
@@ -404,16 +489,17 @@ class OperandsFetcher(PipeComponent):
             self._block_mem()
 
     def _block_mem(self):
-        while self._num_block < len(self._commandsQueue[0]["blmem"]):
+        _, _, blmem, ctx = self._commandsQueue[0]
+        while self._num_block < len(blmem):
             if self._state == PipeComponentState.IN_PROGRESS:
-                address = self._commandsQueue[0]["blmem"][self._num_block]()
+                address = blmem[self._num_block](ctx)
                 success = self._dmem.block(address, True)
                 if not success:
                     break
                 else:
                     self._num_block += 1
 
-        if self._num_block < len(self._commandsQueue[0]["blmem"]):
+        if self._num_block < len(blmem):
             self._blocking_mem = True
         else:
             self._blocking_mem = False
@@ -425,13 +511,15 @@ class ALU(PipeComponent):
         super(ALU, self).__init__()
         self._execution: Execution = None
 
-    def add_command(self, command: AbstractCommand):
-        com = []
-        for op in command:
-            if op["operation"] == Operation.ALU:
-                com.append(op)
+    def countdown(self) -> int:
+        return 0 if self._execution is None else self._execution.cycles_left
 
-        self._commandsQueue.append(com)
+    def skip(self, cycles: int) -> None:
+        if self._execution is not None:
+            self._execution.skip(cycles)
+
+    def add_command(self, compiled: CompiledCommand, ctx: CommandContext):
+        self._commandsQueue.append((compiled.alu, ctx))
         if self._state == PipeComponentState.WAIT_NEXT_COMMAND:
             assert len(self._commandsQueue) == 1
             self._state = PipeComponentState.WAIT_PREV_COMPONENT
@@ -442,33 +530,34 @@ class ALU(PipeComponent):
                                            PipeComponentState.WAIT_NEXT_COMMAND):
             return False
 
-        if len(self._commandsQueue[0]) == 0:
+        ops, ctx = self._commandsQueue[0]
+        if not ops:
             self._state = PipeComponentState.FINISHED
             return False
 
         self._worked = True
         assert self._state == PipeComponentState.IN_PROGRESS
 
-        op = self._commandsQueue[0][self._opnum]
+        op = ops[self._opnum]
         if self._execution is not None:
             self._execution.cycle()
             if self._execution.done:
-                op["callback"]()
+                op.callback(ctx)
                 self._opnum += 1
                 self._execution = None
 
         else:
-            cycles = op["cycles"]
+            cycles = op.cycles
             assert cycles > 0
             if cycles == 1:
-                op["callback"]()
+                op.callback(ctx)
                 self._opnum += 1
 
             elif cycles > 1:
                 self._execution = Execution(cycles)
                 self._execution.cycle()
 
-        if self._opnum == len(self._commandsQueue[0]):
+        if self._opnum == len(ops):
             self._state = PipeComponentState.FINISHED
 
         return True
@@ -483,14 +572,15 @@ class DataWriter(PipeComponent):
         self._dmem = dmem
         self._execution: Execution = None
 
-    def add_command(self, command: AbstractCommand):
-        com = []
+    def countdown(self) -> int:
+        return 0 if self._execution is None else self._execution.cycles_left
 
-        for op in command:
-            if op["operation"] in (Operation.STORE_REGISTER, Operation.STORE_ADDRESS, Operation.BRANCH_IF):
-                com.append(op)
+    def skip(self, cycles: int) -> None:
+        if self._execution is not None:
+            self._execution.skip(cycles)
 
-        self._commandsQueue.append(com)
+    def add_command(self, compiled: CompiledCommand, ctx: CommandContext):
+        self._commandsQueue.append((compiled.writes, compiled.stored_addresses, ctx))
         if self._state == PipeComponentState.WAIT_NEXT_COMMAND:
             assert len(self._commandsQueue) == 1
             self._state = PipeComponentState.WAIT_PREV_COMPONENT
@@ -501,14 +591,15 @@ class DataWriter(PipeComponent):
                                            PipeComponentState.WAIT_NEXT_COMMAND):
             return False
 
-        if len(self._commandsQueue[0]) == 0:
+        ops, _, ctx = self._commandsQueue[0]
+        if not ops:
             self._state = PipeComponentState.FINISHED
             return False
 
         self._worked = True
 
-        op = self._commandsQueue[0][self._opnum]
-        optype = op["operation"]
+        op = ops[self._opnum]
+        code = op.code
         if self._state == PipeComponentState.IN_PROGRESS:
             if self._execution is not None:
                 self._execution.cycle()
@@ -517,18 +608,20 @@ class DataWriter(PipeComponent):
                     self._opnum += 1
                     self._execution = None
 
-            elif optype == Operation.STORE_REGISTER:
-                reg = op["register"]
-                value = op["value"]()
-                success = self._registers.set_byte(regnum=reg, value=value) if op["size"] == "byte" \
+            elif code == OP_STORE_REGISTER:
+                reg = op.register
+                value = op.value(ctx)
+                success = self._registers.set_byte(regnum=reg, value=value) if op.size == "byte" \
                     else self._registers.set_word(regnum=reg, value=value)
                 assert success
                 self._opnum += 1
-                self._unblock_reg_if_stored(reg)
+                if op.unblock:
+                    success = self._registers.block(reg, False)
+                    assert success
 
-            elif optype == Operation.STORE_ADDRESS:
-                self._address = op["address"]()
-                success = self._dmem.store(address=self._address, size=op["size"], value=op["value"]())
+            elif code == OP_STORE_ADDRESS:
+                self._address = op.address(ctx)
+                success = self._dmem.store(address=self._address, size=op.size, value=op.value(ctx))
                 if success:
                     if self._address % 2 == 1:
                         self._execution = Execution(2, lambda: None)
@@ -538,17 +631,19 @@ class DataWriter(PipeComponent):
                     self._state = PipeComponentState.WAIT_DATA
                     self._rw = 'w'
 
-            elif optype == Operation.BRANCH_IF:
-                if op["if"]():
-                    success = self._registers.inc_store(regnum=self.PC, value=op["offset"])
+            elif code == OP_BRANCH_IF:
+                if op.condition(ctx):
+                    success = self._registers.inc_store(regnum=self.PC, value=op.offset)
                     assert success
 
                 self._opnum += 1
-                self._unblock_reg_if_stored(self.PC)
+                if op.unblock:
+                    success = self._registers.block(self.PC, False)
+                    assert success
 
         elif self._state == PipeComponentState.WAIT_DATA:
-            assert optype == Operation.STORE_ADDRESS
-            success = self._dmem.store(address=self._address, size=op["size"], value=op["value"]())
+            assert code == OP_STORE_ADDRESS
+            success = self._dmem.store(address=self._address, size=op.size, value=op.value(ctx))
             if success:
                 self._state = PipeComponentState.IN_PROGRESS
                 if self._address % 2 == 1:
@@ -556,28 +651,15 @@ class DataWriter(PipeComponent):
                 else:
                     self._opnum += 1
 
-        if self._opnum == len(self._commandsQueue[0]):
+        if self._opnum == len(ops):
             self._unblock_mem()
 
         return True
 
-    def _unblock_reg_if_stored(self, regnum: int):
-        stored = True
-        for opnum in range(self._opnum, len(self._commandsQueue[0])):
-            op = self._commandsQueue[0][opnum]
-            stored = stored and (op["operation"] == Operation.STORE_REGISTER and op["register"] != regnum or
-                                 op["operation"] == Operation.BRANCH_IF and regnum != 7)
-
-        if stored:
-            success = self._registers.block(regnum, False)
-            assert success
-
     def _unblock_mem(self):
-        for op in self._commandsQueue[0]:
-            if op["operation"] != Operation.STORE_ADDRESS:
-                continue
-
-            success = self._dmem.block(op["address"](), False)
+        _, stored_addresses, ctx = self._commandsQueue[0]
+        for address in stored_addresses:
+            success = self._dmem.block(address(ctx), False)
             assert success
 
         self._state = PipeComponentState.FINISHED
@@ -587,69 +669,74 @@ class Pipe:
     PC = 7
 
     def __init__(self, dmem: CashMemory, imem: CashMemory, pool_registers: PoolRegisters,
-                 ps: ProgramStatus, commands: dict=None, enabled=True):
-        instr_fetcher = InstructionFetcher(imem, pool_registers)
-        decoder = Decoder()
-        instr_fetcher.set_decoder(decoder)
-        decoder.set_fetcher(instr_fetcher)
-
-        self._components = [instr_fetcher, decoder]
-        self._components.append(OperandsFetcher(dmem, pool_registers))
-        self._components.append(ALU())
-        self._components.append(DataWriter(dmem, pool_registers))
+                 ps: ProgramStatus, enabled=True):
         self._program_status = ps
-        self._commands: dict = commands
+        self._pool_registers = pool_registers
         self._pc = pool_registers.registers[self.PC]
         self._imem = imem
         self._dmem = dmem
-
-        self._lock = QMutex()
+        self._components = self._build_components()
 
         self.enabled = enabled
         self._branch = False
         self._last_instruction_address = self._pc.get(size="word", signed=False)
-        self._instructions = 0
-        self._cycles = 0
+        self._statistics = PipeStatistics()
+        self._compiled = {}
         self._add_command()
+        # The command added last hasn't made any progress yet
+        self._pending = True
+
+    def _build_components(self) -> list:
+        instr_fetcher = InstructionFetcher(self._imem, self._pool_registers)
+        decoder = Decoder()
+        instr_fetcher.set_decoder(decoder)
+        decoder.set_fetcher(instr_fetcher)
+
+        components = [instr_fetcher, decoder]
+        components.append(OperandsFetcher(self._dmem, self._pool_registers))
+        components.append(ALU())
+        components.append(DataWriter(self._dmem, self._pool_registers))
+        return components
 
     @property
-    def cycles(self):
-        self._lock.lock()
-        res = self._cycles
-        self._lock.unlock()
-        return res
+    def statistics(self) -> PipeStatistics:
+        return self._statistics
 
-    @cycles.setter
-    def cycles(self, value):
-        self._lock.lock()
-        self._cycles = value
-        self._lock.unlock()
+    @property
+    def cycles(self):
+        return self._statistics.snapshot()[0]
 
     @property
     def instructions(self):
-        self._lock.lock()
-        res = self._instructions
-        self._lock.unlock()
-        return res
-
-    @instructions.setter
-    def instructions(self, value):
-        self._lock.lock()
-        self._instructions = value
-        self._lock.unlock()
+        return self._statistics.snapshot()[1]
 
     @property
     def last_instruction_address(self):
         return self._last_instruction_address
 
     def clear_statistics(self):
-        self._lock.lock()
-        self._instructions = 0
-        self._cycles = 0
-        self._lock.unlock()
+        self._statistics.clear()
+
+    def snapshot(self) -> tuple:
+        # Commands in flight can't be captured, so they are completed first, as before an interrupt. A command
+        # that hasn't started yet is recorded as pending and added again on restore.
+        if not self._pending:
+            self.barrier()
+        return self.enabled, self._pending, self._last_instruction_address, self._statistics.snapshot()
+
+    def restore(self, state: tuple):
+        self.enabled, pending, last_instruction_address, statistics = state
+        self._pool_registers.unblock_all()
+        self._components = self._build_components()
+        self._branch = False
+        if pending:
+            self._add_command()
+        self._pending = pending
+        self._last_instruction_address = last_instruction_address
+        self._statistics.restore(statistics)
 
     def cycle(self) -> bool:
-        self.cycles += 1
+        self._statistics.cycles += 1 + self._skip_stalled_cycles(fetch_new_instruction=True)
         new_command = False
         if self.empty() or self.enabled and self._components[0].state == PipeComponentState.WAIT_NEXT_COMMAND \
                 and not self._branch:
@@ -663,10 +750,10 @@ class Pipe:
     def barrier(self) -> int:
         cycles = 0
         while not self.empty():
-            cycles += 1
+            cycles += 1 + self._skip_stalled_cycles(fetch_new_instruction=False)
             self._progress(fetch_new_instruction=False)
 
-        self.cycles += cycles
+        self._statistics.cycles += cycles
         self._branch = False
         return cycles
 
@@ -682,8 +769,50 @@ class Pipe:
             raise EmulatorException(what="Cannot add command unconditionally")
 
         self._add_command()
+        self._pending = True
+
+    def _skip_stalled_cycles(self, fetch_new_instruction: bool) -> int:
+        # Cycles in which every component only waits for a bus request or counts down an execution change
+        # nothing but those counters, so they are skipped in one step up to the cycle the first one completes
+        if fetch_new_instruction and (self.empty() or self.enabled and not self._branch and
+                                      self._components[0].state == PipeComponentState.WAIT_NEXT_COMMAND):
+            return 0
+
+        event = NO_EVENT
+        for cash in (self._imem, self._dmem):
+            if cash.busy:
+                event = min(event, cash.cycles_to_ready)
+
+        last = len(self._components) - 1
+        for i, component in enumerate(self._components):
+            state = component.state
+            if state == PipeComponentState.WAIT_DATA and not self._dmem.busy \
+                    or state == PipeComponentState.WAIT_INSTRUCTION and not self._imem.busy:
+                return 0
+
+            if state == PipeComponentState.FINISHED and \
+                    (i == last or self._components[i + 1].state == PipeComponentState.WAIT_PREV_COMPONENT):
+                return 0
+
+            if state == PipeComponentState.IN_PROGRESS:
+                countdown = component.countdown()
+                if countdown == 0:
+                    return 0
+                event = min(event, countdown)
+
+        if event == NO_EVENT or event <= 1:
+            return 0
+
+        skipped = event - 1
+        self._imem.skip(skipped)
+        if self._dmem is not self._imem:
+            self._dmem.skip(skipped)
+        for component in self._components:
+            component.skip(skipped)
+        return skipped
 
     def _progress(self, fetch_new_instruction: bool) -> bool:
+        self._pending = False
         new_command = False
         for component in self._components:
             component.new_cycle()
@@ -738,18 +867,17 @@ class Pipe:
         return worked
 
     def _add_command(self):
-
-        self.instructions += 1
+        self._statistics.instructions += 1
         self._last_instruction_address = self._pc.get(size="word", signed=False)
 
-        if self._commands is None:
-            instr = self._imem.memory.load(address=self._last_instruction_address, size="word")
-            command = Commands.get_command_by_code(code=instr, program_status=self._program_status)
-        else:
-            command = self._commands[self._last_instruction_address]
+        code = self._imem.memory.load_word(self._last_instruction_address)
+        compiled = self._compiled.get(code)
+        if compiled is None:
+            compiled = self._compiled[code] = CompiledCommand(Commands.get_command_by_word(code=code))
+        ctx = compiled.command.new_context(program_status=self._program_status)
 
-        if isinstance(command, JumpCommand) or isinstance(command, BranchCommand):
+        if compiled.branch:
             self._branch = True
 
         for component in self._components:
-            component.add_command(command)
+            component.add_command(compiled, ctx)
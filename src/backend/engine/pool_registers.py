@@ -52,6 +52,9 @@ class PoolRegisters:
     def registers(self):
         return self._registers
 
+    def unblock_all(self):
+        self._blocked = [False for _ in range(8)]
+
     def block(self, regnum: int, block: bool) -> bool:
         if self._blocked[regnum] != block:
             self._blocked[regnum] = block
@@ -0,0 +1,156 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from src.backend.engine.cash import ReplacementPolicy, WritePolicy
+from src.backend.engine.emulator import EngineKind
+from src.backend.engine.snapshot import Snapshot
+from src.backend.model.memory import Memory
+from src.backend.utils.exceptions import SaveStateFormatException
+
+
+class SaveState:
+    """Versioned save-state file holding one Snapshot.
+
+    Layout, all little-endian: HEADER, the machine sections (registers and PSW, engine, video, keyboard,
+    icash, dcash), zero padding up to memory_offset, the raw 64K memory image and the packed VRAM. The
+    memory image starts on an mmap page boundary, so load() maps the file and slices the image straight into
+    snapshot pages without decoding it.
+    """
+
+    MAGIC = b"PDP11SAV"
+    VERSION = 3
+    HEADER = struct.Struct("<8sHBBII")
+    MACHINE = struct.Struct("<8HH3H")
+    ENGINE = struct.Struct("<BBHQQ")
+    VIDEO = struct.Struct("<BHHI")
+    KEYBOARD = struct.Struct("<H")
+    CASH = struct.Struct("<BIIIBBIIQQ")
+    ALIGNMENT = mmap.ALLOCATIONGRANULARITY
+
+    @staticmethod
+    def save(snapshot: Snapshot, path: str) -> None:
+        pages, devices, video = snapshot.memory
+        mode, VRAM_start, offset, vram = video
+        enabled, pending, last_instruction_address, (cycles, instructions) = snapshot.engine
+
+        sections = [SaveState.MACHINE.pack(*snapshot.registers, snapshot.program_status, *devices),
+                    SaveState.ENGINE.pack(enabled, pending, last_instruction_address, cycles, instructions),
+                    SaveState.VIDEO.pack(mode, VRAM_start, offset, len(vram)),
+                    SaveState.KEYBOARD.pack(len(snapshot.keyboard)), bytes(snapshot.keyboard)]
+        for cash in (snapshot.icash, snapshot.dcash):
+            sections.extend(SaveState._pack_cash(cash))
+
+        size = SaveState.HEADER.size + sum(len(section) for section in sections)
+        memory_offset = -(-size // SaveState.ALIGNMENT) * SaveState.ALIGNMENT
+        with open(path, "wb") as file:
+            file.write(SaveState.HEADER.pack(SaveState.MAGIC, SaveState.VERSION, snapshot.engine_kind.value,
+                                             snapshot.writing_glyph, size, memory_offset))
+            for section in sections:
+                file.write(section)
+            file.write(bytes(memory_offset - size))
+            for page in pages:
+                file.write(page)
+            file.write(vram)
+
+    @staticmethod
+    def read_header(data) -> (EngineKind, bool, int, int):
+        if len(data) < SaveState.HEADER.size:
+            raise SaveStateFormatException(what="file is too short")
+        magic, version, engine, writing_glyph, size, memory_offset = SaveState.HEADER.unpack_from(data)
+        if magic != SaveState.MAGIC:
+            raise SaveStateFormatException(what="not a save state")
+        if version != SaveState.VERSION:
+            raise SaveStateFormatException(what="unsupported version {}".format(version))
+        if engine not in (kind.value for kind in EngineKind):
+            raise SaveStateFormatException(what="unknown engine {}".format(engine))
+        if not size <= memory_offset <= len(data) - Memory.SIZE:
+            raise SaveStateFormatException(what="memory image is out of the file")
+        return EngineKind(engine), bool(writing_glyph), size, memory_offset
+
+    @staticmethod
+    def load(path: str) -> Snapshot:
+        with open(path, "rb") as file:
+            try:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SaveStateFormatException(what="file is empty")
+        try:
+            return SaveState._read(data)
+        except (struct.error, ValueError):
+            raise SaveStateFormatException(what="section is truncated")
+        finally:
+            data.close()
+
+    @staticmethod
+    def _read(data) -> Snapshot:
+        engine_kind, writing_glyph, size, memory_offset = SaveState.read_header(data)
+        position = SaveState.HEADER.size
+
+        machine = SaveState.MACHINE.unpack_from(data, position)
+        position += SaveState.MACHINE.size
+        enabled, pending, last_instruction_address, cycles, instructions = \
+            SaveState.ENGINE.unpack_from(data, position)
+        position += SaveState.ENGINE.size
+        mode, VRAM_start, offset, vram_size = SaveState.VIDEO.unpack_from(data, position)
+        position += SaveState.VIDEO.size
+        num_keys, = SaveState.KEYBOARD.unpack_from(data, position)
+        position += SaveState.KEYBOARD.size
+        keyboard = tuple(data[position: position + num_keys])
+        position += num_keys
+        icash, position = SaveState._unpack_cash(data, position)
+        dcash, position = SaveState._unpack_cash(data, position)
+        if position != size:
+            raise SaveStateFormatException(what="sections don't match the header")
+
+        vram_offset = memory_offset + Memory.SIZE
+        if len(data) != vram_offset + vram_size:
+            raise SaveStateFormatException(what="expected {} bytes of video".format(vram_size))
+        pages = tuple(data[start: start + Memory.PAGE_SIZE]
+                      for start in range(memory_offset, vram_offset, Memory.PAGE_SIZE))
+        video = (mode, VRAM_start, offset, data[vram_offset:])
+
+        return Snapshot(engine_kind=engine_kind, registers=machine[:8], program_status=machine[8],
+                        memory=(pages, machine[9:], video), icash=icash, dcash=dcash,
+                        engine=(bool(enabled), bool(pending), last_instruction_address, (cycles, instructions)),
+                        keyboard=keyboard, writing_glyph=writing_glyph)
+
+    @staticmethod
+    def _pack_cash(cash: tuple) -> list:
+        enabled, (sets, ways, line_size, replacement, write), tags, valid, dirty, missed, replacer, \
+            (hits, misses) = cash
+        tags = array('H', tags)
+        replacer = array('q', replacer)
+        if sys.byteorder != "little":
+            tags.byteswap()
+            replacer.byteswap()
+        return [SaveState.CASH.pack(enabled, sets, ways, line_size, replacement.value, write.value, len(tags),
+                                    len(replacer), hits, misses),
+                tags.tobytes(), valid, dirty, missed, replacer.tobytes()]
+
+    @staticmethod
+    def _unpack_cash(data, position: int) -> (tuple, int):
+        enabled, sets, ways, line_size, replacement, write, slots, num_replacer, hits, misses = \
+            SaveState.CASH.unpack_from(data, position)
+        if replacement not in (policy.value for policy in ReplacementPolicy):
+            raise SaveStateFormatException(what="unknown replacement policy {}".format(replacement))
+        if write not in (policy.value for policy in WritePolicy):
+            raise SaveStateFormatException(what="unknown write policy {}".format(write))
+        position += SaveState.CASH.size
+
+        tags = array('H')
+        tags.frombytes(data[position: position + 2 * slots])
+        position += 2 * slots
+        valid, dirty, missed = (data[position + i * slots: position + (i + 1) * slots] for i in range(3))
+        position += 3 * slots
+        replacer = array('q')
+        replacer.frombytes(data[position: position + 8 * num_replacer])
+        position += 8 * num_replacer
+        if sys.byteorder != "little":
+            tags.byteswap()
+            replacer.byteswap()
+
+        layout = (sets, ways, line_size, ReplacementPolicy(replacement), WritePolicy(write))
+        return (bool(enabled), layout, tuple(tags), valid, dirty, missed, tuple(replacer),
+                (hits, misses)), position
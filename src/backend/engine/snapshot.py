@@ -0,0 +1,26 @@
+class Snapshot:
+    """Machine state captured by Emulator.snapshot().
+
+    Memory is kept as a tuple of immutable pages, and pages that didn't change since the previous snapshot of
+    the same emulator are shared with it, so checkpoints of a long run cost little more than the pages written
+    in between. Every other part is a plain tuple produced by the snapshot() method of its owner.
+    """
+
+    __slots__ = ("engine_kind", "registers", "program_status", "memory", "icash", "dcash", "engine", "keyboard",
+                 "writing_glyph")
+
+    def __init__(self, engine_kind, registers: tuple, program_status: int, memory: tuple, icash: tuple,
+                 dcash: tuple, engine: tuple, keyboard: tuple, writing_glyph: bool):
+        self.engine_kind = engine_kind
+        self.registers = registers
+        self.program_status = program_status
+        self.memory = memory
+        self.icash = icash
+        self.dcash = dcash
+        self.engine = engine
+        self.keyboard = keyboard
+        self.writing_glyph = writing_glyph
+
+    @property
+    def pages(self) -> tuple:
+        return self.memory[0]
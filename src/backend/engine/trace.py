@@ -0,0 +1,81 @@
+import enum
+import struct
+import sys
+from array import array
+
+from src.backend.utils.exceptions import TraceFormatException
+
+
+class AccessKind(enum.IntEnum):
+    FETCH = 0
+    LOAD = 1
+    STORE = 2
+
+
+class AccessTrace:
+    # File layout: header, <count> little-endian 16-bit addresses, <count> AccessKind bytes
+    MAGIC = b"PDP11TRC"
+    VERSION = 1
+    HEADER = struct.Struct("<8sHI")
+
+    def __init__(self, addresses: array = None, kinds: array = None):
+        self._addresses = addresses if addresses is not None else array('H')
+        self._kinds = kinds if kinds is not None else array('B')
+        assert len(self._addresses) == len(self._kinds)
+
+    def __len__(self):
+        return len(self._addresses)
+
+    @property
+    def addresses(self) -> array:
+        return self._addresses
+
+    @property
+    def kinds(self) -> array:
+        return self._kinds
+
+    def record(self, kind: AccessKind, address: int) -> None:
+        self._addresses.append(address)
+        self._kinds.append(kind)
+
+    def clear(self) -> None:
+        del self._addresses[:]
+        del self._kinds[:]
+
+    def save(self, path: str) -> None:
+        addresses = array('H', self._addresses)
+        if sys.byteorder != "little":
+            addresses.byteswap()
+
+        with open(path, "wb") as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(self)))
+            file.write(addresses.tobytes())
+            file.write(self._kinds.tobytes())
+
+    @staticmethod
+    def read_header(data: bytes) -> int:
+        if len(data) < AccessTrace.HEADER.size:
+            raise TraceFormatException(what="file is too short")
+        magic, version, count = AccessTrace.HEADER.unpack_from(data)
+        if magic != AccessTrace.MAGIC:
+            raise TraceFormatException(what="not an access trace")
+        if version != AccessTrace.VERSION:
+            raise TraceFormatException(what="unsupported version {}".format(version))
+        if len(data) != AccessTrace.HEADER.size + 3 * count:
+            raise TraceFormatException(what="expected {} records".format(count))
+        return count
+
+    @staticmethod
+    def load(path: str) -> "AccessTrace":
+        with open(path, "rb") as file:
+            data = file.read()
+        count = AccessTrace.read_header(data)
+
+        offset = AccessTrace.HEADER.size
+        addresses = array('H')
+        addresses.frombytes(data[offset: offset + 2 * count])
+        if sys.byteorder != "little":
+            addresses.byteswap()
+        kinds = array('B')
+        kinds.frombytes(data[offset + 2 * count:])
+        return AccessTrace(addresses, kinds)
@@ -0,0 +1,318 @@
+from src.backend.model.commands import Commands, InstanceCommand, AbstractCommand, Operand
+from src.backend.model.memory import Memory
+from src.backend.model.programstatus import ProgramStatus
+from src.backend.utils.exceptions import EmulatorException
+
+
+class Block:
+    __slots__ = ("start", "end", "addresses", "length", "function")
+
+    def __init__(self, start: int, end: int, addresses: frozenset, length: int, function):
+        self.start = start
+        self.end = end
+        # Instruction addresses after the first one, checked against breakpoints
+        self.addresses = addresses
+        self.length = length
+        # None when the instruction at start cannot be translated and has to be interpreted
+        self.function = function
+
+
+class _Untranslatable(Exception):
+    pass
+
+
+class BlockTranslator:
+    """Translates straight-line code into one generated Python function per basic block.
+
+    A block starts at an entry PC and ends with a branch or SOB, which are translated, or before the next
+    instruction that is not: JMP, JSR, RTS, RTI, MARK, writes to PC and odd uses of PC or SP. R0-R5 and the
+    flags are held in locals and written back when the block returns or raises. The block returns early when
+    it stores into its own code. Results match FunctionalEngine instruction by instruction.
+    """
+
+    PC = 7
+    SP = 6
+    MAX_LENGTH = 64
+    END = "END"
+
+    SINGLE_OPERAND = {
+        InstanceCommand.CLR: ("low = 0", "t = 0", "n = False", "z = True", "v = False", "c = False"),
+        InstanceCommand.COM: ("t = ~x & {M}", "n = t & {S} != 0", "z = t == 0", "v = False", "c = True"),
+        InstanceCommand.INC: ("t = (x + 1) & {M}", "n = t & {S} != 0", "z = t == 0", "v = t == {S}"),
+        InstanceCommand.DEC: ("t = (x - 1) & {M}", "n = t & {S} != 0", "z = t == 0", "v = x == {S}"),
+        InstanceCommand.NEG: ("t = -x & {M}", "n = t & {S} != 0", "z = t == 0", "v = t == {S}", "c = t != 0"),
+        InstanceCommand.TST: ("low = 0", "t = x", "n = x & {S} != 0", "z = x == 0", "v = False", "c = False"),
+        InstanceCommand.ASR: ("t = (x >> 1) | (x & {S})", "carry = x & 1 == 1", "n = t & {S} != 0", "z = t == 0",
+                              "v = carry != n", "c = carry"),
+        InstanceCommand.ASL: ("carry = x & {S} != 0", "t = (x << 1) & {M}", "n = t & {S} != 0", "z = t == 0",
+                              "v = carry != n", "c = carry"),
+        InstanceCommand.ROR: ("carry = x & 1 == 1", "t = (x >> 1) | ({S} if c else 0)", "n = t & {S} != 0",
+                              "z = t == 0", "v = carry != n", "c = carry"),
+        InstanceCommand.ROL: ("carry = x & {S} != 0", "t = ((x << 1) & {M}) | (1 if c else 0)", "n = t & {S} != 0",
+                              "z = t == 0", "v = carry != n", "c = carry"),
+        InstanceCommand.SWAB: ("t = ((x & 0xFF) << 8) | (x >> 8)", "low = 0", "n = t & 0x80 != 0",
+                               "z = t & 0xFF == 0", "v = False", "c = False"),
+        InstanceCommand.ADC: ("carry = c", "t = (x + (1 if carry else 0)) & {M}", "n = t & {S} != 0", "z = t == 0",
+                              "v = carry and x == {S} - 1", "c = carry and x == {M}"),
+        InstanceCommand.SBC: ("carry = c", "t = (x - (1 if carry else 0)) & {M}", "n = t & {S} != 0", "z = t == 0",
+                              "v = x == {S}", "c = not (x == 0 and carry)"),
+        InstanceCommand.SXT: ("t = 0xFFFF if n else 0", "z = t == 0"),
+    }
+
+    DOUBLE_OPERAND = {
+        InstanceCommand.CMP: ("t = (s - x) & {M}", "n = t & {S} != 0", "z = t == 0",
+                              "v = (x ^ s) & {S} != 0 and (x ^ t) & {S} == 0", "c = s < x"),
+        InstanceCommand.ADD: ("t = (x + s) & 0xFFFF", "n = t & 0x8000 != 0", "z = t == 0",
+                              "v = (x ^ s) & 0x8000 == 0 and (s ^ t) & 0x8000 != 0", "c = x + s > 0xFFFF"),
+        InstanceCommand.SUB: ("t = (x - s) & 0xFFFF", "n = t & 0x8000 != 0", "z = t == 0",
+                              "v = (x ^ s) & 0x8000 != 0 and (s ^ t) & 0x8000 == 0", "c = x < s"),
+        InstanceCommand.BIT: ("t = s & x", "n = t & {S} != 0", "z = t == 0", "v = False"),
+        InstanceCommand.BIC: ("t = ~s & x", "n = t & {S} != 0", "z = t == 0", "v = False"),
+        InstanceCommand.BIS: ("t = s | x", "n = t & {S} != 0", "z = t == 0", "v = False"),
+        InstanceCommand.XOR: ("t = s ^ x", "n = t & 0x8000 != 0", "z = t == 0", "v = False"),
+    }
+
+    CONDITIONS = {
+        InstanceCommand.BR: "True", InstanceCommand.BNE: "not z", InstanceCommand.BEQ: "z",
+        InstanceCommand.BPL: "not n", InstanceCommand.BMI: "n", InstanceCommand.BVC: "not v",
+        InstanceCommand.BVS: "v", InstanceCommand.BCC: "not c", InstanceCommand.BCS: "c",
+        InstanceCommand.BGE: "n == v", InstanceCommand.BLT: "n != v", InstanceCommand.BGT: "not (z or n != v)",
+        InstanceCommand.BLE: "z or n != v", InstanceCommand.BHI: "not c and not z", InstanceCommand.BLOS: "c or z"
+    }
+
+    MASKS = {"byte": 0xFF, "word": 0xFFFF}
+    SIGNS = {"byte": 0x80, "word": 0x8000}
+
+    def __init__(self, memory: Memory, registers: list, ps: ProgramStatus):
+        self._memory = memory
+        self._registers = registers
+        self._program_status = ps
+
+    def translate(self, start: int) -> Block:
+        lines = []
+        addresses = []
+        self._used = set()
+        address = start
+        terminated = False
+
+        while len(addresses) < self.MAX_LENGTH and not terminated:
+            code = []
+            try:
+                next_address, terminated = self._instruction(code, address, len(addresses) + 1)
+            except (_Untranslatable, EmulatorException):
+                break
+
+            addresses.append(address)
+            lines.extend(code)
+            address = next_address
+
+        if len(addresses) == 0:
+            return Block(start, start + 2, frozenset(), 0, None)
+
+        if not terminated:
+            lines.append("return {}".format(len(addresses)))
+        function = self._compile(start, address, lines)
+        return Block(start, address, frozenset(addresses[1:]), len(addresses), function)
+
+    def _compile(self, start: int, end: int, lines: list):
+        registers = sorted(self._used)
+        source = ["def make(regs, ps, pc_reg, sp_reg, set_sp, load_word, load_byte, store_word, store_byte):",
+                  "    def block():"]
+        body = list("r{0} = regs[{0}]._value".format(reg) for reg in registers)
+        body += ["psv = ps._value", "low = psv & 0x0FFF", "v = psv & 0x8000 != 0", "n = psv & 0x4000 != 0",
+                 "c = psv & 0x2000 != 0", "z = psv & 0x1000 != 0", "pc = {}".format(start), "try:"]
+        body += list("    " + line.replace(self.END, str(end)) for line in lines)
+        body += ["finally:"]
+        body += list("    regs[{0}]._value = r{0}".format(reg) for reg in registers)
+        body += ["    ps._value = low | (0x8000 if v else 0) | (0x4000 if n else 0) | (0x2000 if c else 0) | "
+                 "(0x1000 if z else 0)",
+                 "    pc_reg._value = pc"]
+        source += list("        " + line for line in body)
+        source += ["    return block"]
+
+        namespace = {}
+        exec(compile("\n".join(source), "<block {:06o}-{:06o}>".format(start, end), "exec"), namespace)
+        registers = self._registers
+        sp = registers[self.SP]
+        memory = self._memory
+        return namespace["make"](registers, self._program_status, registers[self.PC], sp,
+                                 lambda value: sp.set(size="word", signed=False, value=value),
+                                 memory.load_word, memory.load_byte, memory.store_word, memory.store_byte)
+
+    def _instruction(self, out: list, address: int, num: int) -> (int, bool):
+        if self._memory.operation_on_device(address):
+            raise _Untranslatable()
+
+        command = Commands.get_command_by_word(code=self._memory.load_word(address))
+        kind = command.type
+        src_extension, dest_extension, next_address = self._extension_words(command, address)
+        if any(self._memory.operation_on_device(word) for word in range(address + 2, next_address, 2)):
+            raise _Untranslatable()
+
+        stored = []
+        if kind in self.SINGLE_OPERAND:
+            size = command.size
+            value, target = self._fetch(out, command.dest_operand, size, dest_extension, next_address, "d")
+            out.append("x = " + value)
+            out.extend(line.format(M=self.MASKS[size], S=self.SIGNS[size]) for line in self.SINGLE_OPERAND[kind])
+            if command.dest_stored:
+                self._store(out, command.dest_operand, size, target, "t", stored)
+
+        elif kind in self.DOUBLE_OPERAND:
+            size = command.size
+            src, _ = self._fetch(out, command.src_operand, size, src_extension, next_address, "s")
+            out.append("s = " + src)
+            dest, target = self._fetch(out, command.dest_operand, size, dest_extension, next_address, "d")
+            out.append("x = " + dest)
+            out.extend(line.format(M=self.MASKS[size], S=self.SIGNS[size]) for line in self.DOUBLE_OPERAND[kind])
+            if command.dest_stored:
+                self._store(out, command.dest_operand, size, target, "t", stored)
+
+        elif kind is InstanceCommand.MOV:
+            size = command.size
+            src, _ = self._fetch(out, command.src_operand, size, src_extension, next_address, "s")
+            out.append("t = " + src)
+            _, target = self._fetch(out, command.dest_operand, size, dest_extension, next_address, "d",
+                                    fetch_value=False)
+            out += ["n = t & {} != 0".format(self.SIGNS[size]), "z = t == 0", "v = False"]
+            if command.on_byte and command.dest_operand.mode == 0:
+                size = "word"
+                out.append("t = t | 0xFF00 if n else t")
+            self._store(out, command.dest_operand, size, target, "t", stored)
+
+        elif kind is InstanceCommand.MUL:
+            reg = command.dest_operand.reg
+            if reg in (self.SP, self.PC) or reg % 2 == 0 and reg + 1 in (self.SP, self.PC):
+                raise _Untranslatable()
+            src, _ = self._fetch(out, command.src_operand, "word", src_extension, next_address, "s")
+            out += ["s = " + src, "x = " + self._read(reg, next_address),
+                    "t = (x - 0x10000 if x & 0x8000 else x) * (s - 0x10000 if s & 0x8000 else s)",
+                    "n = t < 0", "z = t == 0", "v = False",
+                    "if not -0x8000 <= t <= 0x7FFF:", "    c = True",
+                    "t &= 0xFFFFFFFF"]
+            self._write(out, reg, "t & 0xFFFF")
+            if reg % 2 == 0:
+                self._write(out, reg + 1, "t >> 16")
+
+        elif kind in self.CONDITIONS:
+            target = (next_address + command.offset * 2) & 0xFFFF
+            self._branch(out, self.CONDITIONS[kind], target, next_address, num)
+            return next_address, True
+
+        elif kind is InstanceCommand.SOB:
+            reg = command.dest_operand.reg
+            if reg in (self.SP, self.PC):
+                raise _Untranslatable()
+            self._write(out, reg, "{} - 1".format(self._read(reg, next_address)))
+            target = (next_address - command.offset * 2) & 0xFFFF
+            self._branch(out, "r{} != 0".format(reg), target, next_address, num)
+            return next_address, True
+
+        else:
+            raise _Untranslatable()
+
+        # A store into code later in this block leaves the block, whose stale rest must not run
+        out.insert(0, "pc = {}".format(next_address))
+        for target in stored:
+            out += ["if {} <= {} < {}:".format(next_address, target, self.END), "    return {}".format(num)]
+        return next_address, False
+
+    def _branch(self, out: list, condition: str, target: int, next_address: int, num: int):
+        out.insert(0, "pc = {}".format(next_address))
+        if condition == "True":
+            out += ["pc = {}".format(target)]
+        else:
+            out += ["if {}:".format(condition), "    pc = {}".format(target)]
+        out.append("return {}".format(num))
+
+    def _extension_words(self, command: AbstractCommand, address: int) -> (int, int, int):
+        pc = (address + 2) & 0xFFFF
+        words = []
+        for operand in (command.src_operand, command.dest_operand):
+            if operand is None or not operand.require_next_instruction:
+                words.append(None)
+                continue
+
+            if operand.reg == self.PC and operand.mode == 2 and command.on_byte:
+                words.append(self._memory.load_byte(pc))
+            else:
+                words.append(self._memory.load_word(pc))
+            pc = (pc + 2) & 0xFFFF
+
+        return words[0], words[1], pc
+
+    def _read(self, reg: int, next_address: int) -> str:
+        if reg == self.PC:
+            return str(next_address)
+        if reg == self.SP:
+            return "sp_reg._value"
+        self._used.add(reg)
+        return "r{}".format(reg)
+
+    def _write(self, out: list, reg: int, expression: str):
+        if reg == self.PC:
+            raise _Untranslatable()
+        if reg == self.SP:
+            # Not wrapped around, so set_sp raises where the pipe does
+            out.append("set_sp({})".format(expression))
+        else:
+            self._used.add(reg)
+            out.append("r{} = ({}) & 0xFFFF".format(reg, expression))
+
+    def _fetch(self, out: list, operand: Operand, size: str, extension: int, next_address: int, tag: str,
+               fetch_value=True) -> (str, str):
+        reg, mode = operand.reg, operand.mode
+        if mode == 0:
+            if not fetch_value:
+                return None, None
+            value = self._read(reg, next_address)
+            return ("({} & 0xFF)".format(value) if size == "byte" else value), None
+
+        address = "address_" + tag
+        if reg == self.PC:
+            if mode == 2:
+                return str(extension), None
+            if mode == 1:
+                out.append("{} = {}".format(address, next_address))
+            elif mode == 3:
+                out.append("{} = {}".format(address, extension))
+            elif mode in (6, 7):
+                out.append("{} = {}".format(address, (next_address + extension) & 0xFFFF))
+                if mode == 7:
+                    out.append("{0} = load_word({0})".format(address))
+            else:
+                raise _Untranslatable()
+        else:
+            step = 1 if size == "byte" and mode in (2, 4) and reg != self.SP else 2
+            value = self._read(reg, next_address)
+            if mode in (1, 2, 3):
+                out.append("{} = {}".format(address, value))
+                if mode != 1:
+                    self._write(out, reg, "{} + {}".format(address, step))
+            elif mode in (4, 5):
+                out.append("{} = ({} - {}) & 0xFFFF".format(address, value, step))
+                self._write(out, reg, "{} - {}".format(value, step))
+            else:
+                out.append("{} = ({} + {}) & 0xFFFF".format(address, value, extension))
+
+            if mode in (3, 5, 7):
+                out.append("{0} = load_word({0})".format(address))
+
+        if not fetch_value:
+            return None, address
+        out.append("value_{} = load_{}({})".format(tag, size, address))
+        return "value_" + tag, address
+
+    def _store(self, out: list, operand: Operand, size: str, address: str, value: str, stored: list):
+        if operand.mode != 0:
+            if address is None:
+                raise _Untranslatable()
+            out.append("store_{}({}, {})".format(size, address, value))
+            stored.append(address)
+        elif size == "byte":
+            if operand.reg in (self.SP, self.PC):
+                raise _Untranslatable()
+            reg = self._read(operand.reg, 0)
+            out.append("{0} = ({0} & 0xFF00) | {1}".format(reg, value))
+        else:
+            self._write(out, operand.reg, value)
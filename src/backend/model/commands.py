@@ -1,5 +1,7 @@
 import enum
+import itertools
 import re
+import types
 
 from src.backend.utils.exceptions import CommandWrongNumberBits, UnknownCommand, OperandWrongNumberOfBits, \
     OperandWrongPCMode, CommandJMPToRegister, CommandException
@@ -23,40 +25,70 @@ class Operation(enum.Enum):
     ALU                     = enum.auto()
 
 
+class CommandContext:
+    __slots__ = ("program_status", "inner_program_status", "registers", "addresses", "next_instructions",
+                 "if_branch")
+
+    def __init__(self, program_status: ProgramStatus, slots: int, inner_program_status: bool):
+        self.program_status = program_status
+        self.inner_program_status = ProgramStatus() if inner_program_status else None
+        self.registers = list(Register() for _ in range(slots))
+        self.addresses = [None] * slots
+        self.next_instructions = [None] * slots
+        self.if_branch = False
+
+
 class Operand:
-    def __init__(self, reg: str, mode: str):
-        if len(reg) != 3 or len(mode) != 3:
+    __slots__ = ("_reg", "_mode", "_slot", "do_not_fetch_operand")
+
+    def __init__(self, reg: int, mode: int, slot: int):
+        if not 0 <= reg < 8 or not 0 <= mode < 8:
             raise OperandWrongNumberOfBits()
 
-        self._reg = int(reg, 2)
-        self._mode = int(mode, 2)
+        self._reg = reg
+        self._mode = mode
+        self._slot = slot
 
         if self._reg == 7 and self._mode not in (0, 2, 3, 6, 7):
             raise OperandWrongPCMode()
 
-        self._next_instruction = None
-        self._inner_register = Register()
-        self._inner_address = None
-
         self.do_not_fetch_operand = False
 
     def is_pc(self) -> bool:
         return self._reg == 7
 
-    def set_next_instruction(self, instr: bitarray):
+    def set_next_instruction(self, ctx: CommandContext, instr: bitarray):
         assert instr.length() == 16
-        self._next_instruction = int(instr.to01(), 2)
+        ctx.next_instructions[self._slot] = int(instr.to01(), 2)
 
-    def add_next_instruction_to_inner_register(self):
-        self._inner_register.inc(value=self._next_instruction)
+    def add_next_instruction_to_inner_register(self, ctx: CommandContext):
+        ctx.registers[self._slot].inc(value=ctx.next_instructions[self._slot])
 
-    def copy_inner_register_to_inner_address(self):
-        self._inner_address = Register()
-        self._inner_address.set_word(self._inner_register.word())
+    def copy_inner_register_to_inner_address(self, ctx: CommandContext):
+        inner_address = Register()
+        inner_address.set(size="word", signed=False, value=ctx.registers[self._slot].get(size="word", signed=False))
+        ctx.addresses[self._slot] = inner_address
 
-    @property
-    def inner_register(self):
-        return self._inner_register
+    def inner_register(self, ctx: CommandContext) -> Register:
+        return ctx.registers[self._slot]
+
+    def set_inner_byte(self, ctx: CommandContext, value: bitarray):
+        ctx.registers[self._slot].set_byte(value)
+
+    def set_inner_word(self, ctx: CommandContext, value: bitarray):
+        ctx.registers[self._slot].set_word(value)
+
+    def inner_byte(self, ctx: CommandContext) -> bitarray:
+        return ctx.registers[self._slot].byte()
+
+    def inner_word(self, ctx: CommandContext) -> bitarray:
+        return ctx.registers[self._slot].word()
+
+    def inner_register_address(self, ctx: CommandContext) -> int:
+        return ctx.registers[self._slot].get(size="word", signed=False)
+
+    def inner_address(self, ctx: CommandContext) -> int:
+        return ctx.addresses[self._slot].get(size="word", signed=False)
 
     @property
     def reg(self) -> int:
@@ -66,6 +98,10 @@ class Operand:
     def mode(self) -> int:
         return self._mode
 
+    @property
+    def slot(self) -> int:
+        return self._slot
+
     @property
     def require_next_instruction(self) -> bool:
         return (self._reg == 7 and self._mode != 0) or self._mode // 2 == 3
@@ -97,8 +133,6 @@ class Operand:
             if self._mode % 2 == 1 and self._mode != 1:
                 result = "@" + result
 
-        if self.require_next_instruction and self._next_instruction is not None:
-            result = result.format(self._next_instruction)
         return result
 
     def add_fetch(self, operations: list, size: str):
@@ -117,8 +151,7 @@ class Operand:
             fetch_size = size if self._mode == 2 else "word"
             operations.append({"operation": Operation.FETCH_NEXT_INSTRUCTION,
                                "size": fetch_size,
-                               "callback": self._inner_register.set_byte
-                               if fetch_size == "byte" else self._inner_register.set_word})
+                               "callback": self.set_inner_byte if fetch_size == "byte" else self.set_inner_word})
 
         if self._mode == 0 and self.do_not_fetch_operand:
             return
@@ -128,8 +161,7 @@ class Operand:
             operations.append({"operation": Operation.FETCH_REGISTER,
                                "register": self._reg,
                                "size": fetch_size,
-                               "callback": self._inner_register.set_byte
-                               if fetch_size == "byte" else self._inner_register.set_word})
+                               "callback": self.set_inner_byte if fetch_size == "byte" else self.set_inner_word})
 
         if self._mode == 0:
             return
@@ -156,10 +188,9 @@ class Operand:
         if not (self._reg == 7 and self._mode // 2 == 1):
             fetch_size = size if self._mode in (1, 2, 4, 6) else "word"
             operations.append({"operation": Operation.FETCH_ADDRESS,
-                               "address": lambda: self._inner_register.get(size="word", signed=False),
+                               "address": self.inner_register_address,
                                "size": fetch_size,
-                               "callback": self._inner_register.set_byte
-                               if fetch_size == "byte" else self._inner_register.set_word})
+                               "callback": self.set_inner_byte if fetch_size == "byte" else self.set_inner_word})
 
         if self._mode in (1, 2, 4, 6):
             return
@@ -171,14 +202,12 @@ class Operand:
         if self.do_not_fetch_operand:
             return
         operations.append({"operation": Operation.FETCH_ADDRESS,
-                           "address": lambda: self._inner_register.get(size="word", signed=False),
+                           "address": self.inner_register_address,
                            "size": size,
-                           "callback": self._inner_register.set_byte
-                           if size == "byte" else self._inner_register.set_word})
+                           "callback": self.set_inner_byte if size == "byte" else self.set_inner_word})
 
     def add_store(self, operations: list, size: str):
-        def value():
-            return self._inner_register.byte() if size == "byte" else self._inner_register.word()
+        value = self.inner_byte if size == "byte" else self.inner_word
 
         if self._mode == 0:
             operations.append({"operation": Operation.STORE_REGISTER,
@@ -189,15 +218,18 @@ class Operand:
         else:
             assert not (self._reg == 7 and self._mode == 2)
             operations.append({"operation": Operation.STORE_ADDRESS,
-                               "address": lambda: self._inner_address.get(size="word", signed=False),
+                               "address": self.inner_address,
                                "size": size,
                                "value": value})
 
 
 class AbstractCommand:
-    def __init__(self, program_status: ProgramStatus, type_, on_byte: bool, alu_cycles: int, add_decode=True):
-        self._program_status = program_status
-        self._cur_operation = 0
+    __slots__ = ("_operations", "_string_representation", "_on_byte", "_decode", "_size", "_src_operand",
+                 "_dest_operand", "_offset", "_number", "_type", "_alu_cycles", "_slots", "_inner_program_status",
+                 "_inner_program_status_required")
+
+    def __init__(self, type_, on_byte: bool, alu_cycles: int, add_decode=True, first_slot=0,
+                 inner_program_status=False):
         self._operations = []
 
         self._string_representation = type_.string_representation + ("B" if on_byte else "")
@@ -210,6 +242,9 @@ class AbstractCommand:
         self._number = None
         self._type = type_
         self._alu_cycles = alu_cycles
+        self._slots = first_slot
+        self._inner_program_status = inner_program_status
+        self._inner_program_status_required = inner_program_status
 
     @property
     def size(self):
@@ -219,10 +254,6 @@ class AbstractCommand:
     def on_byte(self):
         return self._on_byte
 
-    @property
-    def program_status(self):
-        return self._program_status
-
     @property
     def has_src_operand(self):
         return self._src_operand is not None
@@ -267,6 +298,10 @@ class AbstractCommand:
     def dest_stored(self):
         return self._type.dest_stored
 
+    @property
+    def slots(self) -> int:
+        return self._slots
+
     @property
     def num_next_instructions(self) -> int:
         num = 0
@@ -276,15 +311,36 @@ class AbstractCommand:
             num += 1
         return num
 
+    def program_status(self, ctx: CommandContext) -> ProgramStatus:
+        return ctx.inner_program_status if self._inner_program_status else ctx.program_status
+
+    def new_context(self, program_status: ProgramStatus) -> CommandContext:
+        return CommandContext(program_status=program_status, slots=self._slots,
+                              inner_program_status=self._inner_program_status_required)
+
+    def if_branch(self, ctx: CommandContext) -> bool:
+        return ctx.if_branch
+
     def __iter__(self):
-        self._cur_operation = 0
-        return self
+        return iter(self._operations)
+
+    def _new_slot(self) -> int:
+        self._slots += 1
+        return self._slots - 1
+
+    def _new_operand(self, reg: int, mode: int) -> Operand:
+        return Operand(reg=reg, mode=mode, slot=self._new_slot())
 
-    def __next__(self):
-        if self._cur_operation < len(self._operations):
-            self._cur_operation += 1
-            return self._operations[self._cur_operation - 1]
-        raise StopIteration()
+    def _add_subcommand(self, code: int, add_decode=False) -> 'AbstractCommand':
+        subcommand = Commands.build_command(code=code, add_decode=add_decode, first_slot=self._slots,
+                                            inner_program_status=True)
+        self._slots = subcommand.slots
+        self._inner_program_status_required = True
+        self._operations.extend(subcommand._operations)
+        return subcommand
+
+    def _freeze(self):
+        self._operations = tuple(types.MappingProxyType(op) for op in self._operations)
 
     def _add_decode(self):
         if self._decode:
@@ -309,10 +365,12 @@ class AbstractCommand:
 
 
 class DoubleOperandCommand(AbstractCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ()
+
+    def __init__(self, decoded, **kwargs):
         super(DoubleOperandCommand, self).__init__(**kwargs)
-        self._src_operand = Operand(reg=matcher.group("srcreg"), mode=matcher.group("srcmode"))
-        self._dest_operand = Operand(reg=matcher.group("destreg"), mode=matcher.group("destmode"))
+        self._src_operand = self._new_operand(reg=decoded.src_reg, mode=decoded.src_mode)
+        self._dest_operand = self._new_operand(reg=decoded.dest_reg, mode=decoded.dest_mode)
 
         self._add_all_operations()
 
@@ -323,14 +381,16 @@ class DoubleOperandCommand(AbstractCommand):
         if self.dest_stored:
             self._add_store_operands(size=self.size)
 
-    def execute(self):
+    def execute(self, ctx: CommandContext):
         raise NotImplementedError()
 
 
 class SingleOperandCommand(AbstractCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ()
+
+    def __init__(self, decoded, **kwargs):
         super(SingleOperandCommand, self).__init__(**kwargs)
-        self._dest_operand = Operand(reg=matcher.group("destreg"), mode=matcher.group("destmode"))
+        self._dest_operand = self._new_operand(reg=decoded.dest_reg, mode=decoded.dest_mode)
 
         self._add_all_operations()
 
@@ -341,15 +401,17 @@ class SingleOperandCommand(AbstractCommand):
         if self.dest_stored:
             self._add_store_operands(size=self.size)
 
-    def execute(self):
+    def execute(self, ctx: CommandContext):
         raise NotImplementedError()
 
 
 class RegisterSourceCommand(AbstractCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ()
+
+    def __init__(self, decoded, **kwargs):
         super(RegisterSourceCommand, self).__init__(**kwargs)
-        self._src_operand = Operand(reg=matcher.group("reg"), mode="000")
-        self._dest_operand = Operand(reg=matcher.group("destreg"), mode=matcher.group("destmode"))
+        self._src_operand = self._new_operand(reg=decoded.reg, mode=0)
+        self._dest_operand = self._new_operand(reg=decoded.dest_reg, mode=decoded.dest_mode)
 
         self._add_all_operations()
 
@@ -360,22 +422,22 @@ class RegisterSourceCommand(AbstractCommand):
         if self.dest_stored:
             self._add_store_operands(size=self.size)
 
-    def execute(self):
+    def execute(self, ctx: CommandContext):
         raise NotImplementedError()
 
 
 class BranchCommand(AbstractCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ("_decoded", )
+
+    def __init__(self, decoded, **kwargs):
         super(BranchCommand, self).__init__(**kwargs)
-        self._matcher = matcher
-        self._if_branch = False
+        self._decoded = decoded
 
         self._extract_offset()
         self._add_all_operations()
 
     def _extract_offset(self):
-        self._offset = int.from_bytes(bitarray(self._matcher.group("offset"), endian='big').tobytes(),
-                                      byteorder='big', signed=True)
+        self._offset = self._decoded.offset - 256 if self._decoded.offset > 127 else self._decoded.offset
 
     def _add_all_operations(self):
         self._add_decode()
@@ -384,46 +446,50 @@ class BranchCommand(AbstractCommand):
 
     def _add_branch(self):
         self._operations.append({"operation": Operation.BRANCH_IF,
-                                 "if": lambda: self._if_branch,
+                                 "if": self.if_branch,
                                  "offset": self._offset * 2})
 
-    def execute(self):
+    def execute(self, ctx: CommandContext):
         raise NotImplementedError()
 
 
 class JumpCommand(AbstractCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(JumpCommand, self).__init__(**kwargs)
 
 
 class MULCommand(AbstractCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ("_dest_reg", "_additional_reg")
+
+    def __init__(self, decoded, **kwargs):
         super(MULCommand, self).__init__(**kwargs)
-        self._dest_operand = Operand(reg=matcher.group("reg"), mode="000")
-        self._src_operand = Operand(reg=matcher.group("srcreg"), mode=matcher.group("srcmode"))
+        self._dest_operand = self._new_operand(reg=decoded.reg, mode=0)
+        self._src_operand = self._new_operand(reg=decoded.src_reg, mode=decoded.src_mode)
 
-        self._dest_reg = int(matcher.group("reg"), 2)
+        self._dest_reg = decoded.reg
         if self._dest_reg in (6, 7):
             raise CommandException(what="Cannot perform multiplication on SP or PC as a destination")
         if self._dest_reg % 2 == 0:
-            self._additional_reg = Register()
+            self._additional_reg = self._new_slot()
         self._add_all_operations()
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size="word", signed=True)
-        value_dest = self.dest_operand.inner_register.get(size="word", signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size="word", signed=True)
+        value_dest = self.dest_operand.inner_register(ctx).get(size="word", signed=True)
         tmp = value_dest * value_src
-        self.program_status.set_status(bit="N", value=tmp < 0)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
-        self.program_status.set_status(bit="V", value=False)
+        program_status.set_status(bit="N", value=tmp < 0)
+        program_status.set_status(bit="Z", value=tmp == 0)
+        program_status.set_status(bit="V", value=False)
         if tmp < Register.BOUND_PROPERTIES[("word", True)][0] or tmp > Register.BOUND_PROPERTIES[("word", True)][1]:
-            self.program_status.set_status(bit="C", value=True)
+            program_status.set_status(bit="C", value=True)
 
-        bitarr = bitarray(endian='big')
-        bitarr.frombytes(tmp.to_bytes(4, byteorder='big', signed=True))
-        self.dest_operand.inner_register.set_word(value=bitarr[16:32])
+        tmp &= 0xFFFFFFFF
+        self.dest_operand.inner_register(ctx).set(size="word", signed=False, value=tmp & 0xFFFF)
         if self._dest_reg % 2 == 0:
-            self._additional_reg.set_word(value=bitarr[0:16])
+            ctx.registers[self._additional_reg].set(size="word", signed=False, value=tmp >> 16)
 
     def _add_all_operations(self):
         self._add_decode()
@@ -437,17 +503,17 @@ class MULCommand(AbstractCommand):
             self._operations.append({"operation": Operation.STORE_REGISTER,
                                      "register": self._dest_reg + 1,
                                      "size": "word",
-                                     "value": self._additional_reg.word})
+                                     "value": lambda ctx: ctx.registers[self._additional_reg].word()})
 
 
 class JMPCommand(JumpCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ()
+
+    def __init__(self, decoded, **kwargs):
         super(JMPCommand, self).__init__(**kwargs)
-        dest_reg = matcher.group("destreg")
-        dest_mode = matcher.group("destmode")
-        if dest_mode == "000":
+        if decoded.dest_mode == 0:
             raise CommandJMPToRegister()
-        self._dest_operand = Operand(reg=dest_reg, mode=dest_mode)
+        self._dest_operand = self._new_operand(reg=decoded.dest_reg, mode=decoded.dest_mode)
         self._dest_operand.do_not_fetch_operand = True
 
         self._add_decode()
@@ -458,22 +524,20 @@ class JMPCommand(JumpCommand):
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 7,
                                  "size": "word",
-                                 "value": lambda: self.dest_operand.inner_register.word()})
+                                 "value": self.dest_operand.inner_word})
 
 
 class JSRCommand(JumpCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ("_src_reg", )
+
+    def __init__(self, decoded, **kwargs):
         super(JSRCommand, self).__init__(**kwargs)
 
-        dest_reg = matcher.group("destreg")
-        dest_mode = matcher.group("destmode")
-        self._src_reg = matcher.group("reg")
-        if dest_mode == "000":
+        self._src_reg = decoded.reg
+        if decoded.dest_mode == 0:
             raise CommandJMPToRegister()
-        if len(self._src_reg) != 3:
-            raise OperandWrongNumberOfBits()
 
-        self._dest_operand = Operand(reg=dest_reg, mode=dest_mode)
+        self._dest_operand = self._new_operand(reg=decoded.dest_reg, mode=decoded.dest_mode)
         self._dest_operand.do_not_fetch_operand = True
 
         self._add_decode()
@@ -483,36 +547,28 @@ class JSRCommand(JumpCommand):
         self._add_jump()
 
     def _add_push_onto_stack(self):
-        self._subcommand = Commands.get_command_by_code(code=bitarray("0001000" + self._src_reg + "100110",
-                                                                      endian='big'),
-                                                        program_status=ProgramStatus(), add_decode=False)
-
-        self._src_operand = self._subcommand.src_operand
-        self._operations.extend(self._subcommand._operations)
+        # MOV R, -(SP)
+        self._src_operand = self._add_subcommand(code=0o010046 | (self._src_reg << 6)).src_operand
 
     def _add_mov_pc_to_reg(self):
-        tmp_subcommand = Commands.get_command_by_code(code=bitarray("0001000111000" + self._src_reg,
-                                                                    endian="big"),
-                                                      program_status=ProgramStatus(), add_decode=False)
-
-        self._operations.extend(tmp_subcommand._operations)
+        # MOV PC, R
+        self._add_subcommand(code=0o010700 | self._src_reg)
 
     def _add_jump(self):
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 7,
                                  "size": "word",
-                                 "value": lambda: self.dest_operand.inner_register.word()})
+                                 "value": self.dest_operand.inner_word})
 
 
 class RTSCommand(JumpCommand):
-    def __init__(self, matcher, **kwargs):
-        super(RTSCommand, self).__init__(**kwargs)
+    __slots__ = ("_src_reg", )
 
-        self._src_reg = matcher.group("reg")
-        if len(self._src_reg) != 3:
-            raise OperandWrongNumberOfBits()
+    def __init__(self, decoded, **kwargs):
+        super(RTSCommand, self).__init__(**kwargs)
 
-        self._src_operand = Operand(reg=self._src_reg, mode="000")
+        self._src_reg = decoded.reg
+        self._src_operand = self._new_operand(reg=self._src_reg, mode=0)
 
         self._add_decode()
         self._add_fetch_operands(size="word")
@@ -520,67 +576,64 @@ class RTSCommand(JumpCommand):
         self._add_pop_from_stack()
 
     def _add_pop_from_stack(self):
-        self._subcommand = Commands.get_command_by_code(code=bitarray("0001"  + "010110000" + self._src_reg,
-                                                                      endian='big'),
-                                                        program_status=ProgramStatus(), add_decode=False)
-
-        self._operations.extend(self._subcommand._operations)
+        # MOV (SP)+, R
+        self._add_subcommand(code=0o012600 | self._src_reg)
 
     def _add_jump(self):
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 7,
                                  "size": "word",
-                                 "value": lambda: self.src_operand.inner_register.word()})
+                                 "value": self.src_operand.inner_word})
 
 
 class MARKCommand(JumpCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ("_tmp_sp", "_tmp_r5", "_inner_register")
+
+    def __init__(self, decoded, **kwargs):
         super(MARKCommand, self).__init__(**kwargs)
 
-        tmp = bitarray("00", endian='big')
-        tmp.extend(bitarray(matcher.group("number"), endian='big'))
-        self._number = int.from_bytes(tmp.tobytes(), byteorder='big', signed=False)
+        self._number = decoded.number
 
         self._add_decode()
         self._add_all_operations()
 
     def _add_all_operations(self):
-        self._tmp_sp = Register()
-        self._tmp_r5 = Register()
-        self._inner_register = Register()
+        self._tmp_sp = self._new_slot()
+        self._tmp_r5 = self._new_slot()
+        self._inner_register = self._new_slot()
 
         self._operations.append({"operation": Operation.FETCH_REGISTER,
                                  "register": 6,
                                  "size": "word",
-                                 "callback": self._tmp_sp.set_word})
+                                 "callback": lambda ctx, value: ctx.registers[self._tmp_sp].set_word(value)})
 
         self._operations.append({"operation": Operation.EXECUTE,
-                                 "callback": lambda: self._tmp_sp.inc(value=self._number * 2),
+                                 "callback": lambda ctx: ctx.registers[self._tmp_sp].inc(value=self._number * 2),
                                  "cycles": 1})
 
         self._operations.append({"operation": Operation.FETCH_REGISTER,
                                  "register": 5,
                                  "size": "word",
-                                 "callback": self._tmp_r5.set_word})
+                                 "callback": lambda ctx, value: ctx.registers[self._tmp_r5].set_word(value)})
 
         self._operations.append({"operation": Operation.FETCH_ADDRESS,
-                                 "address": lambda: self._tmp_sp.get(size="word", signed=False),
+                                 "address": lambda ctx: ctx.registers[self._tmp_sp].get(size="word", signed=False),
                                  "size": "word",
-                                 "callback": self._inner_register.set_word})
+                                 "callback": lambda ctx, value: ctx.registers[self._inner_register].set_word(value)})
 
         self._operations.append({"operation": Operation.EXECUTE,
-                                 "callback": lambda: self._tmp_sp.inc(value=2),
+                                 "callback": lambda ctx: ctx.registers[self._tmp_sp].inc(value=2),
                                  "cycles": 1})
 
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 6,
                                  "size": "word",
-                                 "value": lambda: self._tmp_sp.word()})
+                                 "value": lambda ctx: ctx.registers[self._tmp_sp].word()})
 
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 5,
                                  "size": "word",
-                                 "value": lambda: self._inner_register.word()})
+                                 "value": lambda ctx: ctx.registers[self._inner_register].word()})
 
         self._add_jump()
 
@@ -588,51 +641,54 @@ class MARKCommand(JumpCommand):
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 7,
                                  "size": "word",
-                                 "value": lambda: self._tmp_r5.word()})
+                                 "value": lambda ctx: ctx.registers[self._tmp_r5].word()})
 
 
 class RTICommand(JumpCommand):
-    def __init__(self, matcher, **kwargs):
+    __slots__ = ("_tmp_sp", "_inner_register_1", "_inner_register_2")
+
+    def __init__(self, decoded, **kwargs):
         super(RTICommand, self).__init__(**kwargs)
         self._add_decode()
         self._add_all_operations()
 
     def _add_all_operations(self):
-        self._tmp_sp = Register()
-        self._inner_register_1 = Register()
-        self._inner_register_2 = Register()
+        self._tmp_sp = self._new_slot()
+        self._inner_register_1 = self._new_slot()
+        self._inner_register_2 = self._new_slot()
 
         self._operations.append({"operation": Operation.FETCH_REGISTER,
                                  "register": 6,
                                  "size": "word",
-                                 "callback": self._tmp_sp.set_word})
+                                 "callback": lambda ctx, value: ctx.registers[self._tmp_sp].set_word(value)})
 
         self._operations.append({"operation": Operation.FETCH_ADDRESS,
-                                 "address": lambda: self._tmp_sp.get(size="word", signed=False),
+                                 "address": lambda ctx: ctx.registers[self._tmp_sp].get(size="word", signed=False),
                                  "size": "word",
-                                 "callback": self._inner_register_1.set_word})
+                                 "callback": lambda ctx, value: ctx.registers[self._inner_register_1].set_word(value)})
 
         self._operations.append({"operation": Operation.EXECUTE,
-                                 "callback": lambda: self._tmp_sp.inc(value=2),
+                                 "callback": lambda ctx: ctx.registers[self._tmp_sp].inc(value=2),
                                  "cycles": 1})
 
         self._operations.append({"operation": Operation.FETCH_ADDRESS,
-                                 "address": lambda: self._tmp_sp.get(size="word", signed=False),
+                                 "address": lambda ctx: ctx.registers[self._tmp_sp].get(size="word", signed=False),
                                  "size": "word",
-                                 "callback": self._inner_register_2.set_word})
+                                 "callback": lambda ctx, value: ctx.registers[self._inner_register_2].set_word(value)})
 
         self._operations.append({"operation": Operation.EXECUTE,
-                                 "callback": lambda: self._tmp_sp.inc(value=2),
+                                 "callback": lambda ctx: ctx.registers[self._tmp_sp].inc(value=2),
                                  "cycles": 1})
 
         self._operations.append({"operation": Operation.EXECUTE,
-                                 "callback": lambda: self._program_status.set_word(self._inner_register_2.word()),
+                                 "callback": lambda ctx: self.program_status(ctx).set_word(
+                                     ctx.registers[self._inner_register_2].word()),
                                  "cycles": 1})
 
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 6,
                                  "size": "word",
-                                 "value": lambda: self._tmp_sp.word()})
+                                 "value": lambda ctx: ctx.registers[self._tmp_sp].word()})
 
         self._add_jump()
 
@@ -640,256 +696,301 @@ class RTICommand(JumpCommand):
         self._operations.append({"operation": Operation.STORE_REGISTER,
                                  "register": 7,
                                  "size": "word",
-                                 "value": lambda: self._inner_register_1.word()})
+                                 "value": lambda ctx: ctx.registers[self._inner_register_1].word()})
 
 
 class CLRCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(CLRCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self.program_status.clear()
-        self.program_status.set_status(bit='Z', value=True)
-        self._dest_operand.inner_register.set(size=self.size, signed=False, value=0)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        program_status.clear()
+        program_status.set_status(bit='Z', value=True)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=False, value=0)
 
 
 class COMCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(COMCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
         value = ~value
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.program_status.set_status(bit="V", value=False)
-        self.program_status.set_status(bit="C", value=True)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=value)
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        program_status.set_status(bit="V", value=False)
+        program_status.set_status(bit="C", value=True)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=value)
 
 
 class INCCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(INCCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
         if value == Register.BOUND_PROPERTIES[(self.size, True)][1]:
             value = Register.BOUND_PROPERTIES[(self.size, True)][0]
-            self.program_status.set_status(bit="V", value=True)
+            program_status.set_status(bit="V", value=True)
         else:
             value += 1
-            self.program_status.set_status(bit="V", value=False)
+            program_status.set_status(bit="V", value=False)
 
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=value)
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=value)
 
 
 class DECCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(DECCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
         if value == Register.BOUND_PROPERTIES[(self.size, True)][0]:
             value = Register.BOUND_PROPERTIES[(self.size, True)][1]
-            self.program_status.set_status(bit="V", value=True)
+            program_status.set_status(bit="V", value=True)
         else:
             value -= 1
-            self.program_status.set_status(bit="V", value=False)
+            program_status.set_status(bit="V", value=False)
 
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=value)
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=value)
 
 
 class NEGCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(NEGCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
         if value != Register.BOUND_PROPERTIES[(self.size, True)][0]:
             value = -value
 
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.program_status.set_status(bit="V", value=(value == Register.BOUND_PROPERTIES[(self.size, True)][0]))
-        self.program_status.set_status(bit="C", value=value != 0)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=value)
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        program_status.set_status(bit="V", value=(value == Register.BOUND_PROPERTIES[(self.size, True)][0]))
+        program_status.set_status(bit="C", value=value != 0)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=value)
 
 
 class TSTCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(TSTCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
 
-        self.program_status.clear()
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
+        program_status.clear()
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
 
 
 class ASRCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, alu_cycles, on_byte, **kwargs):
         if on_byte:
             alu_cycles += 1
         super(ASRCommand, self).__init__(alu_cycles=alu_cycles, on_byte=on_byte, **kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
 
-        self.program_status.set_status(bit="C", value=value % 2 == 1)
+        program_status.set_status(bit="C", value=value % 2 == 1)
         value >>= 1
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.program_status.set_status(bit="V", value=self.program_status.get_status(bit="C") ^
-                                       self.program_status.get_status(bit="N"))
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        program_status.set_status(bit="V", value=program_status.get_status(bit="C") ^
+                                       program_status.get_status(bit="N"))
 
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=value)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=value)
 
 
 class ASLCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(ASLCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=False)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=False)
 
         value <<= 1
-        self.program_status.set_status(bit="C", value=value > Register.BOUND_PROPERTIES[(self.size, False)][1])
+        program_status.set_status(bit="C", value=value > Register.BOUND_PROPERTIES[(self.size, False)][1])
         value %= (Register.BOUND_PROPERTIES[(self.size, False)][1] + 1)
-        self.program_status.set_status(bit="N", value=value > Register.BOUND_PROPERTIES[(self.size, True)][1])
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.program_status.set_status(bit="V", value=self.program_status.get_status(bit="C") ^
-                                       self.program_status.get_status(bit="N"))
+        program_status.set_status(bit="N", value=value > Register.BOUND_PROPERTIES[(self.size, True)][1])
+        program_status.set_status(bit="Z", value=value == 0)
+        program_status.set_status(bit="V", value=program_status.get_status(bit="C") ^
+                                       program_status.get_status(bit="N"))
 
-        self.dest_operand.inner_register.set(size=self.size, signed=False, value=value)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=False, value=value)
 
 
 class RORCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, alu_cycles, on_byte, **kwargs):
         if on_byte:
             alu_cycles += 1
         super(RORCommand, self).__init__(alu_cycles=alu_cycles, on_byte=on_byte, **kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=False)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=False)
 
         tmp_bit = (value % 2 == 1)
         value >>= 1
-        value += (0 if self.program_status.get_status(bit="C") is False
+        value += (0 if program_status.get_status(bit="C") is False
                   else Register.BOUND_PROPERTIES[(self.size, True)][1] + 1)
-        self.program_status.set_status(bit="C", value=tmp_bit)
-        self.program_status.set_status(bit="N", value=value > Register.BOUND_PROPERTIES[(self.size, True)][1])
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.program_status.set_status(bit="V", value=self.program_status.get_status(bit="C") ^
-                                       self.program_status.get_status(bit="N"))
+        program_status.set_status(bit="C", value=tmp_bit)
+        program_status.set_status(bit="N", value=value > Register.BOUND_PROPERTIES[(self.size, True)][1])
+        program_status.set_status(bit="Z", value=value == 0)
+        program_status.set_status(bit="V", value=program_status.get_status(bit="C") ^
+                                       program_status.get_status(bit="N"))
 
-        self.dest_operand.inner_register.set(size=self.size, signed=False, value=value)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=False, value=value)
 
 
 class ROLCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(ROLCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = self.dest_operand.inner_register.get(size=self.size, signed=False)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=False)
 
         value <<= 1
-        value += (0 if self.program_status.get_status(bit="C") is False else 1)
-        self.program_status.set_status(bit="C", value=value > Register.BOUND_PROPERTIES[(self.size, False)][1])
+        value += (0 if program_status.get_status(bit="C") is False else 1)
+        program_status.set_status(bit="C", value=value > Register.BOUND_PROPERTIES[(self.size, False)][1])
         value %= (Register.BOUND_PROPERTIES[(self.size, False)][1] + 1)
-        self.program_status.set_status(bit="N", value=value > Register.BOUND_PROPERTIES[(self.size, True)][1])
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.program_status.set_status(bit="V", value=self.program_status.get_status(bit="C") ^
-                                       self.program_status.get_status(bit="N"))
+        program_status.set_status(bit="N", value=value > Register.BOUND_PROPERTIES[(self.size, True)][1])
+        program_status.set_status(bit="Z", value=value == 0)
+        program_status.set_status(bit="V", value=program_status.get_status(bit="C") ^
+                                       program_status.get_status(bit="N"))
 
-        self.dest_operand.inner_register.set(size=self.size, signed=False, value=value)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=False, value=value)
 
 
 class SWABCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(SWABCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self.dest_operand.inner_register.reverse()
-        value = self.dest_operand.inner_register.get(size="byte", signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        self.dest_operand.inner_register(ctx).reverse()
+        value = self.dest_operand.inner_register(ctx).get(size="byte", signed=True)
 
-        self.program_status.clear()
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
+        program_status.clear()
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
 
 
 class ADCCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(ADCCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        tmp_bit = self.program_status.get_status(bit="C")
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        tmp_bit = program_status.get_status(bit="C")
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
 
-        self.program_status.set_status(bit="C", value=(value == -1 and tmp_bit is True))
+        program_status.set_status(bit="C", value=(value == -1 and tmp_bit is True))
         if value == Register.BOUND_PROPERTIES[(self.size, True)][1] and tmp_bit is True:
             value = Register.BOUND_PROPERTIES[(self.size, True)][0]
-            self.program_status.set_status(bit="V", value=True)
+            program_status.set_status(bit="V", value=True)
         else:
             value += (0 if tmp_bit is False else 1)
-            self.program_status.set_status(bit="V", value=False)
+            program_status.set_status(bit="V", value=False)
 
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=value)
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=value)
 
 
 class SBCCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(SBCCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        tmp_bit = self.program_status.get_status(bit="C")
-        value = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        tmp_bit = program_status.get_status(bit="C")
+        value = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
 
-        self.program_status.set_status(bit="C", value=not (value == 0 and tmp_bit is True))
-        self.program_status.set_status(bit="V", value=value == Register.BOUND_PROPERTIES[(self.size, True)][0])
+        program_status.set_status(bit="C", value=not (value == 0 and tmp_bit is True))
+        program_status.set_status(bit="V", value=value == Register.BOUND_PROPERTIES[(self.size, True)][0])
         if value == Register.BOUND_PROPERTIES[(self.size, True)][0] and tmp_bit is True:
             value = Register.BOUND_PROPERTIES[(self.size, True)][1]
         else:
             value -= (0 if tmp_bit is False else 1)
 
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=value)
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=value)
 
 
 class SXTCommand(SingleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(SXTCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value = 0 if self.program_status.get_status(bit="N") is False else Register.BOUND_PROPERTIES[("word", False)][1]
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value = 0 if program_status.get_status(bit="N") is False else Register.BOUND_PROPERTIES[("word", False)][1]
 
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.dest_operand.inner_register.set(size="word", signed=False, value=value)
+        program_status.set_status(bit="Z", value=value == 0)
+        self.dest_operand.inner_register(ctx).set(size="word", signed=False, value=value)
 
 
 class MOVCommand(DoubleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, alu_cycles, on_byte, **kwargs):
         if on_byte:
             alu_cycles += 3
         super(MOVCommand, self).__init__(alu_cycles=alu_cycles, on_byte=on_byte, **kwargs)
 
-    def execute(self):
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
         size_exec = self.size
-        value = self.src_operand.inner_register.get(size=size_exec, signed=True)
+        value = self.src_operand.inner_register(ctx).get(size=size_exec, signed=True)
         if self.on_byte and self.dest_operand.mode == 0:
             size_exec = 'word'
 
-        self.program_status.set_status(bit="N", value=value < 0)
-        self.program_status.set_status(bit="Z", value=value == 0)
-        self.program_status.set_status(bit="V", value=False)
-        self.dest_operand.inner_register.set(size=size_exec, signed=True, value=value)
+        program_status.set_status(bit="N", value=value < 0)
+        program_status.set_status(bit="Z", value=value == 0)
+        program_status.set_status(bit="V", value=False)
+        self.dest_operand.inner_register(ctx).set(size=size_exec, signed=True, value=value)
 
     def _add_all_operations(self):
         self.dest_operand.do_not_fetch_operand = True
@@ -903,260 +1004,313 @@ class MOVCommand(DoubleOperandCommand):
 
 
 class CMPCommand(DoubleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(CMPCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size=self.size, signed=False)
-        value_dest = self.dest_operand.inner_register.get(size=self.size, signed=False)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size=self.size, signed=False)
+        value_dest = self.dest_operand.inner_register(ctx).get(size=self.size, signed=False)
         max_signed = Register.BOUND_PROPERTIES[(self.size, True)][1]
 
-        tmp = self.dest_operand.inner_register.byte() if self.on_byte else self.dest_operand.inner_register.word()
-        tmp.invert()
-        tmp = value_src + int(tmp.to01(), 2) + 1
+        tmp = value_src + (~value_dest & Register.BOUND_PROPERTIES[(self.size, False)][1]) + 1
 
-        self.program_status.set_status(bit="C", value=not (tmp > Register.BOUND_PROPERTIES[(self.size, False)][1]))
+        program_status.set_status(bit="C", value=not (tmp > Register.BOUND_PROPERTIES[(self.size, False)][1]))
         tmp %= (Register.BOUND_PROPERTIES[(self.size, False)][1] + 1)
-        self.program_status.set_status(bit="V", value=value_dest ^ value_src > max_signed
+        program_status.set_status(bit="V", value=value_dest ^ value_src > max_signed
                                        and not value_dest ^ tmp > max_signed)
-        self.program_status.set_status(bit="N", value=tmp > max_signed)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
+        program_status.set_status(bit="N", value=tmp > max_signed)
+        program_status.set_status(bit="Z", value=tmp == 0)
 
 
 class ADDCommand(DoubleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(ADDCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size="word", signed=False)
-        value_dest = self.dest_operand.inner_register.get(size="word", signed=False)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size="word", signed=False)
+        value_dest = self.dest_operand.inner_register(ctx).get(size="word", signed=False)
         max_signed_word = Register.BOUND_PROPERTIES[("word", True)][1]
         tmp = value_dest + value_src
-        self.program_status.set_status(bit="C", value=(tmp > Register.BOUND_PROPERTIES[("word", False)][1]))
+        program_status.set_status(bit="C", value=(tmp > Register.BOUND_PROPERTIES[("word", False)][1]))
         tmp %= (Register.BOUND_PROPERTIES[("word", False)][1] + 1)
-        self.program_status.set_status(bit="V", value=not value_dest ^ value_src > max_signed_word
+        program_status.set_status(bit="V", value=not value_dest ^ value_src > max_signed_word
                                        and value_src ^ tmp > max_signed_word)
-        self.program_status.set_status(bit="N", value=tmp > max_signed_word)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
-        self.dest_operand.inner_register.set(size="word", signed=False, value=tmp)
+        program_status.set_status(bit="N", value=tmp > max_signed_word)
+        program_status.set_status(bit="Z", value=tmp == 0)
+        self.dest_operand.inner_register(ctx).set(size="word", signed=False, value=tmp)
 
 
 class SUBCommand(DoubleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(SUBCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size="word", signed=False)
-        value_dest = self.dest_operand.inner_register.get(size="word", signed=False)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size="word", signed=False)
+        value_dest = self.dest_operand.inner_register(ctx).get(size="word", signed=False)
         max_signed_word = Register.BOUND_PROPERTIES[("word", True)][1]
 
-        tmp = self.src_operand.inner_register.word()
-        tmp.invert()
-        tmp = value_dest + int(tmp.to01(), 2) + 1
+        tmp = value_dest + (~value_src & Register.BOUND_PROPERTIES[("word", False)][1]) + 1
 
-        self.program_status.set_status(bit="C", value=not (tmp > Register.BOUND_PROPERTIES[("word", False)][1]))
+        program_status.set_status(bit="C", value=not (tmp > Register.BOUND_PROPERTIES[("word", False)][1]))
         tmp %= (Register.BOUND_PROPERTIES[("word", False)][1] + 1)
-        self.program_status.set_status(bit="V", value=value_dest ^ value_src > max_signed_word
+        program_status.set_status(bit="V", value=value_dest ^ value_src > max_signed_word
                                        and not value_src ^ tmp > max_signed_word)
-        self.program_status.set_status(bit="N", value=tmp > max_signed_word)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
-        self.dest_operand.inner_register.set(size="word", signed=False, value=tmp)
+        program_status.set_status(bit="N", value=tmp > max_signed_word)
+        program_status.set_status(bit="Z", value=tmp == 0)
+        self.dest_operand.inner_register(ctx).set(size="word", signed=False, value=tmp)
 
 
 class BITCommand(DoubleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BITCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size=self.size, signed=True)
-        value_dest = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size=self.size, signed=True)
+        value_dest = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
 
         tmp = value_src & value_dest
-        self.program_status.set_status(bit="N", value=tmp < 0)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
-        self.program_status.set_status(bit="V", value=False)
+        program_status.set_status(bit="N", value=tmp < 0)
+        program_status.set_status(bit="Z", value=tmp == 0)
+        program_status.set_status(bit="V", value=False)
 
 
 class BICCommand(DoubleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BICCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size=self.size, signed=True)
-        value_dest = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size=self.size, signed=True)
+        value_dest = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
 
         tmp = ~value_src
         tmp = tmp & value_dest
-        self.program_status.set_status(bit="N", value=tmp < 0)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
-        self.program_status.set_status(bit="V", value=False)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=tmp)
+        program_status.set_status(bit="N", value=tmp < 0)
+        program_status.set_status(bit="Z", value=tmp == 0)
+        program_status.set_status(bit="V", value=False)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=tmp)
 
 
 class BISCommand(DoubleOperandCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BISCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size=self.size, signed=True)
-        value_dest = self.dest_operand.inner_register.get(size=self.size, signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size=self.size, signed=True)
+        value_dest = self.dest_operand.inner_register(ctx).get(size=self.size, signed=True)
 
         tmp = value_src | value_dest
-        self.program_status.set_status(bit="N", value=tmp < 0)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
-        self.program_status.set_status(bit="V", value=False)
-        self.dest_operand.inner_register.set(size=self.size, signed=True, value=tmp)
+        program_status.set_status(bit="N", value=tmp < 0)
+        program_status.set_status(bit="Z", value=tmp == 0)
+        program_status.set_status(bit="V", value=False)
+        self.dest_operand.inner_register(ctx).set(size=self.size, signed=True, value=tmp)
 
 
 class XORCommand(RegisterSourceCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(XORCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        value_src = self.src_operand.inner_register.get(size="word", signed=True)
-        value_dest = self.dest_operand.inner_register.get(size="word", signed=True)
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        value_src = self.src_operand.inner_register(ctx).get(size="word", signed=True)
+        value_dest = self.dest_operand.inner_register(ctx).get(size="word", signed=True)
 
         tmp = value_src ^ value_dest
-        self.program_status.set_status(bit="N", value=tmp < 0)
-        self.program_status.set_status(bit="Z", value=tmp == 0)
-        self.program_status.set_status(bit="V", value=False)
-        self.dest_operand.inner_register.set(size="word", signed=True, value=tmp)
+        program_status.set_status(bit="N", value=tmp < 0)
+        program_status.set_status(bit="Z", value=tmp == 0)
+        program_status.set_status(bit="V", value=False)
+        self.dest_operand.inner_register(ctx).set(size="word", signed=True, value=tmp)
 
 
 class BRCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BRCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = True
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = True
 
 
 class BNECommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BNECommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = not self.program_status.get_status(bit="Z")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = not self.program_status(ctx).get_status(bit="Z")
 
 
 class BEQCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BEQCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = self.program_status.get_status(bit="Z")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = self.program_status(ctx).get_status(bit="Z")
 
 
 class BPLCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BPLCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = not self.program_status.get_status(bit="N")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = not self.program_status(ctx).get_status(bit="N")
 
 
 class BMICommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BMICommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = self.program_status.get_status(bit="N")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = self.program_status(ctx).get_status(bit="N")
 
 
 class BVCCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BVCCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = not self.program_status.get_status(bit="V")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = not self.program_status(ctx).get_status(bit="V")
 
 
 class BVSCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BVSCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = self.program_status.get_status(bit="V")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = self.program_status(ctx).get_status(bit="V")
 
 
 class BCCCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BCCCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = not self.program_status.get_status(bit="C")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = not self.program_status(ctx).get_status(bit="C")
 
 
 class BCSCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BCSCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = self.program_status.get_status(bit="C")
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = self.program_status(ctx).get_status(bit="C")
 
 
 class BGECommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BGECommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = not (self.program_status.get_status(bit="N") ^ self.program_status.get_status(bit="V"))
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        ctx.if_branch = not (program_status.get_status(bit="N") ^ program_status.get_status(bit="V"))
 
 
 class BLTCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BLTCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = (self.program_status.get_status(bit="N") ^ self.program_status.get_status(bit="V"))
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        ctx.if_branch = (program_status.get_status(bit="N") ^ program_status.get_status(bit="V"))
 
 
 class BGTCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BGTCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = not (self.program_status.get_status(bit="Z") or
-                               (self.program_status.get_status(bit="N") ^ self.program_status.get_status(bit="V")))
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        ctx.if_branch = not (program_status.get_status(bit="Z") or
+                             (program_status.get_status(bit="N") ^ program_status.get_status(bit="V")))
 
 
 class BLECommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BLECommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = (self.program_status.get_status(bit="Z") or
-                           (self.program_status.get_status(bit="N") ^ self.program_status.get_status(bit="V")))
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        ctx.if_branch = (program_status.get_status(bit="Z") or
+                         (program_status.get_status(bit="N") ^ program_status.get_status(bit="V")))
 
 
 class BHICommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BHICommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = not self.program_status.get_status(bit="C") and not self.program_status.get_status(bit="Z")
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        ctx.if_branch = not program_status.get_status(bit="C") and not program_status.get_status(bit="Z")
 
 
 class BLOSCommand(BranchCommand):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(BLOSCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = self.program_status.get_status(bit="C") or self.program_status.get_status(bit="Z")
+    def execute(self, ctx: CommandContext):
+        program_status = self.program_status(ctx)
+        ctx.if_branch = program_status.get_status(bit="C") or program_status.get_status(bit="Z")
 
 
 class SOBCommand(BranchCommand):
+    __slots__ = ("_src_reg", )
+
     def __init__(self, **kwargs):
         super(SOBCommand, self).__init__(**kwargs)
 
-    def execute(self):
-        self._if_branch = self._inner_ps.get_status(bit='Z') is False
+    def execute(self, ctx: CommandContext):
+        ctx.if_branch = ctx.inner_program_status.get_status(bit='Z') is False
 
     def _extract_offset(self):
-        tmp = bitarray("00", endian='big')
-        tmp.extend(bitarray(self._matcher.group("offset"), endian='big'))
-        self._offset = int.from_bytes(tmp.tobytes(), byteorder='big', signed=False)
-        self._src_reg = bitarray(self._matcher.group("reg"), endian='big')
+        self._offset = self._decoded.offset
+        self._src_reg = self._decoded.reg
 
     def _add_all_operations(self):
         self._add_decode()
@@ -1165,17 +1319,12 @@ class SOBCommand(BranchCommand):
         self._add_branch()
 
     def _add_decrement(self):
-        self._inner_ps = ProgramStatus()
-        self._subcommand = Commands.get_command_by_code(code=bitarray("0000101011000" + self._src_reg.to01(),
-                                                                      endian='big'),
-                                                        program_status=self._inner_ps, add_decode=False)
-
-        self._dest_operand = self._subcommand.dest_operand
-        self._operations.extend(self._subcommand._operations)
+        # DEC R
+        self._dest_operand = self._add_subcommand(code=0o005300 | self._src_reg).dest_operand
 
     def _add_branch(self):
         self._operations.append({"operation": Operation.BRANCH_IF,
-                                 "if": lambda: self._if_branch,
+                                 "if": self.if_branch,
                                  "offset": -2 * self._offset})
 
 
@@ -1188,6 +1337,25 @@ _OFFSET_PATTERN = _COMM_PATTERN.format("offset", "{8}")
 _NUMBER_PATTERN = _COMM_PATTERN.format("number", "{6}")
 _SOB_OFFSET_PTRN = _COMM_PATTERN.format("offset", "{6}")
 
+_LAYOUT_PATTERN = re.compile(r'\(\?P<(?P<name>\w+)>(?:\[01\]\{(?P<width>\d+)\}|0\|1)\)|(?P<bits>[01]+)')
+
+
+def _parse_layout(pattern: str):
+    fixed_bits = 0
+    fields = []
+    position = 16
+    for matcher in _LAYOUT_PATTERN.finditer(pattern):
+        if matcher.group("bits") is not None:
+            position -= len(matcher.group("bits"))
+            fixed_bits |= int(matcher.group("bits"), 2) << position
+        else:
+            width = int(matcher.group("width") or 1)
+            position -= width
+            fields.append((matcher.group("name"), position, width))
+
+    assert position == 0
+    return fixed_bits, tuple(fields)
+
 
 class InstanceCommand(enum.Enum):
     CLR  = (_MSB_PATTERN + r'000101000'  + _DEST_PATTERN,                CLRCommand,  "CLR",  True,  4)
@@ -1243,6 +1411,7 @@ class InstanceCommand(enum.Enum):
 
     def __init__(self, pattern, klass, representation: str, dest_stored: bool, alu_cycles):
         self._pattern = re.compile(pattern=pattern)
+        self._fixed_bits, self._fields = _parse_layout(pattern)
         self._klass = klass
         self._string_representation = representation
         self._dest_stored = dest_stored
@@ -1268,21 +1437,84 @@ class InstanceCommand(enum.Enum):
     def alu_cycles(self):
         return self._alu_cycles
 
+    @property
+    def fixed_bits(self):
+        return self._fixed_bits
+
+    @property
+    def fields(self):
+        return self._fields
+
+
+class DecodedInstruction:
+    __slots__ = ("instance", "on_byte", "src_mode", "src_reg", "dest_mode", "dest_reg", "reg", "offset", "number")
+
+    def __init__(self, instance: InstanceCommand, msb=0, srcmode=0, srcreg=0, destmode=0, destreg=0, reg=0,
+                 offset=0, number=0):
+        self.instance = instance
+        self.on_byte = msb == 1
+        self.src_mode = srcmode
+        self.src_reg = srcreg
+        self.dest_mode = destmode
+        self.dest_reg = destreg
+        self.reg = reg
+        self.offset = offset
+        self.number = number
+
+
+def _build_decode_table() -> list:
+    table = [None] * (1 << 16)
+    for command_instance in InstanceCommand:
+        fields = command_instance.fields
+        for values in itertools.product(*(range(1 << width) for _, _, width in fields)):
+            code = command_instance.fixed_bits
+            for (_, shift, _), value in zip(fields, values):
+                code |= value << shift
+
+            # Patterns are matched in declaration order, the first one wins
+            if table[code] is None:
+                table[code] = DecodedInstruction(command_instance,
+                                                 **{name: value for (name, _, _), value in zip(fields, values)})
+
+    return table
+
 
 class Commands:
+    _decode_table = None
+    _templates = {}
+
+    @staticmethod
+    def decode(code: int) -> DecodedInstruction:
+        if Commands._decode_table is None:
+            Commands._decode_table = _build_decode_table()
+        return Commands._decode_table[code]
+
+    @staticmethod
+    def build_command(code: int, add_decode=True, first_slot=0, inner_program_status=False) -> AbstractCommand:
+        if not 0 <= code < (1 << 16):
+            raise CommandWrongNumberBits()
+
+        decoded = Commands.decode(code)
+        if decoded is None:
+            raise UnknownCommand(code=code)
+
+        command_instance = decoded.instance
+        return command_instance.klass(decoded=decoded, type_=command_instance, on_byte=decoded.on_byte,
+                                      add_decode=add_decode, alu_cycles=command_instance.alu_cycles,
+                                      first_slot=first_slot, inner_program_status=inner_program_status)
+
+    @staticmethod
+    def get_command_by_word(code: int) -> AbstractCommand:
+        command = Commands._templates.get(code)
+        if command is None:
+            command = Commands.build_command(code=code)
+            command._freeze()
+            Commands._templates[code] = command
+        return command
+
     @staticmethod
-    def get_command_by_code(code: bitarray, program_status: ProgramStatus, add_decode=True) -> AbstractCommand:
+    def get_command_by_code(code: bitarray) -> AbstractCommand:
         if code.length() != 16:
             raise CommandWrongNumberBits()
 
-        for command_instance in list(InstanceCommand):
-            matcher = command_instance.pattern.match(code.to01())
-            if matcher is not None:
-                on_byte = False
-                if "msb" in matcher.groupdict():
-                    on_byte = (matcher.group("msb") == "1")
-                return command_instance.klass(matcher=matcher, program_status=program_status, type_=command_instance,
-                                              on_byte=on_byte, add_decode=add_decode,
-                                              alu_cycles=command_instance.alu_cycles)
-
-        raise UnknownCommand(code=code)
+        return Commands.get_command_by_word(code=int(code.to01(), 2))
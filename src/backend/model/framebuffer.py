@@ -0,0 +1,68 @@
+import numpy
+
+
+def rgb(red: int, green: int, blue: int) -> int:
+    # Opaque 0xAARRGGBB, the same value as Qt's qRgb
+    return 0xFF000000 | (red << 16) | (green << 8) | blue
+
+
+class Frame:
+    """An image of the screen made by HeadlessVideoBackend: color indices and the color table."""
+
+    def __init__(self, pixels: numpy.ndarray, color_table: list):
+        pixels.setflags(write=False)
+        self._pixels = pixels
+        self._color_table = tuple(color_table)
+
+    @property
+    def width(self) -> int:
+        return self._pixels.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self._pixels.shape[0]
+
+    @property
+    def pixels(self) -> numpy.ndarray:
+        return self._pixels
+
+    @property
+    def color_table(self) -> tuple:
+        return self._color_table
+
+    def pixel_index(self, x: int, y: int) -> int:
+        return int(self._pixels[y, x])
+
+    def pixel(self, x: int, y: int) -> int:
+        return self._color_table[self._pixels[y, x]]
+
+    def rgb(self) -> numpy.ndarray:
+        # 0xAARRGGBB for every pixel
+        return numpy.array(self._color_table, dtype=numpy.uint32)[self._pixels]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Frame):
+            return NotImplemented
+        return self._color_table == other._color_table and numpy.array_equal(self._pixels, other._pixels)
+
+    __hash__ = None
+
+
+class VideoBackend:
+    """Makes the image VideoMemory.image returns and on_show receives out of the screen's color indices."""
+
+    def image(self, pixels: numpy.ndarray, color_table: list):
+        raise NotImplementedError()
+
+
+class HeadlessVideoBackend(VideoBackend):
+    def image(self, pixels: numpy.ndarray, color_table: list) -> Frame:
+        return Frame(pixels, color_table)
+
+
+class FrameSink:
+    """Receives every frame VideoMemory presents, see VideoMemory.add_capture."""
+
+    def capture(self, pixels: numpy.ndarray, color_table: list):
+        # pixels must not change after the call
+        raise NotImplementedError()
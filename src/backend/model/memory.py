@@ -1,5 +1,5 @@
 from src.backend.utils.exceptions import MemoryException, MemoryIndexOutOfBound, MemoryOddAddressing, \
-    MemoryWrongConfiguration
+    MemoryWrongConfiguration, MemoryDeviceOverlap
 from src.backend.model.video import VideoMemory, VideoMode
 from src.backend.model.registers import VideoMemoryRegisterModeStart, VideoMemoryRegisterOffset, KeyboardRegister
 from bitarray import bitarray
@@ -30,6 +30,8 @@ class MemoryPart(enum.Enum):
 
 class Memory:
     SIZE = 64 * 1024
+    PAGE_SHIFT = 8
+    PAGE_SIZE = 1 << PAGE_SHIFT
 
     def __init__(self):
         self._data = bytearray(0 for _ in range(0, Memory.SIZE))
@@ -44,33 +46,172 @@ class Memory:
         self._video = VideoMemory(self._video_register_mode_start, self._video_register_offset)
         self._check_configuration()
 
+        # One entry per memory word: None for plain RAM/ROM, otherwise (device, on_store) of the device mapped
+        # there. Devices implement load_value(address, size) and store_value(address, size, value).
+        self._device_map = [None] * (Memory.SIZE // 2)
+        self.register_device(self._video.VRAM_start, self._video.VRAM_start + self._video.size, self._video)
+        self.register_device(self._video_register_mode_start.address, self._video_register_mode_start.address + 2,
+                             self._video_register_mode_start, on_store=self._on_video_mode_store)
+        self.register_device(self._video_register_offset.address, self._video_register_offset.address + 2,
+                             self._video_register_offset,
+                             on_store=lambda: self._video.set_offset(self._video_register_offset))
+        self.register_device(self._keyboard_register.address, self._keyboard_register.address + 2,
+                             self._keyboard_register)
+
+        # Words holding translated code: a plain store to one of them is reported to the code watcher
+        self._code_words = bytearray(Memory.SIZE // 2)
+        self._code_watcher = None
+        # Pages of the last snapshot taken or restored, and the pages stored to since. The next snapshot copies
+        # only those and shares the rest.
+        self._pages = (bytes(Memory.PAGE_SIZE),) * (Memory.SIZE // Memory.PAGE_SIZE)
+        self._dirty_pages = set()
+
+    def register_device(self, start: int, end: int, device, on_store=None) -> None:
+        if start % 2 == 1 or end % 2 == 1 or not 0 <= start < end <= Memory.SIZE:
+            raise MemoryException(what="device window must be word aligned and lie inside memory")
+
+        if any(entry is not None for entry in self._device_map[start // 2: end // 2]):
+            raise MemoryDeviceOverlap(start, end)
+
+        self._device_map[start // 2: end // 2] = [(device, on_store)] * ((end - start) // 2)
+
+    def unregister_device(self, device) -> None:
+        for i, entry in enumerate(self._device_map):
+            if entry is not None and entry[0] is device:
+                self._device_map[i] = None
+
+    def snapshot(self) -> tuple:
+        if self._dirty_pages:
+            view = memoryview(self._data)
+            pages = list(self._pages)
+            for page in self._dirty_pages:
+                start = page << Memory.PAGE_SHIFT
+                pages[page] = bytes(view[start: start + Memory.PAGE_SIZE])
+            self._pages = tuple(pages)
+            self._dirty_pages.clear()
+
+        registers = (self._video_register_mode_start.get(size="word", signed=False),
+                     self._video_register_offset.get(size="word", signed=False),
+                     self._keyboard_register.get(size="word", signed=False))
+        return self._pages, registers, self._video.snapshot()
+
+    def restore(self, state: tuple) -> None:
+        # Plain stores are bypassed, so the code watcher isn't notified
+        pages, registers, video = state
+        self._data[:] = b"".join(pages)
+        self._pages = pages
+        self._dirty_pages.clear()
+
+        for register, value in zip((self._video_register_mode_start, self._video_register_offset,
+                                    self._keyboard_register), registers):
+            register.set(size="word", signed=False, value=value)
+
+        VRAM_start = self._video.VRAM_start
+        self._video.restore(video)
+        if self._video.VRAM_start != VRAM_start:
+            self.unregister_device(self._video)
+            self.register_device(self._video.VRAM_start, self._video.VRAM_start + self._video.size, self._video)
+
+    def set_code_watcher(self, on_store) -> None:
+        self._code_watcher = on_store
+        self._code_words[:] = bytes(len(self._code_words))
+
+    def watch_code(self, start: int, end: int, watched: bool=True) -> None:
+        start, end = max(start, 0) // 2, (min(end, Memory.SIZE) + 1) // 2
+        self._code_words[start: end] = (b"\x01" if watched else b"\x00") * (end - start)
+
+    def load_word(self, address: int) -> int:
+        if address & 1:
+            raise MemoryOddAddressing()
+        if address < 0 or address > Memory.SIZE - 2:
+            raise MemoryIndexOutOfBound()
+
+        device = self._device_map[address >> 1]
+        if device is not None:
+            return device[0].load_value(address=address, size="word")
+
+        data = self._data
+        return data[address] | (data[address + 1] << 8)
+
+    def load_byte(self, address: int) -> int:
+        if address < 0 or address >= Memory.SIZE:
+            raise MemoryIndexOutOfBound()
+
+        device = self._device_map[address >> 1]
+        if device is not None:
+            return device[0].load_value(address=address, size="byte")
+
+        return self._data[address]
+
+    def store_word(self, address: int, value: int) -> None:
+        if address & 1:
+            raise MemoryOddAddressing()
+        if address < 0 or address > Memory.SIZE - 2:
+            raise MemoryIndexOutOfBound()
+        if not 0 <= value <= 0xFFFF:
+            raise MemoryException(what="stored value doesn't fit in a word")
+
+        device = self._device_map[address >> 1]
+        if device is not None:
+            device[0].store_value(address=address, size="word", value=value)
+            if device[1] is not None:
+                device[1]()
+            return
+
+        self._data[address] = value & 0xFF
+        self._data[address + 1] = value >> 8
+        self._dirty_pages.add(address >> Memory.PAGE_SHIFT)
+        if self._code_words[address >> 1]:
+            self._code_watcher(address)
+
+    def store_byte(self, address: int, value: int) -> None:
+        if address < 0 or address >= Memory.SIZE:
+            raise MemoryIndexOutOfBound()
+        if not 0 <= value <= 0xFF:
+            raise MemoryException(what="stored value doesn't fit in a byte")
+
+        device = self._device_map[address >> 1]
+        if device is not None:
+            device[0].store_value(address=address, size="byte", value=value)
+            if device[1] is not None:
+                device[1]()
+            return
+
+        self._data[address] = value
+        self._dirty_pages.add(address >> Memory.PAGE_SHIFT)
+        if self._code_words[address >> 1]:
+            self._code_watcher(address)
+
+    def store_block(self, address: int, data: bytes) -> None:
+        # Bulk copy into plain memory, e.g. to fill ROM
+        end = address + len(data)
+        if address < 0 or end > Memory.SIZE:
+            raise MemoryIndexOutOfBound()
+        if any(entry is not None for entry in self._device_map[address >> 1: (end + 1) >> 1]):
+            raise MemoryException(what="block overlaps a device")
+
+        self._data[address: end] = data
+        self._dirty_pages.update(range(address >> Memory.PAGE_SHIFT, ((end - 1) >> Memory.PAGE_SHIFT) + 1))
+        for word in range(address >> 1, (end + 1) >> 1):
+            if self._code_words[word]:
+                self._code_watcher(word * 2)
+
     def load(self, address: int, size: str) -> bitarray:
         Memory._check_arguments(address, size)
-        bitarr = self._load_from_devices(address, size)
-        if bitarr is not None:
-            return bitarr
-
-        value = bitarray(endian='big')
-        value.frombytes(bytes(self._data[address: address+1]))
         if size == 'word':
-            tmp = bitarray(endian='big')
-            tmp.frombytes(bytes(self._data[address+1: address+2]))
-            tmp.extend(value)
-            value = tmp
-        return value
+            return bitarray("{:016b}".format(self.load_word(address)), endian='big')
+        return bitarray("{:08b}".format(self.load_byte(address)), endian='big')
 
     def store(self, address: int, size: str, value: bitarray) -> None:
         Memory._check_arguments(address, size)
-        if self._store_to_devices(address, size, value):
-            return
-
         num_bytes = 1 if size == 'byte' else 2
         if value.length() != num_bytes * 8:
             raise MemoryException(what="num of stored bits doesn't correspond to predefined size")
 
-        self._data[address: address+1] = value[value.length() - 8: value.length()].tobytes()
         if num_bytes == 2:
-            self._data[address+1: address+2] = value[0: 8].tobytes()
+            self.store_word(address, int(value.to01(), 2))
+        else:
+            self.store_byte(address, int(value.to01(), 2))
 
     @property
     def video_register_mode_start_address(self) -> int:
@@ -92,6 +233,16 @@ class Memory:
     def data(self):
         return self._data
 
+    @property
+    def view(self) -> memoryview:
+        return memoryview(self._data)
+
+    @property
+    def words(self) -> memoryview:
+        # Zero-copy view of the backing store as 16-bit words in host order, which matches the little-endian
+        # machine on little-endian hosts. Device windows (VRAM, I/O registers) are not backed by it.
+        return memoryview(self._data).cast('H')
+
     @property
     def video(self) -> VideoMemory:
         return self._video
@@ -128,48 +279,13 @@ class Memory:
                 or self._video.VRAM_start < MemoryPart.VRAM.start:
             raise MemoryWrongConfiguration()
 
-    def _load_from_devices(self, address: int, size: str):
-        if address >= self._video.VRAM_start and address < self._video.VRAM_start + self._video.size:
-            return self._video.load(address=address, size=size)
-
-        if (address // 2) * 2 == self._video_register_mode_start.address:
-            return self._video_register_mode_start.load(address=address, size=size)
-
-        if (address // 2) * 2 == self._video_register_offset.address:
-            return self._video_register_offset.load(address=address, size=size)
-
-        if (address // 2) * 2 == self._keyboard_register.address:
-            return self._keyboard_register.load(address=address, size=size)
-
-        return None
-
-    def _store_to_devices(self, address: int, size: str, value: bitarray) -> bool:
-        if address >= self._video.VRAM_start and address < self._video.VRAM_start + self._video.size:
-            self._video.store(address=address, size=size, value=value)
-            return True
-
-        if (address // 2) * 2 == self._video_register_mode_start.address:
-            self._video_register_mode_start.store(address=address, size=size, value=value)
-            self._video.set_mode(self._video_register_mode_start)
-            self._check_configuration()
-            return True
-
-        if (address // 2) * 2 == self._video_register_offset.address:
-            self._video_register_offset.store(address=address, size=size, value=value)
-            self._video.set_offset(self._video_register_offset)
-            return True
-
-        if (address // 2) * 2 == self._keyboard_register.address:
-            self._keyboard_register.store(address=address, size=size, value=value)
-            return True
-
-        return False
+    def _on_video_mode_store(self):
+        VRAM_start = self._video.VRAM_start
+        self._video.set_mode(self._video_register_mode_start)
+        self._check_configuration()
+        if self._video.VRAM_start != VRAM_start:
+            self.unregister_device(self._video)
+            self.register_device(self._video.VRAM_start, self._video.VRAM_start + self._video.size, self._video)
 
     def operation_on_device(self, address: int) -> bool:
-        if self._video.VRAM_start <= address < self._video.VRAM_start + self._video.size \
-                or (address // 2) * 2 == self._video_register_mode_start.address \
-                or (address // 2) * 2 == self._video_register_offset.address \
-                or (address // 2) * 2 == self._keyboard_register.address:
-            return True
-
-        return False
+        return 0 <= address < Memory.SIZE and self._device_map[address >> 1] is not None
@@ -3,25 +3,32 @@ from src.backend.utils.exceptions import ProgramStatusException
 
 
 class ProgramStatus(Register):
+    # Flags live in the top nibble of the word: V, N, C, Z from bit 15 down to bit 12
+    BIT_MASKS = {"V": 1 << 15, "N": 1 << 14, "C": 1 << 13, "Z": 1 << 12}
+
     def __init__(self):
         super(ProgramStatus, self).__init__()
-        self._bits_pos = {"V": 0, "N": 1, "C": 2, "Z": 3}
 
     def get_status(self, bit: str) -> bool:
-        if bit not in self._bits_pos.keys():
+        mask = ProgramStatus.BIT_MASKS.get(bit)
+        if mask is None:
             raise ProgramStatusException(what="Unknown bit {}".format(bit))
 
-        return self._data[self._bits_pos[bit]]
+        return bool(self._value & mask)
 
     def set_status(self, bit: str, value: bool):
-        if bit not in self._bits_pos.keys():
+        mask = ProgramStatus.BIT_MASKS.get(bit)
+        if mask is None:
             raise ProgramStatusException(what="Unknown bit {}".format(bit))
 
-        self._data[self._bits_pos[bit]] = value
+        if value:
+            self._value |= mask
+        else:
+            self._value &= ~mask & 0xFFFF
 
     def clear(self):
-        self._data.setall(False)
+        self._value = 0
 
     @property
     def bits(self):
-        return {k: self._data[v] for k, v in self._bits_pos.items()}
+        return {k: bool(self._value & mask) for k, mask in ProgramStatus.BIT_MASKS.items()}
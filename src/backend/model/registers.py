@@ -9,61 +9,65 @@ from bitarray import bitarray
 
 
 class Register:
-    def __init__(self):
-        self._data = bitarray((False for _ in range(16)), endian="big")
-        self._integer_representations = {}
+    """16-bit register stored as an unsigned int.
 
-    def get(self, size: str, signed: bool) -> int:
-        if size not in ("byte", "word"):
-            raise RegisterException(what="size is not in ('byte', 'word')")
+    ``get``/``set`` are the primary API; the bitarray accessors ``byte``, ``word``, ``set_byte`` and
+    ``set_word`` are kept for compatibility and convert on every call.
+    """
 
-        if (size, signed) not in self._integer_representations:
-            self._integer_representations[(size, signed)] \
-                = int.from_bytes(Register.INTEGER_REPRESENTATION_PROPERTIES[size]["getter"](self).tobytes(),
-                                 byteorder='big', signed=signed)
+    def __init__(self):
+        self._value = 0
 
-        return self._integer_representations[(size, signed)]
+    def get(self, size: str, signed: bool) -> int:
+        if size == "word":
+            value = self._value
+            return value - 0x10000 if signed and value & 0x8000 else value
+        if size == "byte":
+            value = self._value & 0xFF
+            return value - 0x100 if signed and value & 0x80 else value
+        raise RegisterException(what="size is not in ('byte', 'word')")
 
     def set(self, size: str, signed: bool, value: int):
         if size not in ("byte", "word"):
             raise RegisterException(what="size is not in ('byte', 'word')")
 
-        min_value = Register.BOUND_PROPERTIES[(size, signed)][0]
-        max_value = Register.BOUND_PROPERTIES[(size, signed)][1]
-        num_bytes = Register.INTEGER_REPRESENTATION_PROPERTIES[size]["bytes"]
+        min_value, max_value = Register.BOUND_PROPERTIES[(size, signed)]
         if value < min_value or value > max_value:
-            raise RegisterOutOfBound(value=value, bytes=num_bytes, signed=signed)
+            raise RegisterOutOfBound(value=value, bytes=Register.INTEGER_REPRESENTATION_PROPERTIES[size]["bytes"],
+                                     signed=signed)
 
-        data = bitarray(endian='big')
-        data.frombytes(value.to_bytes(num_bytes, byteorder='big', signed=signed))
-        Register.INTEGER_REPRESENTATION_PROPERTIES[size]["setter"](self, data)
-        self._integer_representations[(size, signed)] = value
+        if size == "word":
+            self._value = value & 0xFFFF
+        else:
+            self._value = (self._value & 0xFF00) | (value & 0xFF)
 
     def byte(self) -> bitarray:
-        return self._data[8: 16]
+        return bitarray("{:08b}".format(self._value & 0xFF), endian='big')
 
     def set_byte(self, value: bitarray):
-        self._reset_integer_representations()
         if value.length() != 8:
             raise RegisterWrongNumberBits(8)
-        self._data[8: 16] = value
+        self._value = (self._value & 0xFF00) | int(value.to01(), 2)
 
     def word(self) -> bitarray:
-        return self._data[0: 16]
+        return bitarray("{:016b}".format(self._value), endian='big')
 
     def set_word(self, value: bitarray):
-        self._reset_integer_representations()
         if value.length() != 16:
             raise RegisterWrongNumberBits(16)
-        self._data[0: 16] = value
+        self._value = int(value.to01(), 2)
 
     def reverse(self):
-        tmp = self._data[0: 8]
-        self._data[0: 8] = self._data[8: 16]
-        self._data[8: 16] = tmp
+        self._value = ((self._value & 0xFF) << 8) | (self._value >> 8)
 
-    def _reset_integer_representations(self):
-        self._integer_representations.clear()
+    def snapshot(self) -> int:
+        return self._value
+
+    def restore(self, value: int):
+        # The value came from snapshot(), so it passed the checks of this register when it was set
+        if not 0 <= value <= 0xFFFF:
+            raise RegisterOutOfBound(value=value, bytes=2, signed=False)
+        self._value = value
 
     INTEGER_REPRESENTATION_PROPERTIES = {"byte": {"getter": byte, "setter": set_byte, "bytes": 1},
                                          "word": {"getter": word, "setter": set_word, "bytes": 2}}
@@ -74,10 +78,10 @@ class Register:
                         ("word", False): (0, 65535)}
 
     def inc(self, value: int=1):
-        self.set(size="word", signed=False, value=self.get(size="word", signed=False) + value)
+        self.set(size="word", signed=False, value=self._value + value)
 
     def dec(self, value: int=1):
-        self.set(size="word", signed=False, value=self.get(size="word", signed=False) - value)
+        self.set(size="word", signed=False, value=self._value - value)
 
 
 class OnlyEvenValueRegister(Register):
@@ -88,7 +92,7 @@ class OnlyEvenValueRegister(Register):
         raise NotImplementedError()
 
     def set_word(self, value: bitarray):
-        if value.length() > 0 and value[-1] is True:
+        if value.length() > 0 and value[-1]:
             raise RegisterOddValue()
         super().set_word(value)
 
@@ -139,7 +143,7 @@ class StackPointer(OnlyEvenValueRegister):
         def __call__(self, call):
             def wrapper(self, **kwargs):
                 result = call(self, **kwargs)
-                num_value = self.get(size="word", signed=False)
+                num_value = self._value
                 if num_value < self._lower_bound or num_value > self._upper_bound:
                     raise StackOverflow(self)
                 return result
@@ -184,6 +188,21 @@ class MemoryRegister(Register):
         assert address % 2 == 0
         self._address = address
 
+    def load_value(self, address: int, size: str) -> int:
+        assert (address // 2) * 2 == self._address and (size == 'byte' or address % 2 == 0)
+        if size == 'word':
+            return self._value
+        return (self._value >> 8) if address % 2 == 1 else (self._value & 0xFF)
+
+    def store_value(self, address: int, size: str, value: int) -> None:
+        assert (address // 2) * 2 == self._address and (size == 'byte' or address % 2 == 0)
+        if size == 'word':
+            self._value = value
+        elif address % 2 == 1:
+            self._value = (self._value & 0xFF) | (value << 8)
+        else:
+            self._value = (self._value & 0xFF00) | value
+
     def load(self, address: int, size: str) -> bitarray:
         assert (address // 2) * 2 == self._address and (size == 'byte' or address % 2 == 0)
         if size == 'byte' and address % 2 == 1:
@@ -217,11 +236,11 @@ class KeyboardRegister(MemoryRegister):
 
     @property
     def interrupt_permitted(self) -> bool:
-        return self._data[0]
+        return bool(self._value & 0x8000)
 
     @interrupt_permitted.setter
     def interrupt_permitted(self, value: bool):
-        self._data[0] = value
+        self._value = (self._value | 0x8000) if value else (self._value & 0x7FFF)
 
     @property
     def key_index(self) -> int:
@@ -235,16 +254,16 @@ class KeyboardRegister(MemoryRegister):
 class VideoMemoryRegisterModeStart(MemoryRegister):
     def __init__(self, address: int, VRAM_start: int, mode: int):
         super(VideoMemoryRegisterModeStart, self).__init__(address)
-        self._data = bitarray("{:02b}".format(mode) + "{:014b}".format(VRAM_start // 4), endian='big')
-        assert self._data.length() == 16
+        assert 0 <= mode < 4 and 0 <= VRAM_start // 4 < 2 ** 14
+        self._value = (mode << 14) | (VRAM_start // 4)
 
     @property
     def VRAM_start(self) -> int:
-        return int(self._data[2:16].to01(), 2) * 4
+        return (self._value & 0x3FFF) * 4
 
     @property
     def mode(self) -> int:
-        return int(self._data[0:2].to01(), 2)
+        return self._value >> 14
 
 
 class VideoMemoryRegisterOffset(MemoryRegister):
@@ -252,16 +271,16 @@ class VideoMemoryRegisterOffset(MemoryRegister):
 
     def __init__(self, address: int, offset: int):
         super(VideoMemoryRegisterOffset, self).__init__(address)
-        self._data = bitarray("{:016b}".format(offset), endian='big')
+        self._value = offset & 0xFFFF
 
     @property
     def offset(self) -> int:
-        return int(self._data[1:16].to01(), 2)
+        return self._value & 0x7FFF
 
     @property
     def bit_clear(self) -> bool:
-        return self._data[0]
+        return bool(self._value & 0x8000)
 
     @bit_clear.setter
     def bit_clear(self, value: bool):
-        self._data[0] = value
\ No newline at end of file
+        self._value = (self._value | 0x8000) if value else (self._value & 0x7FFF)
\ No newline at end of file
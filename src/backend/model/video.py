@@ -1,17 +1,20 @@
 import enum
+import time
 
-from PyQt5.QtGui import QImage, qRgb
+import numpy
 from bitarray import bitarray
 
+from src.backend.model.framebuffer import VideoBackend, HeadlessVideoBackend, FrameSink, rgb
 from src.backend.model.registers import Register, VideoMemoryRegisterModeStart, \
     VideoMemoryRegisterOffset
 from src.backend.utils.exceptions import VideoException, VideoWrongMode
+from src.backend.utils.statistics import VideoStatistics
 
 
 class VideoMode(enum.Enum):
     MODE_O = (0, 256, 256, 1, {
-        0: qRgb(0, 0, 0),
-        1: qRgb(255, 255, 255)
+        0: rgb(0, 0, 0),
+        1: rgb(255, 255, 255)
     })
 
     def __init__(self, mode: int, height: int, width: int, depth: int, color_table: dict):
@@ -23,14 +26,43 @@ class VideoMode(enum.Enum):
 
 
 class VideoMemory:
-    def __init__(self, reg_mode: VideoMemoryRegisterModeStart, reg_offset: VideoMemoryRegisterOffset, on_show=None):
+    """Framebuffer of the monitor.
+
+    VRAM is a packed byte buffer, the first pixel of a byte in its high bits. The buffer is a ring of
+    scanlines: the screen starts at the row at _base, so scrolling moves _base and clears the rows it
+    exposes. Addresses are relative to the screen, and the indexed image is composed and unpacked only when
+    it is asked for.
+
+    Stores mark the screen rows they touch as dirty. show() presents at most one frame per frame interval
+    and passes on_show the range of dirty rows; a show() that comes too early is coalesced into the next
+    frame, or into flush() if the burst ends first. The image itself is made by the video backend, so the
+    framebuffer works without Qt. Every presented frame also goes to the attached frame captures.
+    """
+
+    FRAME_RATE = 60
+
+    def __init__(self, reg_mode: VideoMemoryRegisterModeStart, reg_offset: VideoMemoryRegisterOffset, on_show=None,
+                 backend: VideoBackend=None):
         self._on_show = on_show
+        self._backend = backend if backend is not None else HeadlessVideoBackend()
         self._mode: VideoMode = None
-        self._image: QImage = None
+        self._vram: bytearray = None
+        # Offset in _vram of the first byte on the screen
+        self._base = 0
+        self._image = None
         self._offset = 0
         self._size: int = None
         self._VRAM_start: int = None
         self._white_index: int = None
+        self._white_byte: int = None
+        # Dirty screen rows are [_dirty_first, _dirty_last)
+        self._dirty_first = 0
+        self._dirty_last = 0
+        self._frame_rate = self.FRAME_RATE
+        self._next_frame = 0.0
+        self._pending = False
+        self._statistics = VideoStatistics()
+        self._captures = []
         self.set_mode(reg_mode)
         self.set_offset(reg_offset)
 
@@ -48,29 +80,38 @@ class VideoMemory:
             return
         for md in list(VideoMode):
             if md.mode == mode:
-                self._mode = md
+                self._init_mode(md)
 
-        self._image = QImage(self._mode.width, self._mode.height, QImage.Format_Indexed8)
-        for k, v in self._mode.color_table.items():
-            self._image.setColor(k, v)
-        white = qRgb(255, 255, 255)
+    def _init_mode(self, mode: VideoMode):
+        self._mode = mode
+        white = rgb(255, 255, 255)
         self._white_index = None
         for index, color in self._mode.color_table.items():
             if color == white:
                 self._white_index = index
                 break
         assert self._white_index is not None
-        self._image.fill(self._white_index)
 
         assert self._mode.width * self._mode.height * self._mode.depth % 16 == 0, "Wrong configuration"
         assert self._mode.width * self._mode.depth % 8 == 0, "Wrong configuration"
         assert 8 % self._mode.depth == 0, "Wrong configuration"
         self._size = self._mode.width * self._mode.height * self._mode.depth // 8
+        assert self.line_size % 2 == 0, "Wrong configuration"
+
+        self._white_byte = 0
+        for _ in range(8 // self._mode.depth):
+            self._white_byte = (self._white_byte << self._mode.depth) | self._white_index
+        self._vram = bytearray([self._white_byte]) * self._size
+        self._base = 0
+        self._image = None
+        self._mark_all_dirty()
 
     def set_offset(self, reg_offset: VideoMemoryRegisterOffset):
         offset = reg_offset.offset
         if reg_offset.bit_clear:
-            self._image.fill(self._white_index)
+            self._vram[:] = bytes([self._white_byte]) * self._size
+            self._image = None
+            self._mark_all_dirty()
             reg_offset.bit_clear = False
             self._offset = offset
             return
@@ -78,52 +119,139 @@ class VideoMemory:
         if self._offset == offset:
             return
 
-        image = QImage(self._mode.width, self._mode.height, QImage.Format_Indexed8)
-        image.setColorTable(self._image.colorTable())
         diff = offset - self._offset
         if diff < 0:
             diff = reg_offset.MAX_OFFSET + diff + 1
         self._offset = offset
-        for y in range(self._mode.height):
-            from_y = y + diff
-            for x in range(self._mode.width):
-                if from_y >= self._mode.height:
-                    image.setPixel(x, y, self._white_index)
-                else:
-                    image.setPixel(x, y, self._image.pixelIndex(x, from_y))
 
-        self._image = image
+        # Rows move up by diff: the top rows become the exposed rows at the bottom and are cleared
+        shift = min(diff, self._mode.height) * self.line_size
+        end = self._base + shift
+        if end <= self._size:
+            self._vram[self._base: end] = bytes([self._white_byte]) * shift
+        else:
+            self._vram[self._base:] = bytes([self._white_byte]) * (self._size - self._base)
+            self._vram[:end - self._size] = bytes([self._white_byte]) * (end - self._size)
+        self._base = end % self._size
+        self._image = None
+        self._mark_all_dirty()
+
+    def snapshot(self) -> tuple:
+        return self._mode.mode, self._VRAM_start, self._offset, self.vram
+
+    def restore(self, state: tuple):
+        mode, self._VRAM_start, self._offset, vram = state
+        if mode != self._mode.mode:
+            self._init_mode(next(md for md in list(VideoMode) if md.mode == mode))
+
+        if len(vram) != self._size:
+            raise VideoException(what="snapshot doesn't match the video mode")
+        self._vram[:] = vram
+        self._base = 0
+        self._image = None
+        self._mark_all_dirty()
 
     def set_on_show(self, on_show):
         self._on_show = on_show
 
-    def load(self, address: int, size: str) -> bitarray:
-        points = self._get_pixels_by_address(address)
-        bitarr = bitarray(endian="big")
-        for point in points:
-            bitarr.extend(self._pixel_to_bits(point=point))
+    def add_capture(self, capture: FrameSink):
+        self._captures.append(capture)
 
-        if size == 'word':
-            tmp = self.load(address=address+1, size='byte')
-            tmp.extend(bitarr)
-            bitarr = tmp
+    def remove_capture(self, capture: FrameSink):
+        self._captures.remove(capture)
 
-        return bitarr
+    def set_backend(self, backend: VideoBackend):
+        self._backend = backend
+        self._image = None
 
-    def store(self, address: int, size: str, value: bitarray):
-        points = self._get_pixels_by_address(address)
-        tmp = value[value.length() - 8: value.length()]
-        tmp_pos = 0
-        for point in points:
-            self._image.setPixel(point[0], point[1], int(tmp[tmp_pos: tmp_pos + self._mode.depth].to01(), 2))
-            tmp_pos += self._mode.depth
+    def load_value(self, address: int, size: str) -> int:
+        index = address - self._VRAM_start + self._base
+        if index >= self._size:
+            index -= self._size
+        if size == 'word':
+            return self._vram[index] | (self._vram[index + 1] << 8)
+        return self._vram[index]
 
+    def store_value(self, address: int, size: str, value: int):
+        # A word never crosses a scanline, so it never wraps around the ring
+        relative = address - self._VRAM_start
+        index = relative + self._base
+        if index >= self._size:
+            index -= self._size
+        self._vram[index] = value & 0xFF
         if size == 'word':
-            self.store(address=address+1, size="byte", value=value[0: 8])
+            self._vram[index + 1] = value >> 8
+        self._image = None
+
+        row = relative // self.line_size
+        if row < self._dirty_first:
+            self._dirty_first = row
+        if row >= self._dirty_last:
+            self._dirty_last = row + 1
+
+    def _mark_all_dirty(self):
+        self._dirty_first = 0
+        self._dirty_last = self._mode.height
+
+    def load(self, address: int, size: str) -> bitarray:
+        bits = "{:016b}" if size == 'word' else "{:08b}"
+        return bitarray(bits.format(self.load_value(address=address, size=size)), endian="big")
+
+    def store(self, address: int, size: str, value: bitarray):
+        self.store_value(address=address, size=size, value=int(value.to01(), 2))
 
     def show(self):
+        if self._dirty_first >= self._dirty_last:
+            return
+        now = time.monotonic()
+        if now < self._next_frame:
+            self._pending = True
+            self._statistics.coalesced += 1
+            return
+        self._present(now)
+
+    def flush(self):
+        # Presents the frame held back by the frame rate cap
+        if self._pending:
+            self._present(time.monotonic())
+
+    def present_due(self):
+        # Presents the frame held back by the frame rate cap once its frame interval has passed
+        if self._pending:
+            now = time.monotonic()
+            if now >= self._next_frame:
+                self._present(now)
+
+    def _present(self, now: float):
+        rows = (self._dirty_first, self._dirty_last)
+        self._dirty_first = self._mode.height
+        self._dirty_last = 0
+        self._pending = False
+        if self._frame_rate:
+            self._next_frame = now + 1 / self._frame_rate
+        self._statistics.presented += 1
+        if self._captures:
+            pixels = self.pixels
+            for capture in self._captures:
+                capture.capture(pixels, self.color_table)
         if self._on_show is not None:
-            self._on_show(self._image)
+            self._on_show(self.image, rows)
+
+    @property
+    def frame_rate(self) -> float:
+        return self._frame_rate
+
+    @frame_rate.setter
+    def frame_rate(self, value: float):
+        # 0 presents every show()
+        if value < 0:
+            raise VideoException(what="frame rate cannot be negative")
+        self._frame_rate = value
+        self._next_frame = 0.0
+
+    @property
+    def statistics(self) -> VideoStatistics:
+        return self._statistics
 
     @property
     def mode(self):
@@ -133,25 +261,44 @@ class VideoMemory:
     def size(self):
         return self._size
 
+    @property
+    def line_size(self) -> int:
+        return self._mode.width * self._mode.depth // 8
+
     @property
     def VRAM_start(self):
         return self._VRAM_start
 
     @property
-    def image(self) -> QImage:
-        return self._image
+    def vram(self) -> bytes:
+        # As seen from the screen's first row
+        return bytes(self._vram[self._base:] + self._vram[:self._base])
 
-    def _get_pixels_by_address(self, address: int) -> list:
-        result = []
-        relative = address - self._VRAM_start
-        pixels = relative * 8 // self._mode.depth
-        y = pixels // self._mode.width
-        x = pixels % self._mode.width
-        for _ in range(8 // self._mode.depth):
-            result.append((x, y))
-            x += 1
+    @property
+    def pixels(self) -> numpy.ndarray:
+        # Color indices, one byte per pixel, height rows of width pixels
+        data = numpy.frombuffer(self._vram, dtype=numpy.uint8)
+        data = numpy.concatenate((data[self._base:], data[:self._base]))
+        depth = self._mode.depth
+        if depth == 1:
+            pixels = numpy.unpackbits(data)
+        elif depth == 8:
+            pixels = data.copy()
+        else:
+            shifts = numpy.arange(8 - depth, -1, -depth, dtype=numpy.uint8)
+            pixels = (data[:, None] >> shifts) & ((1 << depth) - 1)
+        return pixels.reshape(self._mode.height, self._mode.width)
 
-        return result
+    @property
+    def color_table(self) -> list:
+        return [self._mode.color_table[index] for index in range(len(self._mode.color_table))]
+
+    @property
+    def backend(self) -> VideoBackend:
+        return self._backend
 
-    def _pixel_to_bits(self, point) -> str:
-        return ("{:0" + str(self._mode.depth) + "b}").format(self._image.pixelIndex(point[0], point[1]))
+    @property
+    def image(self):
+        if self._image is None:
+            self._image = self._backend.image(self.pixels, self.color_table)
+        return self._image
@@ -1,8 +1,6 @@
 import enum
 import re
 
-from bitarray import bitarray
-
 
 _WHITESPACES_PATTERN = r'\s*'
 _REQUIRED_WHITESPACES_PATTERN = r'\s+'
@@ -33,132 +31,50 @@ class AssemblerException(Exception):
         return self.what
 
 
-class OperandMode:
-    def get_bits(self, operand: str, has_mode: bool, instr: list):
-        raise NotImplementedError()
-
-
-class _OPERAND_MODE_0(OperandMode):
-    def __init__(self):
-        self.pattern = re.compile((r'^' + _MODE_0_PATTERN + r'$').format("regnum"))
-        self.mode = "000"
-
-    def get_bits(self, operand: str, has_mode: bool, instr: list):
-        matcher = self.pattern.match(operand)
-        if matcher is None:
-            return None
-        result = ""
-        if has_mode:
-            result = result + self.mode
-        return "{}{:03b}".format(result, int(matcher.group("regnum")))
-
-
-class _OPERAND_MODE_1(OperandMode):
-    def __init__(self):
-        self.pattern = re.compile((r'^' + _MODE_1_PATTERN + r'$').format("regnum"))
-        self.mode = "001"
-
-    def get_bits(self, operand: str, has_mode: bool, instr: list):
-        if not has_mode:
-            return None
-        matcher = self.pattern.match(operand)
-        if matcher is None:
-            return None
-        result = self.mode
-        return "{}{:03b}".format(result, int(matcher.group("regnum")))
-
-
-class _OPERAND_MODE_2(_OPERAND_MODE_1):
-    def __init__(self):
-        super(_OPERAND_MODE_2, self).__init__()
-        self.pattern = re.compile((r'^' + _MODE_2_PATTERN + r'$').format("regnum"))
-        self.mode = "010"
-
-
-class _OPERAND_MODE_3(_OPERAND_MODE_1):
-    def __init__(self):
-        super(_OPERAND_MODE_3, self).__init__()
-        self.pattern = re.compile((r'^' + _MODE_3_PATTERN + r'$').format("regnum"))
-        self.mode = "011"
-
-
-class _OPERAND_MODE_4(_OPERAND_MODE_1):
-    def __init__(self):
-        super(_OPERAND_MODE_4, self).__init__()
-        self.pattern = re.compile((r'^' + _MODE_4_PATTERN + r'$').format("regnum"))
-        self.mode = "100"
-
-
-class _OPERAND_MODE_5(_OPERAND_MODE_1):
-    def __init__(self):
-        super(_OPERAND_MODE_5, self).__init__()
-        self.pattern = re.compile((r'^' + _MODE_5_PATTERN + r'$').format("regnum"))
-        self.mode = "101"
-
-
-class _OPERAND_MODE_6(OperandMode):
-    def __init__(self):
-        self.pattern = re.compile((r'^' + _MODE_6_PATTERN + r'$').format("number", "regnum"))
-        self.mode = "110"
-
-    def get_bits(self, operand: str, has_mode: bool, instr: list):
-        matcher = self.pattern.match(operand)
-        if matcher is None:
-            return None
-        result = ""
-        if has_mode:
-            result = result + self.mode
-        tmp = Assembler.negative_to_positive(matcher.group("number"), 2)
-        instr.append(bitarray("{:016b}".format(int(tmp, 8)), endian='big'))
-        return "{}{:03b}".format(result, int(matcher.group("regnum")))
-
-
-class _OPERAND_MODE_7(_OPERAND_MODE_6):
-    def __init__(self):
-        super(_OPERAND_MODE_7, self).__init__()
-        self.pattern = re.compile((r'^' + _MODE_7_PATTERN + r'$').format("number", "regnum"))
-        self.mode = "111"
-
-
-class _OPERAND_IMMEDIATE(OperandMode):
-    def __init__(self):
-        self.pattern = re.compile((r'^' + _IMMEDIATE_PATTERN + r'$').format("number"))
-        self.mode = "010"
-        self.reg = "111"
-
-    def get_bits(self, string: str, has_mode: bool, instr: list):
-        matcher = self.pattern.match(string)
-        if matcher is None:
-            return None
-        tmp = Assembler.negative_to_positive(matcher.group("number"), 2)
-        instr.append(bitarray("{:016b}".format(int(tmp, 8)), endian='big'))
-        return self.mode + self.reg
-
-
-class _OPERAND_ABSOLUTE(_OPERAND_IMMEDIATE):
-    def __init__(self):
-        super(_OPERAND_ABSOLUTE, self).__init__()
-        self.pattern = re.compile((r'^' + _ABSOLUTE_PATTERN + r'$').format("number"))
-        self.mode = "011"
-
-
-class OperandPatterns(enum.Enum):
-    MODE_0 = _OPERAND_MODE_0()
-    MODE_1 = _OPERAND_MODE_1()
-    MODE_2 = _OPERAND_MODE_2()
-    MODE_3 = _OPERAND_MODE_3()
-    MODE_4 = _OPERAND_MODE_4()
-    MODE_5 = _OPERAND_MODE_5()
-    MODE_6 = _OPERAND_MODE_6()
-    MODE_7 = _OPERAND_MODE_7()
-    MODE_IMMEDIATE = _OPERAND_IMMEDIATE()
-    MODE_ABSOLUTE = _OPERAND_ABSOLUTE()
-
-    def __init__(self, operand_mode: OperandMode):
-        self._opmode = operand_mode
-
-    def get_bits(self, string: str, has_mode: bool, instr: list) -> str:
-        return self._opmode.get_bits(string, has_mode, instr)
+# One alternative per addressing mode; the name of the last matched group tells the mode
+_OPERAND = re.compile(r'^(?:' + r'|'.join([
+    _MODE_0_PATTERN.format("reg0"), _MODE_1_PATTERN.format("reg1"), _MODE_2_PATTERN.format("reg2"),
+    _MODE_3_PATTERN.format("reg3"), _MODE_4_PATTERN.format("reg4"), _MODE_5_PATTERN.format("reg5"),
+    _MODE_6_PATTERN.format("index6", "reg6"), _MODE_7_PATTERN.format("index7", "reg7"),
+    _IMMEDIATE_PATTERN.format("immediate"), _ABSOLUTE_PATTERN.format("absolute")]) + r')$')
+
+# group -> (mode, register if fixed, name of the group holding the number of the next word)
+_OPERAND_MODES = {
+    "reg0": (0, None, None), "reg1": (1, None, None), "reg2": (2, None, None), "reg3": (3, None, None),
+    "reg4": (4, None, None), "reg5": (5, None, None), "reg6": (6, None, "index6"), "reg7": (7, None, "index7"),
+    "immediate": (2, 7, "immediate"), "absolute": (3, 7, "absolute")
+}
+
+
+# Programs: labels, symbols and expressions as in MACRO-11
+_SYMBOL_PATTERN = r'[A-Za-z_$.][A-Za-z0-9_$.]*'
+_REGISTER_PATTERN = r'(?P<register>R[0-7]|SP|PC)'
+_LABEL = re.compile(r'^(' + _SYMBOL_PATTERN + r')\s*:\s*')
+_ASSIGNMENT = re.compile(r'^(' + _SYMBOL_PATTERN + r')\s*=\s*(.*)$')
+_TOKEN = re.compile(r'\s*(?:(?P<number>\d+\.?)|(?P<symbol>' + _SYMBOL_PATTERN + r')|(?P<operator>[-+*/&!<>]))')
+_REGISTERS = {"R0": 0, "R1": 1, "R2": 2, "R3": 3, "R4": 4, "R5": 5, "R6": 6, "R7": 7, "SP": 6, "PC": 7}
+
+# (pattern, mode, register if fixed, kind of the next word); the first matching pattern is taken, the last one
+# matches anything
+_PROGRAM_OPERANDS = [(re.compile(pattern), mode, register, kind) for pattern, mode, register, kind in [
+    (r'^' + _REGISTER_PATTERN + r'$', 0, None, None),
+    (r'^@' + _REGISTER_PATTERN + r'$', 1, None, None),
+    (r'^\(' + _REGISTER_PATTERN + r'\)$', 1, None, None),
+    (r'^\(' + _REGISTER_PATTERN + r'\)\+$', 2, None, None),
+    (r'^@\(' + _REGISTER_PATTERN + r'\)\+$', 3, None, None),
+    (r'^-\(' + _REGISTER_PATTERN + r'\)$', 4, None, None),
+    (r'^@-\(' + _REGISTER_PATTERN + r'\)$', 5, None, None),
+    (r'^#(?P<expression>.+)$', 2, 7, "immediate"),
+    (r'^@#(?P<expression>.+)$', 3, 7, "immediate"),
+    (r'^@(?P<expression>.+)\(' + _REGISTER_PATTERN + r'\)$', 7, None, "index"),
+    (r'^(?P<expression>.+)\(' + _REGISTER_PATTERN + r'\)$', 6, None, "index"),
+    (r'^@(?P<expression>.+)$', 7, 7, "relative"),
+    (r'^(?P<expression>.+)$', 6, 7, "relative")
+]]
+
+
+class _UndefinedSymbol(AssemblerException):
+    pass
 
 
 class InstructionPartType(enum.Enum):
@@ -176,6 +92,17 @@ class InstructionPartType(enum.Enum):
     MARK_NUMBER = enum.auto()
 
 
+# field -> (group, width in bits)
+_FIELDS = {
+    InstructionPartType.SRC: ("src", 6),
+    InstructionPartType.DEST: ("dest", 6),
+    InstructionPartType.REG: ("reg", 3),
+    InstructionPartType.OFFSET: ("offset", 8),
+    InstructionPartType.SOB_OFFSET: ("offset", 6),
+    InstructionPartType.MARK_NUMBER: ("number", 6)
+}
+
+
 class InstructionPart:
     def __init__(self, pattern: str, pattern_type: InstructionPartType):
         self.pattern = pattern
@@ -321,93 +248,430 @@ class InstructionPatterns(enum.Enum):
 
     def __init__(self, parts: list, opcode: str):
         self.opcode = opcode
+        self.code = int(opcode, 2)
         self.parts = parts
-        self.pattern = re.compile(r'^' + "".join(part.pattern for part in parts) + r'$')
+        self.has_msb = any(part.pattern_type is InstructionPartType.MSB for part in parts)
+
+        # Everything after the mnemonic and the whitespace that follows it
+        types = [part.pattern_type for part in parts]
+        operands = parts[types.index(InstructionPartType.OPCODE) + 1:]
+        self.operands = re.compile(r'^' + "".join(part.pattern for part in operands) + r'$')
+        self.fields = [(part.pattern_type,) + _FIELDS[part.pattern_type] for part in operands
+                       if part.pattern_type in _FIELDS]
+
+
+class Program:
+    """Output of Assembler.assemble_program.
+
+    segments are (start address, bytes) runs sorted by address. listing has a (line number, address, bytes,
+    source line) entry per source line; address is None for lines that don't emit anything.
+    """
+
+    def __init__(self, segments: list, symbols: dict, listing: list):
+        self._segments = segments
+        self._symbols = symbols
+        self._listing = listing
+
+    @property
+    def segments(self) -> list:
+        return self._segments
+
+    @property
+    def symbols(self) -> dict:
+        return self._symbols
+
+    @property
+    def listing(self) -> list:
+        return self._listing
+
+    @property
+    def start(self) -> int:
+        return self._segments[0][0] if self._segments else 0
+
+    @property
+    def end(self) -> int:
+        if not self._segments:
+            return 0
+        start, data = self._segments[-1]
+        return start + len(data)
+
+    @property
+    def image(self) -> bytes:
+        # Flat image from start to end, gaps between segments are zeros
+        image = bytearray(self.end - self.start)
+        for start, data in self._segments:
+            image[start - self.start: start - self.start + len(data)] = data
+        return bytes(image)
+
+    @property
+    def words(self) -> list:
+        image = self.image
+        return [image[i] | (image[i + 1] << 8) for i in range(0, len(image) - 1, 2)]
+
+    def load(self, memory) -> None:
+        for start, data in self._segments:
+            memory.store_block(start, data)
+
+    def listing_text(self) -> str:
+        lines = []
+        for number, address, data, source in self._listing:
+            if address is None:
+                lines.append("{:5d} {:27}  {}".format(number, "", source).rstrip())
+                continue
+
+            # Three words or three bytes per row
+            by_words = address % 2 == 0 and len(data) % 2 == 0
+            step = 6 if by_words else 3
+            for offset in range(0, max(len(data), 1), step):
+                if by_words:
+                    cells = ["{:06o}".format(data[i] | (data[i + 1] << 8))
+                             for i in range(offset, min(offset + step, len(data)), 2)]
+                else:
+                    cells = ["{:03o}".format(byte) for byte in data[offset: offset + step]]
+                lines.append("{:5d} {:06o} {:20}  {}".format(number, address + offset, " ".join(cells),
+                                                             source if offset == 0 else "").rstrip())
+        return "\n".join(lines) + "\n"
+
+    def symbol_map(self) -> str:
+        return "".join("{:<24} {:06o}\n".format(name, self._symbols[name] & 0o177777)
+                       for name in sorted(self._symbols))
 
 
 class Assembler:
+    # mnemonic -> (instruction, msb); members are named after their mnemonics
+    _mnemonics = {}
+
     @staticmethod
-    def assemble(lines: list):
+    def _instructions() -> dict:
+        mnemonics = Assembler._mnemonics
+        if not mnemonics:
+            for instruction in InstructionPatterns:
+                mnemonics[instruction.name] = (instruction, 0)
+                if instruction.has_msb:
+                    mnemonics[instruction.name + "B"] = (instruction, 1)
+        return mnemonics
+
+    @staticmethod
+    def assemble(lines: list) -> list:
+        # One instruction per line, numbers are octal and branch operands are offsets in words
+        mnemonics = Assembler._instructions()
         result = []
         for line in lines:
             line = line.strip()
             if line == "" or line.startswith('#'):
                 continue
 
-            found = False
-            instruction_bits = bitarray(endian='big')
-            additional_instructions = []
-            for instructionPattern in list(InstructionPatterns):
-                matcher = instructionPattern.pattern.match(line)
-                if matcher is None:
-                    continue
-
-                found = True
-                for part in instructionPattern.parts:
-                    if part.pattern_type is InstructionPartType.MSB:
-                        if matcher.group("msb") == "B":
-                            instruction_bits.extend("1")
-                        else:
-                            instruction_bits.extend("0")
-
-                    elif part.pattern_type is InstructionPartType.OPCODE:
-                        instruction_bits.extend(instructionPattern.opcode)
-
-                    elif part.pattern_type is InstructionPartType.DEST \
-                            or part.pattern_type is InstructionPartType.SRC \
-                            or part.pattern_type is InstructionPartType.REG:
-                        group = ""
-                        has_mode = True
-                        if part.pattern_type is InstructionPartType.DEST:
-                            group = "dest"
-                        elif part.pattern_type is InstructionPartType.SRC:
-                            group = "src"
-                        elif part.pattern_type is InstructionPartType.REG:
-                            group = "reg"
-                            has_mode = False
-
-                        operand = matcher.group(group)
-                        op_bits = None
-                        for mode in list(OperandPatterns):
-                            bits = mode.get_bits(operand, has_mode, additional_instructions)
-                            if bits is not None:
-                                op_bits = bits
-                                break
-
-                        if op_bits is None:
-                            raise AssemblerException(what="Unrecognized construction {} in the instruction {}"
-                                                     .format(operand, line))
-
-                        instruction_bits.extend(op_bits)
-
-                    elif part.pattern_type is InstructionPartType.OFFSET:
-                        tmp = Assembler.negative_to_positive(matcher.group("offset"), bytes_=1)
-                        instruction_bits.extend("{:08b}".format(int(tmp, 8)))
-
-                    elif part.pattern_type is InstructionPartType.SOB_OFFSET:
-                        instruction_bits.extend("{:06b}".format(int(matcher.group("offset"), 8)))
-
-                    elif part.pattern_type is InstructionPartType.MARK_NUMBER:
-                        instruction_bits.extend("{:06b}".format(int(matcher.group("number"), 8)))
-                    else:
-                        continue
-
-            if not found or instruction_bits.length() != 16:
+            words = line.split(None, 1)
+            entry = mnemonics.get(words[0])
+            matcher = None
+            if entry is not None:
+                matcher = entry[0].operands.match(words[1] if len(words) > 1 else "")
+            if matcher is None:
                 raise AssemblerException(what="Unrecognized instruction '{}'".format(line))
-            for instr in additional_instructions:
-                if instr.length() != 16:
-                    raise AssemblerException(what="Unrecognized instruction '{}'".format(line))
 
-            result.append(instruction_bits)
-            result.extend(additional_instructions)
+            instruction, word = entry
+            word = (word << len(instruction.opcode)) | instruction.code
+            next_words = []
+            for field, group, width in instruction.fields:
+                if field is InstructionPartType.OFFSET:
+                    value = Assembler._number(matcher.group(group), -0o200, 0o377, line) & 0o377
+                elif field is InstructionPartType.SRC or field is InstructionPartType.DEST:
+                    value = Assembler._operand(matcher.group(group), line, next_words)
+                elif field is InstructionPartType.REG:
+                    value = Assembler._operand(matcher.group(group), line, None)
+                else:
+                    value = Assembler._number(matcher.group(group), 0, 0o77, line)
+                word = (word << width) | value
+
+            result.append(word)
+            result.extend(next_words)
 
         return result
 
     @staticmethod
-    def negative_to_positive(number: str, bytes_: int) -> str:
-        tmp = int(number, 8)
-        if tmp >= 0:
-            return number
-        return "{:o}".format(int.from_bytes(
-            tmp.to_bytes(bytes_, byteorder='big', signed=True), byteorder='big', signed=False
-        ))
+    def _operand(operand: str, line: str, next_words) -> int:
+        # Six bits of mode and register, or three bits of register if next_words is None
+        matcher = _OPERAND.match(operand)
+        if matcher is not None:
+            mode, register, index = _OPERAND_MODES[matcher.lastgroup]
+            if register is None:
+                register = int(matcher.group(matcher.lastgroup))
+            if next_words is not None:
+                if index is not None:
+                    next_words.append(Assembler._number(matcher.group(index), -0o100000, 0o177777, line) & 0o177777)
+                return (mode << 3) | register
+            if mode == 0:
+                return register
+
+        raise AssemblerException(what="Unrecognized construction {} in the instruction {}".format(operand, line))
+
+    @staticmethod
+    def _number(number: str, lower: int, upper: int, line: str) -> int:
+        try:
+            value = int(number, 8)
+        except ValueError:
+            value = None
+        if value is None or not lower <= value <= upper:
+            raise AssemblerException(what="Unrecognized construction {} in the instruction {}".format(number, line))
+        return value
+
+    @staticmethod
+    def assemble_program(lines: list, symbols: dict = None) -> Program:
+        """Assembles a program in two passes.
+
+        Besides instructions a line may hold labels ("loop:"), an assignment ("width = 20", ". = 1000"), .word,
+        .byte, .blkw or .even, and a comment after ';'. Lines starting with '#' are comments as well. Numbers
+        are octal unless they end with '.', expressions are evaluated left to right with <> for grouping, and
+        branch operands are target addresses. symbols are predefined for the program.
+        """
+        mnemonics = Assembler._instructions()
+        symbols = dict(symbols or {})
+        statements, deferred = [], []
+        location = 0
+
+        # The first pass defines the symbols and lays out the statements
+        for number, source in enumerate(lines, start=1):
+            line = source.split(";", 1)[0].strip()
+            if line.startswith("#"):
+                line = ""
+            address = location
+            kind, payload, size = None, None, 0
+            try:
+                matcher = _LABEL.match(line)
+                while matcher is not None:
+                    Assembler._define(symbols, matcher.group(1), location)
+                    line = line[matcher.end():]
+                    matcher = _LABEL.match(line)
+
+                matcher = _ASSIGNMENT.match(line)
+                if matcher is not None:
+                    name, expression = matcher.groups()
+                    if name == ".":
+                        location = Assembler._evaluate(expression, symbols, location)
+                    else:
+                        try:
+                            Assembler._define(symbols, name, Assembler._evaluate(expression, symbols, location))
+                        except _UndefinedSymbol:
+                            deferred.append((number, name, expression, location))
+
+                elif line:
+                    words = line.split(None, 1)
+                    kind = words[0]
+                    payload = [operand.strip() for operand in words[1].split(",")] if len(words) > 1 else []
+                    if kind == ".word" or kind == ".byte":
+                        if "" in payload or not payload:
+                            raise AssemblerException(what="{} expects values".format(kind))
+                        size = len(payload) * (2 if kind == ".word" else 1)
+                    elif kind == ".blkw":
+                        if len(payload) != 1:
+                            raise AssemblerException(what=".blkw expects the number of words")
+                        size = 2 * Assembler._evaluate(payload[0], symbols, location)
+                        if size < 0:
+                            raise AssemblerException(what=".blkw expects the number of words")
+                    elif kind == ".even":
+                        size = location & 1
+                    elif kind in mnemonics:
+                        instruction, _ = mnemonics[kind]
+                        if len(payload) != len(instruction.fields) or "" in payload:
+                            raise AssemblerException(what="{} expects {} operands".format(
+                                kind, len(instruction.fields)))
+                        payload = [Assembler._classify(operand, field) for operand, (field, _, _) in
+                                   zip(payload, instruction.fields)]
+                        size = 2 + 2 * sum(1 for operand in payload if type(operand) is tuple and operand[2])
+                    else:
+                        raise AssemblerException(what="unknown instruction or directive '{}'".format(kind))
+
+                    if location & 1 and kind not in (".byte", ".even"):
+                        raise AssemblerException(what="odd address {:o}".format(location))
+                    location += size
+
+                if not 0 <= location <= 0o200000:
+                    raise AssemblerException(what="location {:o} is out of memory".format(location))
+            except AssemblerException as e:
+                raise AssemblerException(what="line {}: {}".format(number, e.what))
+            statements.append((number, source, address, kind, payload, size))
+
+        # Assignments that refer to later labels
+        while deferred:
+            remaining = []
+            for number, name, expression, location in deferred:
+                try:
+                    Assembler._define(symbols, name, Assembler._evaluate(expression, symbols, location))
+                except _UndefinedSymbol as e:
+                    remaining.append((number, name, expression, location))
+                    error = AssemblerException(what="line {}: {}".format(number, e.what))
+            if len(remaining) == len(deferred):
+                raise error
+            deferred = remaining
+
+        # The second pass emits the code
+        chunks, listing = [], []
+        for number, source, address, kind, payload, size in statements:
+            data = b""
+            try:
+                if kind == ".word":
+                    data = b"".join((Assembler._range(Assembler._evaluate(value, symbols, address),
+                                                     -0o100000, 0o177777, value) & 0o177777).to_bytes(2, "little")
+                                    for value in payload)
+                elif kind == ".byte":
+                    data = bytes(Assembler._range(Assembler._evaluate(value, symbols, address), -0o200, 0o377, value)
+                             & 0o377 for value in payload)
+                elif kind in mnemonics:
+                    data = b"".join(word.to_bytes(2, "little") for word in
+                                    Assembler._encode(mnemonics[kind], payload, address, symbols))
+            except AssemblerException as e:
+                raise AssemblerException(what="line {}: {}".format(number, e.what))
+
+            if size:
+                chunks.append((address, data or bytes(size), number))
+            listing.append((number, address if kind is not None else None, data, source))
+
+        segments = []
+        for start, data, number in sorted(chunks, key=lambda chunk: chunk[0]):
+            if segments and start < segments[-1][0] + len(segments[-1][1]):
+                raise AssemblerException(what="line {}: overlaps the code at {:o}".format(number, start))
+            if segments and start == segments[-1][0] + len(segments[-1][1]):
+                segments[-1][1].extend(data)
+            else:
+                segments.append((start, bytearray(data)))
+
+        return Program(segments=[(start, bytes(data)) for start, data in segments], symbols=symbols,
+                       listing=listing)
+
+    @staticmethod
+    def _define(symbols: dict, name: str, value: int) -> None:
+        if name == "." or name in _REGISTERS:
+            raise AssemblerException(what="{} can't be redefined".format(name))
+        if name in symbols:
+            raise AssemblerException(what="symbol {} is already defined".format(name))
+        symbols[name] = value
+
+    @staticmethod
+    def _classify(operand: str, field: InstructionPartType):
+        # (mode, register, kind of the next word, expression) of a general operand, else the operand as is
+        if field is not InstructionPartType.SRC and field is not InstructionPartType.DEST \
+                and field is not InstructionPartType.REG:
+            return operand
+
+        for pattern, mode, register, kind in _PROGRAM_OPERANDS:
+            matcher = pattern.match(operand)
+            if matcher is not None:
+                break
+        if field is InstructionPartType.REG and mode != 0:
+            raise AssemblerException(what="expected a register instead of {}".format(operand))
+        if register is None:
+            register = _REGISTERS[matcher.group("register")]
+        return mode, register, kind, matcher.group("expression") if kind is not None else None
+
+    @staticmethod
+    def _encode(entry: tuple, operands: list, address: int, symbols: dict) -> list:
+        instruction, word = entry
+        word = (word << len(instruction.opcode)) | instruction.code
+        next_words = []
+        # PC-relative operands see PC past the whole instruction: every extension word is fetched first
+        pc = address + 2 + 2 * sum(1 for (field, _, _), operand in zip(instruction.fields, operands)
+                                   if field in (InstructionPartType.SRC, InstructionPartType.DEST)
+                                   and operand[2] is not None)
+        for (field, _, width), operand in zip(instruction.fields, operands):
+            if field is InstructionPartType.REG:
+                value = operand[1]
+            elif field is InstructionPartType.SRC or field is InstructionPartType.DEST:
+                mode, register, kind, expression = operand
+                if kind is not None:
+                    value = Assembler._evaluate(expression, symbols, address)
+                    if kind == "relative":
+                        value -= pc
+                    next_words.append(Assembler._range(value, -0o100000, 0o177777, expression) & 0o177777)
+                value = (mode << 3) | register
+            else:
+                value = Assembler._evaluate(operand, symbols, address)
+                if field is InstructionPartType.OFFSET:
+                    value = Assembler._offset(value - address - 2, -0o200, 0o177, operand) & 0o377
+                elif field is InstructionPartType.SOB_OFFSET:
+                    value = Assembler._offset(address + 2 - value, 0, 0o77, operand)
+                else:
+                    value = Assembler._range(value, 0, 0o77, operand)
+            word = (word << width) | value
+
+        return [word] + next_words
+
+    @staticmethod
+    def _offset(difference: int, lower: int, upper: int, target: str) -> int:
+        if difference & 1:
+            raise AssemblerException(what="branch target {} is odd".format(target))
+        return Assembler._range(difference // 2, lower, upper, target)
+
+    @staticmethod
+    def _range(value: int, lower: int, upper: int, expression: str) -> int:
+        if not lower <= value <= upper:
+            if expression.strip() != "{:o}".format(value):
+                expression = "{} = {:o}".format(expression, value)
+            raise AssemblerException(what="{} is out of range".format(expression))
+        return value
+
+    @staticmethod
+    def _evaluate(expression: str, symbols: dict, location: int) -> int:
+        expression = expression.strip()
+        tokens, position = [], 0
+        while position < len(expression):
+            matcher = _TOKEN.match(expression, position)
+            if matcher is None:
+                raise AssemblerException(what="wrong expression {}".format(expression))
+            tokens.append(matcher.group(matcher.lastgroup) if matcher.lastgroup != "symbol"
+                          else (matcher.group("symbol"),))
+            position = matcher.end()
+
+        value, index = Assembler._expression(tokens, 0, symbols, location, expression)
+        if index != len(tokens):
+            raise AssemblerException(what="wrong expression {}".format(expression))
+        return value
+
+    @staticmethod
+    def _expression(tokens: list, index: int, symbols: dict, location: int, expression: str) -> (int, int):
+        # Binary operators have no precedence
+        value, index = Assembler._term(tokens, index, symbols, location, expression)
+        while index < len(tokens) and tokens[index] in ("+", "-", "*", "/", "&", "!"):
+            operator = tokens[index]
+            right, index = Assembler._term(tokens, index + 1, symbols, location, expression)
+            if operator == "+":
+                value += right
+            elif operator == "-":
+                value -= right
+            elif operator == "*":
+                value *= right
+            elif operator == "/":
+                if right == 0:
+                    raise AssemblerException(what="division by zero in {}".format(expression))
+                value = abs(value) // abs(right) * (1 if (value < 0) == (right < 0) else -1)
+            elif operator == "&":
+                value &= right
+            else:
+                value |= right
+        return value, index
+
+    @staticmethod
+    def _term(tokens: list, index: int, symbols: dict, location: int, expression: str) -> (int, int):
+        if index == len(tokens):
+            raise AssemblerException(what="wrong expression {}".format(expression))
+        token = tokens[index]
+        if type(token) is tuple:
+            name, = token
+            if name == ".":
+                return location, index + 1
+            if name not in symbols:
+                raise _UndefinedSymbol(what="undefined symbol {}".format(name))
+            return symbols[name], index + 1
+        if token == "-" or token == "+":
+            value, index = Assembler._term(tokens, index + 1, symbols, location, expression)
+            return (-value if token == "-" else value), index
+        if token == "<":
+            value, index = Assembler._expression(tokens, index + 1, symbols, location, expression)
+            if index == len(tokens) or tokens[index] != ">":
+                raise AssemblerException(what="unbalanced <> in {}".format(expression))
+            return value, index + 1
+        if token[0].isdigit():
+            try:
+                return (int(token[:-1]) if token.endswith(".") else int(token, 8)), index + 1
+            except ValueError:
+                pass
+        raise AssemblerException(what="wrong expression {}".format(expression))
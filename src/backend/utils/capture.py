@@ -0,0 +1,160 @@
+import enum
+import hashlib
+import pathlib
+import queue
+import struct
+import threading
+import zlib
+
+import numpy
+
+from src.backend.model.framebuffer import FrameSink
+from src.backend.utils.exceptions import CaptureException
+from src.backend.utils.statistics import CaptureStatistics
+
+
+class CaptureFormat(enum.Enum):
+    # Color indices of every frame back to back, one byte per pixel
+    RAW = enum.auto()
+    # One uint8 array of shape (frames, height, width)
+    NPY = enum.auto()
+    # A directory of indexed PNG files, one per frame
+    PNG = enum.auto()
+    # A text log with the SHA-1 of the color indices of every frame
+    HASH = enum.auto()
+
+
+class FrameCapture(FrameSink):
+    """Writes the frames VideoMemory presents to a file, see VideoMemory.add_capture.
+
+    capture() only puts the frame into a bounded queue and returns, the frames are encoded and written by a
+    background thread. When the writer falls behind and the queue is full, the frame is dropped and counted
+    instead of blocking the emulator thread. close() writes out the queued frames.
+    """
+
+    QUEUE_SIZE = 64
+    # The NPY header is written again on close with the number of frames, so its size is fixed
+    NPY_HEADER_SIZE = 128
+    PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+    def __init__(self, path, capture_format: CaptureFormat, queue_size: int=QUEUE_SIZE):
+        self._path = pathlib.Path(path)
+        self._format = capture_format
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._statistics = CaptureStatistics()
+        self._frames = 0
+        self._shape: tuple = None
+        self._error: Exception = None
+        self._file = None
+        self._closed = False
+
+        try:
+            if capture_format is CaptureFormat.PNG:
+                self._path.mkdir(parents=True, exist_ok=True)
+            else:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self._path, "w" if capture_format is CaptureFormat.HASH else "wb")
+                if capture_format is CaptureFormat.NPY:
+                    self._file.write(self._npy_header())
+        except OSError as error:
+            raise CaptureException(what="cannot capture to {}: {}".format(self._path, error))
+
+        self._writer = threading.Thread(target=self._write_frames, daemon=True)
+        self._writer.start()
+
+    def capture(self, pixels: numpy.ndarray, color_table: list):
+        if self._closed:
+            self._statistics.dropped += 1
+            return
+        try:
+            self._queue.put_nowait((pixels, tuple(color_table)))
+        except queue.Full:
+            self._statistics.dropped += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        try:
+            if self._format is CaptureFormat.NPY:
+                self._file.seek(0)
+                self._file.write(self._npy_header())
+            if self._file is not None:
+                self._file.close()
+        except OSError as error:
+            self._error = self._error or error
+        if self._error is not None:
+            raise CaptureException(what="cannot capture to {}: {}".format(self._path, self._error))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def statistics(self) -> CaptureStatistics:
+        return self._statistics
+
+    @property
+    def frames(self) -> int:
+        return self._frames
+
+    def _write_frames(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            # After an error the queue is still drained, so that capture() never blocks
+            if self._error is not None:
+                self._statistics.dropped += 1
+                continue
+            try:
+                self._write(*frame)
+            except (OSError, CaptureException) as error:
+                self._error = error
+                self._statistics.dropped += 1
+            else:
+                self._frames += 1
+                self._statistics.captured += 1
+
+    def _write(self, pixels: numpy.ndarray, color_table: tuple):
+        if self._shape is None:
+            self._shape = pixels.shape
+        elif pixels.shape != self._shape and self._format in (CaptureFormat.RAW, CaptureFormat.NPY):
+            raise CaptureException(what="frame size changed")
+
+        if self._format is CaptureFormat.PNG:
+            with open(self._path / "frame-{:06d}.png".format(self._frames), "wb") as f:
+                f.write(FrameCapture.png(pixels, color_table))
+        elif self._format is CaptureFormat.HASH:
+            self._file.write("{:6d} {}\n".format(self._frames, hashlib.sha1(pixels.tobytes()).hexdigest()))
+        else:
+            self._file.write(pixels.tobytes())
+
+    def _npy_header(self) -> bytes:
+        height, width = self._shape if self._shape is not None else (0, 0)
+        header = "{{'descr': '|u1', 'fortran_order': False, 'shape': ({}, {}, {}), }}".format(
+            self._frames, height, width)
+        # magic, version 1.0, header length, header padded with spaces and ended with a newline
+        length = FrameCapture.NPY_HEADER_SIZE - 10
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", length) + header.ljust(length - 1).encode() + b"\n"
+
+    @staticmethod
+    def png(pixels: numpy.ndarray, color_table: tuple) -> bytes:
+        # 8-bit indexed image, every row with filter type 0
+        height, width = pixels.shape
+        palette = b"".join(bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+                           for color in color_table)
+        rows = numpy.hstack((numpy.zeros((height, 1), dtype=numpy.uint8), pixels.astype(numpy.uint8)))
+        return FrameCapture.PNG_SIGNATURE \
+            + FrameCapture._png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)) \
+            + FrameCapture._png_chunk(b"PLTE", palette) \
+            + FrameCapture._png_chunk(b"IDAT", zlib.compress(rows.tobytes())) \
+            + FrameCapture._png_chunk(b"IEND", b"")
+
+    @staticmethod
+    def _png_chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
@@ -8,10 +8,13 @@ class DisasmState(enum.Enum):
 
 
 class DisasmInstruction:
-    def __init__(self):
-        self._state = DisasmState.NOT_AN_INSTRUCTION
-        self._str = "Not an instruction"
-        self._num_next: int = 0
+    def __init__(self, state: DisasmState=DisasmState.NOT_AN_INSTRUCTION, representation: str=None,
+                 num_next: int=0):
+        # Unlike set_state(), keeps num_next in any state: a word left undecoded at the end of a listing keeps
+        # num_next of the instruction it was part of
+        self._state = state
+        self._str = representation if representation is not None else "Not an instruction"
+        self._num_next: int = num_next
 
     @property
     def state(self):
@@ -1,6 +1,3 @@
-from bitarray import bitarray
-
-
 class EmulatorException(Exception):
     def __init__(self, what: str):
         self.what = what
@@ -44,6 +41,12 @@ class MemoryWrongConfiguration(MemoryException):
         super(MemoryWrongConfiguration, self).__init__(what="Wrong layout of memory and devices")
 
 
+class MemoryDeviceOverlap(MemoryException):
+    def __init__(self, start: int, end: int):
+        super(MemoryDeviceOverlap, self).__init__(
+            what="Device window [{:06o}, {:06o}) overlaps another device".format(start, end))
+
+
 class CashWrongBlockException(MemoryException):
     def __init__(self):
         super(CashWrongBlockException, self).__init__(what="Cash is disabled or address to block is address of device")
@@ -54,6 +57,21 @@ class CashUnblockException(MemoryException):
         super(CashUnblockException, self).__init__(what="Tried to unblock unblocked cash line")
 
 
+class CashWrongConfiguration(MemoryException):
+    def __init__(self, what: str):
+        super(CashWrongConfiguration, self).__init__(what=what)
+
+
+class TraceFormatException(EmulatorException):
+    def __init__(self, what: str):
+        super(TraceFormatException, self).__init__(what="Wrong access trace: {}".format(what))
+
+
+class SaveStateFormatException(EmulatorException):
+    def __init__(self, what: str):
+        super(SaveStateFormatException, self).__init__(what="Wrong save state: {}".format(what))
+
+
 class RegisterException(EmulatorException):
     def __init__(self, what: str):
         super(RegisterException, self).__init__(what)
@@ -103,8 +121,8 @@ class CommandWrongNumberBits(CommandException):
 
 
 class UnknownCommand(CommandException):
-    def __init__(self, code: bitarray):
-        super(UnknownCommand, self).__init__(what="Unrecognized command with code {}".format(code.to01()))
+    def __init__(self, code: int):
+        super(UnknownCommand, self).__init__(what="Unrecognized command with code {:016b}".format(code))
 
 
 class OperandWrongNumberOfBits(CommandException):
@@ -129,4 +147,9 @@ class VideoException(EmulatorException):
 
 class VideoWrongMode(VideoException):
     def __init__(self):
-        super(VideoWrongMode, self).__init__(what="Wrong video mode")
\ No newline at end of file
+        super(VideoWrongMode, self).__init__(what="Wrong video mode")
+
+
+class CaptureException(EmulatorException):
+    def __init__(self, what: str):
+        super(CaptureException, self).__init__(what)
@@ -1,47 +1,131 @@
-from PIL import ImageDraw, Image, ImageFont
-from bitarray import bitarray
+import hashlib
+import os
+import pathlib
+import struct
+
+import src.backend.utils
+from src.backend.utils.exceptions import EmulatorWrongConfiguration
 
 
 class ROMFiller:
+    """Glyph bitmaps for the ROM font.
+
+    Rasterizing needs Pillow, so the result is cached as a binary blob keyed by the SHA-256 of the font file
+    and the font size. The blob is looked up in resource/glyphs, which ships prebaked for the emulator's
+    font, then in the user cache directory; it is rasterized and written to the user cache only if neither
+    matches.
+    """
+
+    ALPHABET = "abcdefghijklmnopqrstuvwxyz -"
+    FONT = "FreeMono.ttf"
+    MAGIC = b"PDP11GLY"
+    VERSION = 1
+    # magic, version, font digest, font size, width, min height, max height, bitmap size, data length
+    HEADER = struct.Struct("<8sH32sHHHHHI")
+
+    _loaded = {}
+
     @staticmethod
     def get_glyphs(size: int) -> dict:
-        alphabet = "abcdefghijklmnopqrstuvwxyz -"
-        font = ImageFont.truetype("../../../resource/FreeMono.ttf", size=size)
+        font = ROMFiller.resource_path() / ROMFiller.FONT
+        with open(font, "rb") as f:
+            digest = hashlib.sha256(f.read()).digest()
+
+        glyphs = ROMFiller._loaded.get((digest, size))
+        if glyphs is not None:
+            return glyphs
+
+        name = "{}-{}.glyphs".format(font.stem, size)
+        for path in (ROMFiller.resource_path() / "glyphs" / name, ROMFiller.cache_path() / name):
+            glyphs = ROMFiller.load(path, digest, size)
+            if glyphs is not None:
+                break
+        else:
+            glyphs = ROMFiller.rasterize(font, size)
+            try:
+                ROMFiller.save(glyphs, ROMFiller.cache_path() / name, digest, size)
+            except OSError:
+                pass
+
+        ROMFiller._loaded[(digest, size)] = glyphs
+        return glyphs
+
+    @staticmethod
+    def resource_path() -> pathlib.Path:
+        return pathlib.Path(src.backend.utils.__path__[0]).parent.parent.parent / "resource"
+
+    @staticmethod
+    def cache_path() -> pathlib.Path:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return pathlib.Path(base) / "pdp11-emulator"
+
+    @staticmethod
+    def save(glyphs: dict, path: pathlib.Path, digest: bytes, size: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so that another emulator never reads partial glyphs
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as f:
+            f.write(ROMFiller.HEADER.pack(ROMFiller.MAGIC, ROMFiller.VERSION, digest, size, glyphs["width"],
+                                          glyphs["min_height"], glyphs["max_height"], glyphs["bitmap_size"],
+                                          len(glyphs["data"])))
+            f.write(glyphs["data"])
+        temporary.replace(path)
+
+    @staticmethod
+    def load(path: pathlib.Path, digest: bytes, size: int):
+        # None unless the file holds glyphs of this font and size, whole and of a consistent size
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        if len(content) < ROMFiller.HEADER.size:
+            return None
+        magic, version, font_digest, font_size, width, min_height, max_height, bitmap_size, length = \
+            ROMFiller.HEADER.unpack_from(content)
+        if magic != ROMFiller.MAGIC or version != ROMFiller.VERSION or font_digest != digest or font_size != size \
+                or len(content) != ROMFiller.HEADER.size + length:
+            return None
+        if min_height > max_height or bitmap_size * 8 < width * max_height \
+                or length != len(ROMFiller.ALPHABET) * bitmap_size:
+            return None
+
+        return dict(data=content[ROMFiller.HEADER.size:], width=width, min_height=min_height,
+                    max_height=max_height, bitmap_size=bitmap_size)
+
+    @staticmethod
+    def rasterize(font_path: pathlib.Path, size: int) -> dict:
+        try:
+            from PIL import ImageDraw, Image, ImageFont
+        except ImportError:
+            raise EmulatorWrongConfiguration(what="Pillow is needed to rasterize {} of size {}".format(
+                font_path.name, size))
+
+        font = ImageFont.truetype(str(font_path), size=size)
         width, min_height = font.getsize(text='a')
         max_height = min_height
-        for alpha in alphabet:
-            size = font.getsize(text=alpha)
-            assert size[0] == width, "Font is not fixed"
-            max_height = max(max_height, size[1])
-            min_height = min(min_height, size[1])
+        for alpha in ROMFiller.ALPHABET:
+            glyph_size = font.getsize(text=alpha)
+            assert glyph_size[0] == width, "Font is not fixed"
+            max_height = max(max_height, glyph_size[1])
+            min_height = min(min_height, glyph_size[1])
 
-        data = []
+        data = bytearray()
         struct_size = width * max_height
         struct_size = ((struct_size - 1) // 16 + 1) * 16  # Now struct_size is aligned
 
-        for alpha in alphabet:
-            size = font.getsize(text=alpha)
-            im = Image.new(mode="1", size=size, color="white")
+        for alpha in ROMFiller.ALPHABET:
+            im = Image.new(mode="1", size=font.getsize(text=alpha), color="white")
             txt = ImageDraw.Draw(im)
             txt.text(xy=(0, 0), text=alpha, fill=0, font=font)
 
-            struct_bitmap = list(bitarray("".join("0" for _ in range(8)), endian='big')
-                                 for _ in range(struct_size // 8))
-            index_array = 0
-            index_bit = 0
-            bitarr = None
-
-            for pixel in list(im.getdata()):
-                if index_bit == 0:
-                    bitarr = struct_bitmap[index_array]
-
-                bitarr[index_bit] = True if pixel == 0 else False
-                index_bit += 1
-                if index_bit % 8 == 0:
-                    index_bit = 0
-                    index_array += 1
-
-            data.extend(struct_bitmap)
-            assert len(struct_bitmap) % 2 == 0
+            # Pixels row by row, the first pixel in the high bit of a byte
+            bitmap = bytearray(struct_size // 8)
+            for index, pixel in enumerate(im.getdata()):
+                if pixel == 0:
+                    bitmap[index // 8] |= 0x80 >> (index % 8)
+            data.extend(bitmap)
 
-        return dict(data=data, width=width, min_height=min_height, max_height=max_height, bitmap_size=struct_size // 8)
+        return dict(data=bytes(data), width=width, min_height=min_height, max_height=max_height,
+                    bitmap_size=struct_size // 8)
@@ -0,0 +1,116 @@
+import hashlib
+import pathlib
+import struct
+
+from src.backend.utils.disasm_instruction import DisasmInstruction, DisasmState
+from src.backend.utils.romfiller import ROMFiller
+
+
+class ROMImage:
+    """Linked ROM code with its disassembly.
+
+    Assembling and disassembling the ROM routines dominates Emulator construction, so the result is cached in
+    the user cache directory, keyed by the SHA-256 of the source files and the layout parameters. An image is
+    a dict with the start address, the code bytes and a listing of one (state, num_next, representation) entry
+    per word.
+    """
+
+    MAGIC = b"PDP11ROM"
+    VERSION = 1
+    # magic, version, key digest, start address, code length, number of listing entries
+    HEADER = struct.Struct("<8sH32sHII")
+    # state, num_next, representation length
+    ENTRY = struct.Struct("<BBH")
+
+    _loaded = {}
+
+    @staticmethod
+    def digest(sources: list, layout: dict) -> bytes:
+        sha = hashlib.sha256()
+        for source in sources:
+            with open(source, "rb") as f:
+                content = f.read()
+            sha.update(struct.pack("<I", len(content)))
+            sha.update(content)
+        sha.update(repr(sorted(layout.items())).encode())
+        return sha.digest()
+
+    @staticmethod
+    def path(digest: bytes) -> pathlib.Path:
+        return ROMFiller.cache_path() / "rom-{}.image".format(digest.hex()[:16])
+
+    @staticmethod
+    def get(digest: bytes):
+        # None if the image has to be linked again
+        image = ROMImage._loaded.get(digest)
+        if image is None:
+            image = ROMImage.load(ROMImage.path(digest), digest)
+            if image is not None:
+                ROMImage._loaded[digest] = image
+        return image
+
+    @staticmethod
+    def put(digest: bytes, image: dict) -> None:
+        ROMImage._loaded[digest] = image
+        try:
+            ROMImage.save(image, ROMImage.path(digest), digest)
+        except OSError:
+            pass
+
+    @staticmethod
+    def save(image: dict, path: pathlib.Path, digest: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        listing = bytearray()
+        for state, num_next, representation in image["listing"]:
+            representation = representation.encode()
+            listing.extend(ROMImage.ENTRY.pack(state.value, num_next, len(representation)))
+            listing.extend(representation)
+
+        # Written aside and renamed, so that another emulator never reads a partial image
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as f:
+            f.write(ROMImage.HEADER.pack(ROMImage.MAGIC, ROMImage.VERSION, digest, image["start"],
+                                         len(image["code"]), len(image["listing"])))
+            f.write(image["code"])
+            f.write(listing)
+        temporary.replace(path)
+
+    @staticmethod
+    def load(path: pathlib.Path, digest: bytes):
+        # None unless the file holds an image with this key
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        if len(content) < ROMImage.HEADER.size:
+            return None
+        magic, version, image_digest, start, code_length, num_entries = ROMImage.HEADER.unpack_from(content)
+        if magic != ROMImage.MAGIC or version != ROMImage.VERSION or image_digest != digest:
+            return None
+
+        position = ROMImage.HEADER.size + code_length
+        code = content[ROMImage.HEADER.size: position]
+        listing = []
+        try:
+            for _ in range(num_entries):
+                state, num_next, length = ROMImage.ENTRY.unpack_from(content, position)
+                position += ROMImage.ENTRY.size
+                listing.append((DisasmState(state), num_next, content[position: position + length].decode()))
+                position += length
+        except (struct.error, ValueError):
+            return None
+        if position != len(content) or len(code) != code_length:
+            return None
+
+        return dict(start=start, code=code, listing=listing)
+
+    @staticmethod
+    def entry(instruction: DisasmInstruction) -> tuple:
+        return instruction.state, instruction.num_next, str(instruction)
+
+    @staticmethod
+    def instruction(entry: tuple) -> DisasmInstruction:
+        state, num_next, representation = entry
+        return DisasmInstruction(state=state, representation=representation, num_next=num_next)
@@ -0,0 +1,47 @@
+class Statistics:
+    """Counters written by the emulator thread without locks and read by any thread.
+
+    Counters only grow: clear() remembers a baseline instead of zeroing them, so a reader never races the
+    writer's read-modify-write. snapshot() reads all counters until two consecutive reads agree, which for
+    monotonic values means they held together at one instant, like a seqlock reader.
+    """
+
+    FIELDS = ()
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+        self._baseline = (0,) * len(self.FIELDS)
+
+    def snapshot(self) -> tuple:
+        return tuple(value - base for value, base in zip(self._read(), self._baseline))
+
+    def clear(self):
+        self._baseline = self._read()
+
+    def restore(self, values: tuple):
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+        self._baseline = (0,) * len(self.FIELDS)
+
+    def _read(self) -> tuple:
+        while True:
+            values = tuple(getattr(self, field) for field in self.FIELDS)
+            if tuple(getattr(self, field) for field in self.FIELDS) == values:
+                return values
+
+
+class PipeStatistics(Statistics):
+    FIELDS = ("cycles", "instructions")
+
+
+class CashStatistics(Statistics):
+    FIELDS = ("hits", "misses")
+
+
+class VideoStatistics(Statistics):
+    FIELDS = ("presented", "coalesced")
+
+
+class CaptureStatistics(Statistics):
+    FIELDS = ("captured", "dropped")
@@ -0,0 +1,63 @@
+import sys
+import time
+
+from src.backend.engine.cash import CashConfig, ReplacementPolicy, WritePolicy
+from src.backend.engine.cashsim import sweep, INSTRUCTION_STREAM, DATA_STREAM
+from src.backend.engine.emulator import Emulator
+from src.backend.engine.savestate import SaveState
+from src.backend.engine.trace import AccessTrace
+
+
+def record(keys: str = "h\n", state: str = None) -> AccessTrace:
+    # state: save-state file to start from instead of a freshly constructed machine
+    emulator = Emulator()
+    if state is not None:
+        emulator.restore(SaveState.load(state))
+    trace = emulator.start_trace()
+    for key in keys:
+        if key == "\n":
+            emulator.keyboard.add_enter()
+        elif key == " ":
+            emulator.keyboard.add_space()
+        else:
+            emulator.keyboard.add_alpha(key)
+
+    emulator.step()
+    while not emulator.idle:
+        emulator.step()
+    emulator.stop_trace()
+    return trace
+
+
+def configurations() -> list:
+    return list(CashConfig(sets=sets, ways=ways, line_size=line_size, replacement=replacement, write=write)
+                for sets in (16, 64)
+                for ways in (1, 2, 4)
+                for line_size in (4, 8, 16)
+                for replacement, write in ((ReplacementPolicy.LRU, WritePolicy.WRITE_BACK),
+                                           (ReplacementPolicy.PLRU, WritePolicy.WRITE_BACK),
+                                           (ReplacementPolicy.LRU, WritePolicy.WRITE_THROUGH))
+                if replacement is not ReplacementPolicy.PLRU or ways != 1)
+
+
+def main(path: str = None):
+    if path is None:
+        trace = record()
+        print("recorded {} accesses".format(len(trace)))
+    else:
+        trace = AccessTrace.load(path)
+
+    configs = configurations()
+    for name, stream in (("instruction", INSTRUCTION_STREAM), ("data", DATA_STREAM)):
+        start = time.perf_counter()
+        results = sweep(trace, configs, kinds=stream)
+        print("{} cash: {} configurations in {:.2f} s".format(name, len(configs), time.perf_counter() - start))
+        for result in sorted(results, key=lambda result: result.miss_rate):
+            config = result.config
+            print("{:>5} sets {:>2} ways {:>3} B {:<5} {:<14}{:>9.4f}{:>8} write-backs".format(
+                config.sets, config.ways, config.line_size, config.replacement.name, config.write.name,
+                result.miss_rate, result.write_backs))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,49 @@
+import timeit
+
+from src.backend.engine.emulator import Emulator
+from src.backend.model.commands import Commands, InstanceCommand
+from src.backend.model.memory import MemoryPart
+from src.backend.utils.exceptions import UnknownCommand
+
+
+def _rom_words(emulator: Emulator) -> list:
+    memory = emulator.memory
+    return list(memory.load_word(address)
+                for address in sorted(emulator._commands) if MemoryPart.ROM.start <= address < MemoryPart.ROM.end)
+
+
+def _decode_by_patterns(words: list):
+    for word in words:
+        string = "{:016b}".format(word)
+        for command_instance in InstanceCommand:
+            if command_instance.pattern.match(string) is not None:
+                break
+
+
+def _decode_by_table(words: list):
+    for word in words:
+        Commands.decode(word)
+
+
+def _build_commands(words: list):
+    for word in words:
+        try:
+            Commands.build_command(code=word)
+        except UnknownCommand:
+            pass
+
+
+def main(repeat: int = 5):
+    words = _rom_words(Emulator())
+    Commands.decode(0)
+    print("{} instructions in ROM routines".format(len(words)))
+
+    for name, func in (("regex decode", _decode_by_patterns),
+                       ("table decode", _decode_by_table),
+                       ("command construction", _build_commands)):
+        best = min(timeit.repeat(lambda: func(words), number=1, repeat=repeat))
+        print("{:<22}{:>10.3f} ms{:>10.3f} us/word".format(name, best * 1e3, best * 1e6 / len(words)))
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.emulator = Emulator()
+        self.boot_snapshot = self.emulator.snapshot()
         self.initUI()
 
     def initUI(self):
@@ -73,6 +74,8 @@ class MainWindow(QWidget):
         self.screen.pipe.checkEnabled.setEnabled(False)
         self.screen.screen.setFocus()
         self.emulator.step()
+        # A single step doesn't wait for the next frame, so a glyph held back by the frame rate cap is shown now
+        self.emulator.memory.video.flush()
         self.viewer.get_current()
         self.registers.update()
         self.screen.pipe.get_stat()
@@ -102,7 +105,7 @@ class MainWindow(QWidget):
     def reset(self):
         self.screen.cash.checkEnabled.setEnabled(True)
         self.screen.pipe.checkEnabled.setEnabled(True)
-        self.emulator = Emulator()
+        self.emulator.restore(self.boot_snapshot)
         self.viewer.reset(self.emulator)
         self.registers.reset(self.emulator)
         self.screen.ereset(self.emulator)
@@ -0,0 +1,13 @@
+import numpy
+from PyQt5.QtGui import QImage
+
+from src.backend.model.framebuffer import VideoBackend
+
+
+class QtVideoBackend(VideoBackend):
+    def image(self, pixels: numpy.ndarray, color_table: list) -> QImage:
+        height, width = pixels.shape
+        image = QImage(pixels.tobytes(), width, height, width, QImage.Format_Indexed8)
+        image.setColorTable(color_table)
+        # QImage doesn't own the bytes it was made from
+        return image.copy()
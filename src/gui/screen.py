@@ -1,8 +1,9 @@
 from src.backend.engine.emulator import Emulator
+from src.gui.qt_video import QtVideoBackend
 
 from PyQt5.QtWidgets import *
-from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPixmap, QImage, QPainter
+from PyQt5.QtCore import Qt, QRect
 
 
 class Box(QWidget):
@@ -37,8 +38,9 @@ class CashBox(Box):
         self.label[2].setText("Cash rate: ")
         self.checkEnabled.stateChanged.connect(self.turn)
 
-        hits = self.emulator.icash.hits + self.emulator.dcash.hits
-        misses = self.emulator.icash.misses + self.emulator.dcash.misses
+        ihits, imisses = self.emulator.icash.statistics.snapshot()
+        dhits, dmisses = self.emulator.dcash.statistics.snapshot()
+        hits, misses = ihits + dhits, imisses + dmisses
         self.text[0].setText(str(hits))
         self.text[1].setText(str(misses))
         if hits + misses != 0:
@@ -51,8 +53,9 @@ class CashBox(Box):
         self.emulator.icash.enabled = self.checkEnabled.isChecked()
 
     def get_stat(self):
-        hits = self.emulator.icash.hits + self.emulator.dcash.hits
-        misses = self.emulator.icash.misses + self.emulator.dcash.misses
+        ihits, imisses = self.emulator.icash.statistics.snapshot()
+        dhits, dmisses = self.emulator.dcash.statistics.snapshot()
+        hits, misses = ihits + dhits, imisses + dmisses
         self.text[0].setText(str(hits))
         self.text[1].setText(str(misses))
         if hits + misses != 0:
@@ -79,8 +82,7 @@ class PipeBox(Box):
         self.label[2].setText("cycles/instruction: ")
         self.checkEnabled.stateChanged.connect(self.turn)
 
-        cycles = self.emulator.pipe.cycles
-        instructions = self.emulator.pipe.instructions
+        cycles, instructions = self.emulator.pipe.statistics.snapshot()
         self.text[0].setText(str(cycles))
         self.text[1].setText(str(instructions))
         if instructions != 0:
@@ -92,8 +94,7 @@ class PipeBox(Box):
         self.emulator.pipe.enabled = self.checkEnabled.isChecked()
 
     def get_stat(self):
-        cycles = self.emulator.pipe.cycles
-        instructions = self.emulator.pipe.instructions
+        cycles, instructions = self.emulator.pipe.statistics.snapshot()
         self.text[0].setText(str(cycles))
         self.text[1].setText(str(instructions))
         if instructions != 0:
@@ -112,6 +113,8 @@ class ScreenField(QLabel):
     def __init__(self, emu: Emulator):
         super().__init__()
         self.emulator = emu
+        self.monitor = QPixmap(self.emulator.memory.video.mode.width, self.emulator.memory.video.mode.height)
+        self.emulator.memory.video.set_backend(QtVideoBackend())
         self.show_monitor(self.emulator.memory.video.image)
         self.emulator.memory.video.set_on_show(self.show_monitor)
         self.setFocusPolicy(Qt.ClickFocus)
@@ -145,11 +148,24 @@ class ScreenField(QLabel):
     def focusOutEvent(self, QFocusEvent):
         self.setFrameStyle(0)
 
-    def show_monitor(self, image: QImage):
-        self.setPixmap(QPixmap.fromImage(image))
+    def show_monitor(self, image: QImage, rows: tuple=None):
+        # Only the dirty rows are converted and repainted
+        first, last = rows if rows is not None else (0, image.height())
+        region = QRect(0, first, image.width(), last - first)
+        painter = QPainter(self.monitor)
+        painter.drawImage(region, image, region)
+        painter.end()
+        self.update(region.translated(self.contentsRect().topLeft()))
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        painter = QPainter(self)
+        painter.drawPixmap(self.contentsRect().topLeft(), self.monitor)
+        painter.end()
 
     def reset(self, emu: Emulator):
         self.emulator = emu
+        self.emulator.memory.video.set_backend(QtVideoBackend())
         self.show_monitor(self.emulator.memory.video.image)
         self.emulator.memory.video.set_on_show(self.show_monitor)
 
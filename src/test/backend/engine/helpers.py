@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.backend.engine.emulator import Emulator
+
+
+class EmulatorTestCase(unittest.TestCase):
+    # Emulators built by the tests cache their ROM in a directory of the test class, never in the user's cache
+    @classmethod
+    def setUpClass(cls):
+        super(EmulatorTestCase, cls).setUpClass()
+        cache = tempfile.TemporaryDirectory(prefix="pdp11-emulator-test-")
+        cls.addClassCleanup(cache.cleanup)
+        environ = mock.patch.dict(os.environ, XDG_CACHE_HOME=cache.name)
+        environ.start()
+        cls.addClassCleanup(environ.stop)
+
+
+def type_keys(emu: Emulator, keys: str) -> tuple:
+    # Types every key and runs until the machine is idle again, then returns the observable state
+    for key in keys:
+        emu.keyboard.add_alpha(key)
+        emu.step()
+        while not emu.idle:
+            emu.step()
+    return (list(r.get(size="word", signed=False) for r in emu.registers), emu.program_status.word(),
+            bytes(emu.memory.data), emu.memory.video.image, emu.pipe.instructions, emu.pipe.cycles,
+            emu.icash.hits, emu.dcash.misses)
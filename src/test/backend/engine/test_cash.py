@@ -2,8 +2,9 @@ import unittest
 
 from bitarray import bitarray
 
-from src.backend.engine.cash import CashMemory
+from src.backend.engine.cash import CashMemory, CashConfig, ReplacementPolicy, WritePolicy
 from src.backend.model.memory import Memory
+from src.backend.utils.exceptions import CashWrongConfiguration
 
 
 class CashTest(unittest.TestCase):
@@ -18,6 +19,16 @@ class CashTest(unittest.TestCase):
 
         self.assertEqual(self.cash.cycle(), True)
 
+    def test_skip(self):
+        self.cash.load(address=0b0000000000001010, size="word")
+        self.assertEqual(self.cash.cycles_to_ready, 30)
+        self.cash.cycle()
+        self.cash.skip(27)
+        self.assertEqual(self.cash.cycles_to_ready, 2)
+        self.assertEqual(self.cash.cycle(), False)
+        self.assertEqual(self.cash.cycle(), True)
+        self.assertEqual(self.cash.cycles_to_ready, 0)
+
     def test_store(self):
         self.assertEqual(self.cash.store(address=0b0000000000001010, size="byte",
                                          value=bitarray("01010101")), False)
@@ -102,3 +113,95 @@ class CashTest(unittest.TestCase):
         self.assertEqual(self.cash.store(address=16 * 1024, size="byte", value=bitarray("01010101")),
                          False)
         self.assertEqual(self.cash.load(address=16 * 1024, size="byte"), (True, bitarray("01010101")))
+
+
+class CashPolicyTest(unittest.TestCase):
+    A, B, C, D, E = 0, 8, 16, 24, 32
+
+    def setUp(self):
+        self.memory = Memory()
+
+    def make(self, replacement=ReplacementPolicy.LRU, ways=2, write=WritePolicy.WRITE_BACK, seed=0):
+        return CashMemory(self.memory, config=CashConfig(sets=1, ways=ways, line_size=8, replacement=replacement,
+                                                         write=write, seed=seed))
+
+    @staticmethod
+    def access(cash, address, store=False):
+        for _ in range(1000):
+            if store:
+                done = cash.store(address=address, size="word", value=bitarray("0000000000000001"))
+            else:
+                done, _ = cash.load(address=address, size="word")
+            if done:
+                return
+            cash.cycle()
+
+        raise AssertionError("access never completed")
+
+    def cached(self, cash, *addresses):
+        return list(cash.load(address=address, size="word")[0] for address in addresses)
+
+    def test_wrong_configuration(self):
+        self.assertRaises(CashWrongConfiguration, CashConfig, sets=3)
+        self.assertRaises(CashWrongConfiguration, CashConfig, line_size=1)
+        self.assertRaises(CashWrongConfiguration, CashConfig, ways=3, replacement=ReplacementPolicy.PLRU)
+
+    def test_restore_other_configuration(self):
+        cash = self.make()
+        self.access(cash, self.A, store=True)
+        snapshot = cash.snapshot()
+        self.make().restore(snapshot)
+
+        # The same number of slots and replacement state, only the line size or the write policy differs
+        for other in (CashMemory(self.memory, config=CashConfig(sets=1, ways=2, line_size=16)),
+                      self.make(write=WritePolicy.WRITE_THROUGH)):
+            self.assertRaises(CashWrongConfiguration, other.restore, snapshot)
+
+    def test_lru(self):
+        cash = self.make()
+        for address in (self.A, self.B, self.A, self.C):
+            self.access(cash, address)
+        self.assertEqual(self.cached(cash, self.A, self.C, self.B), [True, True, False])
+
+    def test_fifo(self):
+        cash = self.make(ReplacementPolicy.FIFO)
+        for address in (self.A, self.B, self.A, self.C):
+            self.access(cash, address)
+        self.assertEqual(self.cached(cash, self.B, self.C, self.A), [True, True, False])
+
+    def test_lfu(self):
+        cash = self.make(ReplacementPolicy.LFU)
+        for address in (self.B, self.A, self.A, self.A, self.B, self.C, self.A):
+            self.access(cash, address)
+        self.assertEqual(self.cached(cash, self.A, self.C, self.B), [True, True, False])
+
+    def test_plru(self):
+        cash = self.make(ReplacementPolicy.PLRU, ways=4)
+        for address in (self.A, self.B, self.C, self.D, self.A, self.E):
+            self.access(cash, address)
+        self.assertEqual(self.cached(cash, self.A, self.B, self.D, self.E, self.C), [True, True, True, True, False])
+
+    def test_random_is_seeded(self):
+        def run(seed):
+            cash = self.make(ReplacementPolicy.RANDOM, ways=4, seed=seed)
+            for address in range(0, 8 * 32, 8):
+                self.access(cash, address)
+            return list(self.cached(cash, address)[0] for address in range(0, 8 * 32, 8))
+
+        self.assertEqual(run(1), run(1))
+        self.assertIn(True, run(1))
+
+    def test_write_through(self):
+        cash = self.make(write=WritePolicy.WRITE_THROUGH)
+        self.access(cash, self.A, store=True)
+        self.assertEqual((cash.hits, cash.misses), (0, 1))
+        self.assertEqual(self.cached(cash, self.A), [False])
+        self.assertEqual(cash.cycles_to_ready, 30)
+
+        self.access(cash, self.A)
+        self.access(cash, self.A, store=True)
+        self.assertEqual((cash.hits, cash.misses), (1, 2))
+        self.access(cash, self.B)
+        self.access(cash, self.C)
+        self.assertEqual(cash.cycles_to_ready, 0)
+        self.assertEqual(self.memory.load_word(self.A), 1)
@@ -0,0 +1,130 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from bitarray import bitarray
+
+from src.backend.engine.cash import CashMemory, CashConfig, ReplacementPolicy, WritePolicy
+from src.backend.engine import cashsim
+from src.backend.engine.cashsim import simulate, sweep, INSTRUCTION_STREAM, DATA_STREAM
+from src.backend.engine.trace import AccessTrace, AccessKind
+from src.backend.model.memory import Memory
+from src.backend.utils.exceptions import TraceFormatException
+
+
+class AccessTraceTest(unittest.TestCase):
+    def setUp(self):
+        self.trace = AccessTrace()
+        for kind, address in ((AccessKind.FETCH, 0o100000), (AccessKind.LOAD, 0o1000), (AccessKind.STORE, 0o177776)):
+            self.trace.record(kind, address)
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_save_load(self):
+        self.trace.save(self.path)
+        self.assertEqual(os.path.getsize(self.path), AccessTrace.HEADER.size + 3 * 3)
+        trace = AccessTrace.load(self.path)
+        self.assertEqual(list(trace.addresses), [0o100000, 0o1000, 0o177776])
+        self.assertEqual(list(trace.kinds), [AccessKind.FETCH, AccessKind.LOAD, AccessKind.STORE])
+
+    def test_wrong_file(self):
+        self.trace.save(self.path)
+        with open(self.path, "ab") as file:
+            file.write(b"\x00")
+        self.assertRaises(TraceFormatException, AccessTrace.load, self.path)
+
+        with open(self.path, "wb") as file:
+            file.write(b"not a trace at all")
+        self.assertRaises(TraceFormatException, AccessTrace.load, self.path)
+
+
+class CashSimulatorTest(unittest.TestCase):
+    @staticmethod
+    def random_trace(num: int) -> AccessTrace:
+        generator = random.Random(7)
+        trace = AccessTrace()
+        address = 0
+        for _ in range(num):
+            if generator.random() < 0.3:
+                address = generator.randrange(0, 2048, 2)
+            else:
+                address = (address + 2) % 2048
+            kind = AccessKind.STORE if generator.random() < 0.3 else AccessKind.LOAD
+            trace.record(kind, address)
+        return trace
+
+    @staticmethod
+    def replay(trace: AccessTrace, config: CashConfig) -> CashMemory:
+        cash = CashMemory(Memory(), config=config)
+        for kind, address in zip(trace.kinds, trace.addresses):
+            while True:
+                if kind == AccessKind.STORE:
+                    done = cash.store(address=address, size="word", value=bitarray("0000000000000001"))
+                else:
+                    done, _ = cash.load(address=address, size="word")
+                if done:
+                    break
+                cash.cycle()
+        return cash
+
+    def test_matches_cash(self):
+        trace = self.random_trace(3000)
+        for config in (CashConfig(),
+                       CashConfig(sets=8, ways=1, line_size=4),
+                       CashConfig(sets=4, ways=4, replacement=ReplacementPolicy.PLRU),
+                       CashConfig(sets=4, ways=4, replacement=ReplacementPolicy.FIFO),
+                       CashConfig(sets=4, ways=3, replacement=ReplacementPolicy.LFU),
+                       CashConfig(sets=4, ways=4, replacement=ReplacementPolicy.RANDOM, seed=3),
+                       CashConfig(sets=8, ways=2, write=WritePolicy.WRITE_THROUGH)):
+            cash = self.replay(trace, config)
+            result = simulate(trace, config)
+            self.assertEqual((result.hits, result.misses), (cash.hits, cash.misses), config.replacement)
+            self.assertEqual(result.accesses, len(trace))
+
+    def test_streams(self):
+        trace = AccessTrace()
+        for address in (0, 2, 4, 64):
+            trace.record(AccessKind.FETCH, address)
+        trace.record(AccessKind.LOAD, 0)
+        config = CashConfig(sets=1, ways=1)
+        self.assertEqual(simulate(trace, config, INSTRUCTION_STREAM).misses, 2)
+        self.assertEqual(simulate(trace, config, DATA_STREAM).accesses, 1)
+
+    def test_write_backs(self):
+        trace = AccessTrace()
+        for kind, address in ((AccessKind.STORE, 0), (AccessKind.LOAD, 8), (AccessKind.LOAD, 0),
+                              (AccessKind.LOAD, 8)):
+            trace.record(kind, address)
+        result = simulate(trace, CashConfig(sets=1, ways=1))
+        self.assertEqual((result.hits, result.misses, result.write_backs), (0, 4, 1))
+
+    def test_stack_distances(self):
+        # The array form gives the counts of the loop over the accesses
+        trace = self.random_trace(3000)
+        configs = list(CashConfig(sets=sets, ways=ways, line_size=line_size)
+                       for sets in (1, 4, 16) for ways in (1, 2, 3, 8) for line_size in (2, 8, 32))
+        configs.append(CashConfig(sets=4, ways=1, replacement=ReplacementPolicy.FIFO))
+        with mock.patch.object(cashsim, "_stack_simulated", return_value=False):
+            expected = list((r.hits, r.misses, r.write_backs) for r in (simulate(trace, c) for c in configs))
+        results = sweep(trace, configs, processes=1)
+        self.assertEqual(list((r.hits, r.misses, r.write_backs) for r in results), expected)
+        self.assertEqual(list((r.hits, r.misses, r.write_backs) for r in (simulate(trace, c) for c in configs)),
+                         expected)
+
+    def test_sweep(self):
+        trace = self.random_trace(500)
+        configs = list(CashConfig(sets=sets, ways=ways) for sets in (4, 16) for ways in (1, 2))
+        parallel = sweep(trace, configs, processes=2)
+        serial = sweep(trace, configs, processes=1)
+        self.assertEqual(list((r.hits, r.misses, r.write_backs) for r in parallel),
+                         list((r.hits, r.misses, r.write_backs) for r in serial))
+        self.assertEqual(list(r.config.sets for r in parallel), [4, 4, 16, 16])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,16 @@
+import threading
+import time
 import unittest
 from bitarray import bitarray
 
-from src.backend.engine.emulator import Emulator
+from src.backend.engine.emulator import Emulator, EngineKind
 from src.backend.model.memory import MemoryPart
 from src.backend.utils.disasm_instruction import DisasmState
+from src.backend.utils.exceptions import EmulatorWrongConfiguration
+from src.test.backend.engine.helpers import EmulatorTestCase, type_keys
 
 
-class EmulatorDisasmTest(unittest.TestCase):
+class EmulatorDisasmTest(EmulatorTestCase):
     def setUp(self):
         self.emu = Emulator()
 
@@ -84,5 +88,87 @@ class EmulatorDisasmTest(unittest.TestCase):
         self.assertEqual(str(self.emu._instructions[MemoryPart.ROM.start]), "CLRB R0")
 
 
+class EmulatorIdleTest(EmulatorTestCase):
+    def wait(self, condition, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_run_blocks_in_idle_loop(self):
+        emu = Emulator(engine=EngineKind.FUNCTIONAL)
+        thread = threading.Thread(target=emu.run)
+        thread.start()
+        try:
+            self.wait(lambda: emu.idle)
+            instructions = emu.pipe.instructions
+            time.sleep(0.3)
+            self.assertLessEqual(emu.pipe.instructions - instructions, 5)
+
+            emu.keyboard.add_alpha("a")
+            self.wait(lambda: emu.pipe.instructions - instructions > 100 and emu.idle)
+        finally:
+            emu.stopped = True
+            thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+
+class EmulatorSnapshotTest(EmulatorTestCase):
+    def test_restore_boot(self):
+        for engine in EngineKind:
+            emu = Emulator(engine=engine)
+            snapshot = emu.snapshot()
+            state = type_keys(emu, "abc")
+            emu.restore(snapshot)
+            self.assertEqual(type_keys(emu, "abc"), state)
+            self.assertEqual(type_keys(Emulator(engine=engine), "abc"), state)
+
+    def test_restore_in_flight(self):
+        emu = Emulator()
+        type_keys(emu, "a")
+        emu.keyboard.add_alpha("b")
+        for _ in range(50):
+            emu.step()
+        # Pipe drained here, the rest of the interrupt routine still to run
+        snapshot = emu.snapshot()
+        while not emu.idle:
+            emu.step()
+        state = type_keys(emu, "c")
+
+        emu.restore(snapshot)
+        while not emu.idle:
+            emu.step()
+        self.assertEqual(type_keys(emu, "c"), state)
+
+    def test_pages_shared(self):
+        emu = Emulator()
+        first = emu.snapshot()
+        type_keys(emu, "a")
+        second = emu.snapshot()
+        shared = sum(a is b for a, b in zip(first.pages, second.pages))
+        self.assertGreater(shared, len(first.pages) - 8)
+        self.assertLess(shared, len(first.pages))
+
+    def test_step_presents_held_frame(self):
+        emu = Emulator()
+        frames = []
+        emu.memory.video.set_on_show(lambda image, rows: frames.append(image))
+        # No frame interval passes while both glyphs are written, so the second one is held back
+        emu.memory.video.frame_rate = 1e-6
+        type_keys(emu, "ab")
+        emu.step()
+        self.assertGreater(emu.memory.video.statistics.coalesced, 0)
+        self.assertNotEqual(frames[-1], emu.memory.video.image)
+
+        # Once the interval has passed, the next step presents it
+        emu.memory.video.frame_rate = 60
+        emu.step()
+        self.assertEqual(frames[-1], emu.memory.video.image)
+
+    def test_wrong_engine(self):
+        snapshot = Emulator(engine=EngineKind.FUNCTIONAL).snapshot()
+        self.assertRaises(EmulatorWrongConfiguration, Emulator().restore, snapshot)
+
+
 if __name__ == "__main__":
     unittest.main()
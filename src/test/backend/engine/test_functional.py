@@ -0,0 +1,120 @@
+import unittest
+
+from src.backend.engine.emulator import Emulator, EngineKind
+from src.backend.engine.functional import FunctionalEngine
+from src.backend.model.memory import Memory
+from src.backend.model.programstatus import ProgramStatus
+from src.backend.model.registers import Register, StackPointer, ProgramCounter
+from src.test.backend.engine import test_pipe
+from src.test.backend.engine.helpers import EmulatorTestCase
+
+
+class FunctionalEngineTest(test_pipe.PipeTest):
+    def exec(self):
+        self.pipe = FunctionalEngine(memory=self.memory, registers=self.registers, ps=self.ps)
+        self.pipe.barrier()
+
+
+class BlockEngineTest(test_pipe.PipeTest):
+    # Same programs run through the translated code, one instruction per block so that the data words
+    # following the tested instruction aren't executed too
+    def exec(self):
+        self.pipe = FunctionalEngine(memory=self.memory, registers=self.registers, ps=self.ps)
+        self.pipe._translator.MAX_LENGTH = 1
+        self.pipe.run_block()
+
+
+class FunctionalEmulatorTest(EmulatorTestCase):
+    KEYS = "ab c-d"
+
+    @staticmethod
+    def run_keys(emu: Emulator, block: bool=False) -> Emulator:
+        def settle():
+            while not (emu.keyboard.interrupt_permitted and emu.memory.load(
+                    address=emu.current_pc, size="word").to01() == "0000000111111111"):
+                emu.step(block=block)
+
+        settle()
+        for key in FunctionalEmulatorTest.KEYS:
+            if key == " ":
+                emu.keyboard.add_space()
+            elif key == "-":
+                emu.keyboard.add_hyphen()
+            else:
+                emu.keyboard.add_alpha(key)
+            emu.step(block=block)
+            settle()
+        emu.keyboard.add_enter()
+        emu.step(block=block)
+        settle()
+        return emu
+
+    def test_same_state_as_pipe(self):
+        pipe = Emulator(engine=EngineKind.PIPE)
+        pipe.pipe.enabled = False
+        pipe = self.run_keys(pipe)
+        functional = self.run_keys(Emulator(engine=EngineKind.FUNCTIONAL))
+
+        self.assertEqual(functional.engine_kind, EngineKind.FUNCTIONAL)
+        self.assertEqual(list(r.word() for r in functional.registers), list(r.word() for r in pipe.registers))
+        self.assertEqual(functional.program_status.word(), pipe.program_status.word())
+        self.assertEqual(functional.memory.data, pipe.memory.data)
+        self.assertEqual(functional.memory.video.image, pipe.memory.video.image)
+        self.assertEqual(functional.pipe.instructions, pipe.pipe.instructions)
+
+    def test_same_state_with_blocks(self):
+        single = self.run_keys(Emulator(engine=EngineKind.FUNCTIONAL))
+        blocks = self.run_keys(Emulator(engine=EngineKind.FUNCTIONAL), block=True)
+
+        self.assertEqual(list(r.word() for r in blocks.registers), list(r.word() for r in single.registers))
+        self.assertEqual(blocks.program_status.word(), single.program_status.word())
+        self.assertEqual(blocks.memory.data, single.memory.data)
+        self.assertEqual(blocks.memory.video.image, single.memory.video.image)
+        self.assertEqual(blocks.pipe.instructions, single.pipe.instructions)
+
+
+class BlockTranslationTest(unittest.TestCase):
+    def setUp(self):
+        self.registers = list(Register() for _ in range(6)) + [StackPointer(), ProgramCounter()]
+        self.registers[7].set(size="word", signed=False, value=0o400)
+        self.memory = Memory()
+        self.ps = ProgramStatus()
+
+    def load(self, program: list):
+        for i, word in enumerate(program):
+            self.memory.store_word(0o400 + i * 2, word)
+        self.engine = FunctionalEngine(memory=self.memory, registers=self.registers, ps=self.ps)
+
+    def test_loop(self):
+        # MOV #5, R0; CLR R1; ADD R0, R1; SOB R0, .-2; BR .-0
+        self.load([0o012700, 5, 0o005001, 0o060001, 0o077002, 0o000777])
+        while self.engine.last_instruction_address != 0o412:
+            self.engine.run_block()
+        self.assertEqual(self.registers[1].get(size="word", signed=False), 15)
+        self.assertEqual(self.registers[0].get(size="word", signed=False), 0)
+        self.assertEqual(self.engine.instructions, 13)
+
+    def test_store_into_own_block(self):
+        # MOV #INC R1, @#410; INC R2; INC R3; BR .-0
+        self.load([0o012737, 0o005201, 0o000410, 0o005202, 0o005203, 0o000777])
+        while self.engine.last_instruction_address != 0o412:
+            self.engine.run_block()
+        self.assertEqual(list(r.get(size="word", signed=False) for r in self.registers[1:4]), [1, 1, 0])
+
+    def test_invalidated_by_store(self):
+        # INC R1; BR .-2
+        self.load([0o005201, 0o000776])
+        self.engine.run_block()
+        self.memory.store_word(0o400, 0o005202)  # INC R2
+        self.engine.run_block()
+        self.assertEqual(self.registers[1].get(size="word", signed=False), 1)
+        self.assertEqual(self.registers[2].get(size="word", signed=False), 1)
+
+    def test_stops_inside_block(self):
+        # INC R1; INC R2; BR .-0
+        self.load([0o005201, 0o005202, 0o000777])
+        self.engine.run_block(stops={0o402})
+        self.assertEqual(self.engine.last_instruction_address, 0o402)
+        self.assertEqual(self.registers[1].get(size="word", signed=False), 1)
+        self.assertEqual(self.registers[2].get(size="word", signed=False), 0)
+
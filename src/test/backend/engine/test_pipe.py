@@ -2,11 +2,13 @@ import unittest
 from bitarray import bitarray
 
 from src.backend.engine.cash import CashMemory
-from src.backend.engine.pipe import Pipe
+from src.backend.engine.pipe import Pipe, CompiledCommand, OP_FETCH_REGISTER, OP_STORE_REGISTER, OP_BRANCH_IF
 from src.backend.engine.pool_registers import PoolRegisters
+from src.backend.model.commands import Commands
 from src.backend.model.memory import Memory
 from src.backend.model.programstatus import ProgramStatus
 from src.backend.model.registers import Register, ProgramCounter, StackPointer
+from src.backend.utils.exceptions import RegisterOutOfBound, StackOverflow
 
 
 class PipeTest(unittest.TestCase):
@@ -33,7 +35,7 @@ class PipeTest(unittest.TestCase):
 
     def exec(self):
         self.pipe = Pipe(dmem=self.dcash, imem=self.icash, pool_registers=self.pool_registers,
-                         ps=self.ps, commands=None, enabled=False)
+                         ps=self.ps, enabled=False)
         self.pipe.barrier()
 
     def test_clr_program_status_correct(self):
@@ -649,5 +651,90 @@ class PipeTest(unittest.TestCase):
         self.assertEqual(self.registers[6].word().to01(), "0100000000000000")
         self.assertEqual(self.registers[7].word().to01(), "0101001111111110")
 
+
+    def test_push_past_stack_bound(self):
+        # MOV R1, -(SP)
+        self.memory.store(address=256, size="word", value=bitarray("0001000001100110"))
+        self.registers[6].set_lower_bound(512)
+        self.registers[6].set_word(value=bitarray("0000001000000000"))
+        self.assertRaises(StackOverflow, self.exec)
+        self.assertEqual(self.memory.load(address=510, size="word").to01(), "0101010100001111")
+
+    def test_push_past_address_space(self):
+        # MOV R1, -(SP) with SP at zero, JSR PC, (R1) and MOV (SP)+, R1 with SP at the top
+        for code, sp in (("0001000001100110", "0000000000000000"), ("0000100111001001", "0000000000000000"),
+                         ("0001010110000001", "1111111111111110")):
+            self.setUp()
+            self.memory.store(address=256, size="word", value=bitarray(code))
+            self.registers[6].set_word(value=bitarray(sp))
+            self.assertRaises(RegisterOutOfBound, self.exec)
+
+
+class PipeSkipStalledCyclesTest(unittest.TestCase):
+    PROGRAM = ("0111000000011010",  # MUL (R2), R0
+               "1001001101011111",  # MOVB (R5), @#1002
+               "0000001000000010",
+               "0011010111000010",  # BIT #0, R2
+               "0000000000000000")
+
+    def run_program(self, skip: bool, pipe_enabled: bool, cash_enabled: bool) -> tuple:
+        registers = list(Register() for _ in range(6)) + [StackPointer(), ProgramCounter()]
+        registers[2].set(size="word", signed=False, value=0o1000)
+        registers[5].set(size="word", signed=False, value=0o1001)
+        registers[7].set(size="word", signed=False, value=0o400)
+        memory = Memory()
+        memory.store_word(0o1000, 0o12345)
+        for i, word in enumerate(self.PROGRAM):
+            memory.store(address=0o400 + 2 * i, size="word", value=bitarray(word))
+
+        icash, dcash = CashMemory(memory, cash_enabled), CashMemory(memory, cash_enabled)
+        pipe = Pipe(dmem=dcash, imem=icash, pool_registers=PoolRegisters(registers), ps=ProgramStatus(),
+                    enabled=pipe_enabled)
+        if not skip:
+            pipe._skip_stalled_cycles = lambda fetch_new_instruction: 0
+
+        while pipe.instructions < 3:
+            pipe.cycle()
+        pipe.barrier()
+        return pipe.cycles, icash.hits, icash.misses, dcash.hits, dcash.misses, \
+            list(register.get(size="word", signed=False) for register in registers)
+
+    def test_same_cycles(self):
+        for pipe_enabled in (False, True):
+            for cash_enabled in (False, True):
+                self.assertEqual(self.run_program(True, pipe_enabled, cash_enabled),
+                                 self.run_program(False, pipe_enabled, cash_enabled))
+
+
+class CompiledCommandTest(unittest.TestCase):
+    def test_mov_register(self):
+        compiled = CompiledCommand(Commands.get_command_by_word(0o010102))  # MOV R1, R2
+        self.assertEqual(len(compiled.fetches), 1)
+        self.assertFalse(compiled.next)
+        self.assertEqual(list(op.code for op in compiled.operands), [OP_FETCH_REGISTER])
+        self.assertEqual(compiled.blreg, (2,))
+        self.assertEqual(compiled.blmem, ())
+        self.assertEqual(list((op.code, op.register, op.unblock) for op in compiled.writes),
+                         [(OP_STORE_REGISTER, 2, True)])
+        self.assertFalse(compiled.branch)
+
+    def test_branch(self):
+        compiled = CompiledCommand(Commands.get_command_by_word(0o000777))  # BR .-0
+        self.assertTrue(compiled.branch)
+        self.assertEqual(compiled.blreg, (7,))
+        self.assertEqual(list((op.code, op.unblock) for op in compiled.writes), [(OP_BRANCH_IF, True)])
+
+    def test_reused_per_word(self):
+        registers = list(Register() for _ in range(6)) + [StackPointer(), ProgramCounter()]
+        registers[7].set(size="word", signed=False, value=0o400)
+        memory = Memory()
+        memory.store_word(0o400, 0o000777)
+        pipe = Pipe(dmem=CashMemory(memory, False), imem=CashMemory(memory, False),
+                    pool_registers=PoolRegisters(registers), ps=ProgramStatus(), enabled=True)
+        while pipe.instructions < 5:
+            pipe.cycle()
+        self.assertEqual(list(pipe._compiled), [0o000777])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from src.backend.engine.cash import CashConfig, ReplacementPolicy, WritePolicy
+from src.backend.engine.emulator import Emulator, EngineKind
+from src.backend.engine.savestate import SaveState
+from src.backend.engine.snapshot import Snapshot
+from src.backend.utils.exceptions import SaveStateFormatException, CashWrongConfiguration
+from src.test.backend.engine.helpers import EmulatorTestCase, type_keys
+
+
+class SaveStateTest(EmulatorTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_save_load(self):
+        for engine in EngineKind:
+            config = CashConfig(replacement=ReplacementPolicy.RANDOM)
+            emu = Emulator(engine=engine, dcash=config)
+            type_keys(emu, "ab")
+            emu.keyboard.add_alpha("c")
+            snapshot = emu.snapshot()
+            SaveState.save(snapshot, self.path)
+            self.assertEqual(os.path.getsize(self.path) % SaveState.ALIGNMENT, 0)
+
+            loaded = SaveState.load(self.path)
+            for field in Snapshot.__slots__:
+                self.assertEqual(getattr(loaded, field), getattr(snapshot, field), field)
+
+            other = Emulator(engine=engine, dcash=config)
+            other.restore(loaded)
+            self.assertEqual(type_keys(other, "d"), type_keys(emu, "d"))
+
+    def test_other_configuration(self):
+        SaveState.save(Emulator().snapshot(), self.path)
+        snapshot = SaveState.load(self.path)
+        self.assertRaises(CashWrongConfiguration, Emulator(icash=CashConfig(ways=4)).restore, snapshot)
+        self.assertRaises(CashWrongConfiguration, Emulator(dcash=CashConfig(write=WritePolicy.WRITE_THROUGH)).restore,
+                          snapshot)
+
+    def test_wrong_file(self):
+        SaveState.save(Emulator().snapshot(), self.path)
+        with open(self.path, "ab") as file:
+            file.write(b"\x00")
+        self.assertRaises(SaveStateFormatException, SaveState.load, self.path)
+
+        with open(self.path, "wb") as file:
+            file.write(b"not a save state")
+        self.assertRaises(SaveStateFormatException, SaveState.load, self.path)
+
+        open(self.path, "wb").close()
+        self.assertRaises(SaveStateFormatException, SaveState.load, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
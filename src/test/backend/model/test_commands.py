@@ -0,0 +1,54 @@
+import unittest
+
+from src.backend.model.commands import Commands, InstanceCommand, BRCommand, SOBCommand
+from src.backend.model.programstatus import ProgramStatus
+from src.backend.utils.exceptions import UnknownCommand
+
+
+class CommandsTest(unittest.TestCase):
+    _FIELDS = {"msb": "on_byte", "srcmode": "src_mode", "srcreg": "src_reg", "destmode": "dest_mode",
+               "destreg": "dest_reg", "reg": "reg", "offset": "offset", "number": "number"}
+
+    def test_decode_table_matches_patterns(self):
+        for code in range(1 << 16):
+            string = "{:016b}".format(code)
+            decoded = Commands.decode(code)
+            for command_instance in InstanceCommand:
+                matcher = command_instance.pattern.match(string)
+                if matcher is not None:
+                    break
+            else:
+                self.assertIsNone(decoded)
+                continue
+
+            self.assertIs(decoded.instance, command_instance)
+            for name, value in matcher.groupdict().items():
+                expected = (value == "1") if name == "msb" else int(value, 2)
+                self.assertEqual(getattr(decoded, CommandsTest._FIELDS[name]), expected)
+
+    def test_get_command_by_word(self):
+        command = Commands.get_command_by_word(code=0o000777)
+        self.assertIsInstance(command, BRCommand)
+        self.assertEqual(command.offset, -1)
+
+        command = Commands.get_command_by_word(code=0o077203)
+        self.assertIsInstance(command, SOBCommand)
+        self.assertEqual(command.offset, 3)
+
+        with self.assertRaises(UnknownCommand):
+            Commands.get_command_by_word(code=0o177777)
+
+    def test_templates_are_shared(self):
+        command = Commands.get_command_by_word(code=0o005201)
+        self.assertIs(Commands.get_command_by_word(code=0o005201), command)
+        self.assertFalse(hasattr(command, "__dict__"))
+        with self.assertRaises(TypeError):
+            next(iter(command))["operation"] = None
+
+    def test_contexts_are_independent(self):
+        command = Commands.get_command_by_word(code=0o004767)
+        first = command.new_context(program_status=ProgramStatus())
+        second = command.new_context(program_status=ProgramStatus())
+        command.dest_operand.inner_register(first).set(size="word", signed=False, value=10)
+        self.assertEqual(command.dest_operand.inner_register(second).get(size="word", signed=False), 0)
+        self.assertEqual(len(first.registers), command.slots)
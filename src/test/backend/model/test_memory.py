@@ -0,0 +1,115 @@
+import unittest
+
+from bitarray import bitarray
+
+from src.backend.model.memory import Memory, MemoryPart
+from src.backend.model.registers import MemoryRegister
+from src.backend.utils.exceptions import MemoryOddAddressing, MemoryIndexOutOfBound, MemoryException, \
+    MemoryDeviceOverlap
+
+
+class MemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.memory = Memory()
+
+    def test_word_and_byte(self):
+        self.memory.store_word(0o1000, 0o123456)
+        self.assertEqual(self.memory.load_word(0o1000), 0o123456)
+        self.assertEqual(self.memory.load_byte(0o1000), 0o123456 & 0xFF)
+        self.assertEqual(self.memory.load_byte(0o1001), 0o123456 >> 8)
+
+        self.memory.store_byte(0o1001, 0x12)
+        self.assertEqual(self.memory.load_word(0o1000), 0x1200 | (0o123456 & 0xFF))
+
+    def test_errors(self):
+        self.assertRaises(MemoryOddAddressing, self.memory.load_word, 1)
+        self.assertRaises(MemoryOddAddressing, self.memory.store_word, 1, 0)
+        self.assertRaises(MemoryIndexOutOfBound, self.memory.load_byte, Memory.SIZE)
+        self.assertRaises(MemoryException, self.memory.store_word, 0, 0x10000)
+        self.assertRaises(MemoryException, self.memory.store_byte, 0, 0x100)
+
+    def test_bitarray_wrappers(self):
+        self.memory.store(address=0o2000, size="word", value=bitarray("1000000000000001"))
+        self.assertEqual(self.memory.load_word(0o2000), 0x8001)
+        self.assertEqual(self.memory.load(address=0o2001, size="byte").to01(), "10000000")
+        self.assertRaises(MemoryException, self.memory.store, address=0o2000, size="word", value=bitarray("1"))
+
+    def test_views(self):
+        self.memory.store_word(0o100, 0xBEEF)
+        self.assertEqual(self.memory.words[0o100 // 2], 0xBEEF)
+        self.memory.view[0o102] = 0x34
+        self.assertEqual(self.memory.load_byte(0o102), 0x34)
+
+    def test_devices(self):
+        self.memory.store_word(MemoryPart.VRAM.start, 0x00FF)
+        self.assertEqual(self.memory.load_word(MemoryPart.VRAM.start), 0x00FF)
+        self.assertEqual(self.memory.data[MemoryPart.VRAM.start], 0)
+
+        address = self.memory.keyboard_register_address
+        self.memory.store_byte(address + 1, 0x80)
+        self.assertTrue(self.memory.keyboard_register.interrupt_permitted)
+        self.assertEqual(self.memory.load_word(address), 0x8000)
+
+    def test_register_device(self):
+        register = MemoryRegister(address=0o1000)
+        stores = []
+        self.memory.register_device(0o1000, 0o1002, register, on_store=lambda: stores.append(register.address))
+        self.assertTrue(self.memory.operation_on_device(0o1001))
+        self.assertFalse(self.memory.operation_on_device(0o1002))
+
+        self.memory.store_word(0o1000, 0o777)
+        self.assertEqual(register.get(size="word", signed=False), 0o777)
+        self.assertEqual(self.memory.data[0o1000], 0)
+        self.assertEqual(stores, [0o1000])
+
+        self.assertRaises(MemoryDeviceOverlap, self.memory.register_device, 0o776, 0o1002, register)
+        self.assertRaises(MemoryException, self.memory.register_device, 0o2001, 0o2003, register)
+
+        self.memory.unregister_device(register)
+        self.memory.store_word(0o1000, 0o777)
+        self.assertEqual(self.memory.load_word(0o1000), 0o777)
+
+    def test_move_VRAM(self):
+        start = MemoryPart.VRAM.start + 0o10000
+        self.memory.store_word(self.memory.video_register_mode_start_address, start // 4)
+        self.assertEqual(self.memory.video.VRAM_start, start)
+        self.assertFalse(self.memory.operation_on_device(MemoryPart.VRAM.start))
+        self.assertTrue(self.memory.operation_on_device(start))
+        self.assertTrue(self.memory.operation_on_device(start + self.memory.video.size - 1))
+        self.assertFalse(self.memory.operation_on_device(start + self.memory.video.size))
+
+
+    def test_store_block(self):
+        self.memory.store_block(MemoryPart.ROM.end - 3, b"\x01\x02\x03")
+        self.assertEqual(self.memory.load_byte(MemoryPart.ROM.end - 3), 1)
+        self.assertEqual(self.memory.load_word(MemoryPart.ROM.end - 2), 0x0302)
+        self.assertRaises(MemoryException, self.memory.store_block, MemoryPart.VRAM.start - 2, b"\x00" * 4)
+        self.assertRaises(MemoryIndexOutOfBound, self.memory.store_block, Memory.SIZE - 1, b"\x00" * 2)
+
+        stored = []
+        self.memory.set_code_watcher(stored.append)
+        self.memory.watch_code(0o1002, 0o1004)
+        self.memory.store_block(0o1000, bytes(6))
+        self.assertEqual(stored, [0o1002])
+
+
+    def test_snapshot_dirty_pages(self):
+        first = self.memory.snapshot()[0]
+        self.memory.store_word(0o1000, 0o123456)
+        self.memory.store_byte(0o2001, 7)
+        second = self.memory.snapshot()[0]
+        changed = [i for i, (a, b) in enumerate(zip(first, second)) if a is not b]
+        self.assertEqual(changed, [0o1000 // Memory.PAGE_SIZE, 0o2000 // Memory.PAGE_SIZE])
+
+        # Nothing was stored since, so every page is shared
+        self.assertIs(self.memory.snapshot()[0], second)
+
+        state = self.memory.snapshot()
+        self.memory.store_word(0o1000, 0)
+        self.memory.restore(state)
+        self.assertEqual(self.memory.load_word(0o1000), 0o123456)
+        self.assertIs(self.memory.snapshot()[0], state[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
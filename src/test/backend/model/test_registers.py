@@ -0,0 +1,77 @@
+import unittest
+
+from bitarray import bitarray
+
+from src.backend.model.programstatus import ProgramStatus
+from src.backend.model.registers import Register, StackPointer, VideoMemoryRegisterModeStart, KeyboardRegister
+from src.backend.utils.exceptions import RegisterOutOfBound, RegisterOddValue, StackOverflow
+
+
+class RegistersTest(unittest.TestCase):
+    def test_views(self):
+        register = Register()
+        register.set(size="word", signed=True, value=-2)
+        self.assertEqual(register.get(size="word", signed=False), 0xFFFE)
+        self.assertEqual(register.get(size="word", signed=True), -2)
+        self.assertEqual(register.get(size="byte", signed=False), 0xFE)
+        self.assertEqual(register.get(size="byte", signed=True), -2)
+
+        register.set(size="byte", signed=False, value=0x12)
+        self.assertEqual(register.get(size="word", signed=False), 0xFF12)
+        self.assertRaises(RegisterOutOfBound, register.set, size="byte", signed=True, value=128)
+
+    def test_bitarray_shims(self):
+        register = Register()
+        register.set_word(bitarray("1000000000000011"))
+        self.assertEqual(register.get(size="word", signed=False), 0x8003)
+        self.assertEqual(register.word().to01(), "1000000000000011")
+        self.assertEqual(register.byte().to01(), "00000011")
+
+        register.set_byte(bitarray("11110000"))
+        self.assertEqual(register.word().to01(), "1000000011110000")
+        register.reverse()
+        self.assertEqual(register.get(size="word", signed=False), 0xF080)
+
+    def test_snapshot(self):
+        sp = StackPointer()
+        sp.set(size="word", signed=False, value=0x1234)
+        state = sp.snapshot()
+        sp.set(size="word", signed=False, value=0)
+        sp.restore(state)
+        self.assertEqual(sp.get(size="word", signed=False), 0x1234)
+        self.assertRaises(RegisterOutOfBound, sp.restore, 0x10000)
+
+    def test_stack_pointer(self):
+        sp = StackPointer()
+        sp.set_lower_bound(0x100)
+        self.assertRaises(RegisterOddValue, sp.set, size="word", signed=False, value=0x201)
+        sp.set(size="word", signed=False, value=0x102)
+        sp.dec(value=2)
+        self.assertEqual(sp.get(size="word", signed=False), 0x100)
+        self.assertRaises(StackOverflow, sp.dec, value=2)
+
+    def test_program_status(self):
+        ps = ProgramStatus()
+        ps.set_status(bit="N", value=True)
+        ps.set_status(bit="C", value=True)
+        self.assertEqual(ps.word().to01(), "0110000000000000")
+        self.assertEqual(ps.bits, dict(V=False, N=True, C=True, Z=False))
+        ps.set_status(bit="N", value=False)
+        self.assertEqual(ps.get(size="word", signed=False), 0x2000)
+
+    def test_memory_registers(self):
+        video = VideoMemoryRegisterModeStart(address=0xFFFA, VRAM_start=0x4000, mode=2)
+        self.assertEqual((video.mode, video.VRAM_start), (2, 0x4000))
+        self.assertEqual(video.load(address=0xFFFB, size="byte").to01(), "10010000")
+
+        keyboard = KeyboardRegister(address=0xFFFE)
+        keyboard.interrupt_permitted = True
+        keyboard.key_index = 0x41
+        self.assertEqual(keyboard.get(size="word", signed=False), 0x8041)
+        keyboard.store(address=0xFFFF, size="byte", value=bitarray("00000000"))
+        self.assertFalse(keyboard.interrupt_permitted)
+        self.assertEqual(keyboard.key_index, 0x41)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import pathlib
+import subprocess
+import sys
+import unittest
+
+from src.backend.model.framebuffer import Frame, rgb
+from src.backend.model.memory import Memory, MemoryPart
+
+
+class VideoMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.memory = Memory()
+        self.video = self.memory.video
+        self.start = MemoryPart.VRAM.start
+
+    def test_pixels(self):
+        self.assertTrue((self.video.pixels == 1).all())
+
+        # The first pixel of a byte is its high bit, the low byte of a word comes first
+        self.memory.store_word(self.start, 0x807F)
+        self.memory.store_byte(self.start + self.video.line_size + 1, 0x0F)
+        self.assertEqual(self.memory.load_word(self.start), 0x807F)
+        self.assertEqual(list(self.video.pixels[0, :16]), [0] + [1] * 7 + [1] + [0] * 7)
+        self.assertEqual(list(self.video.pixels[1, 8:16]), [0] * 4 + [1] * 4)
+        self.assertEqual(self.video.image.pixel_index(8, 0), 1)
+        self.assertEqual(self.video.image.pixel_index(9, 0), 0)
+        self.assertEqual(self.video.image.pixel(0, 0), rgb(0, 0, 0))
+
+    def test_backends(self):
+        image = self.video.image
+        self.assertIsInstance(image, Frame)
+        self.assertEqual(int(image.rgb()[0, 0]), 0xFFFFFFFF)
+        self.memory.store_byte(self.start, 0)
+        self.assertNotEqual(self.video.image, image)
+
+        from src.gui.qt_video import QtVideoBackend
+        self.video.set_backend(QtVideoBackend())
+        self.assertEqual(self.video.image.pixelIndex(0, 0), 0)
+        self.assertEqual(self.video.image.colorTable(), list(image.color_table))
+
+    def test_no_qt(self):
+        code = "import sys; import src.backend.engine.emulator; " \
+               "sys.exit(any(name.startswith('PyQt5') for name in sys.modules))"
+        root = pathlib.Path(__file__).parents[4]
+        self.assertEqual(subprocess.call([sys.executable, "-c", code], cwd=str(root)), 0)
+
+    def test_no_engine(self):
+        # The model must not depend on the engine
+        code = "import sys; import src.backend.model.memory; " \
+               "sys.exit(any(name.startswith('src.backend.engine') for name in sys.modules))"
+        root = pathlib.Path(__file__).parents[4]
+        self.assertEqual(subprocess.call([sys.executable, "-c", code], cwd=str(root)), 0)
+
+    def test_scroll(self):
+        for row in range(self.video.mode.height):
+            self.memory.store_byte(self.start + row * self.video.line_size, row)
+
+        self.memory.store_word(self.memory.video_register_offset_address, 3)
+        self.assertEqual([self.video.vram[row * self.video.line_size] for row in range(4)], [3, 4, 5, 6])
+        self.assertEqual(self.video.vram[-self.video.line_size * 3:], b"\xff" * self.video.line_size * 3)
+
+        self.memory.store_word(self.memory.video_register_offset_address, 0x8000)
+        self.assertEqual(self.video.vram, b"\xff" * self.video.size)
+
+    def test_ring(self):
+        line_size, height = self.video.line_size, self.video.mode.height
+        last = self.start + (height - 1) * line_size
+        for offset in range(1, height + 3):
+            self.memory.store_word(last, offset)
+            self.memory.store_word(self.memory.video_register_offset_address, offset)
+            self.assertEqual(self.memory.load_word(last - line_size), offset)
+            self.assertEqual(self.memory.load_word(last), 0xFFFF)
+
+        # Wraps the offset register back to zero
+        self.memory.store_word(self.memory.video_register_offset_address, 0)
+        self.assertEqual(self.video.pixels.shape, (height, self.video.mode.width))
+        self.assertTrue((self.video.pixels == 1).all())
+
+    def test_present(self):
+        frames = []
+        self.video.set_on_show(lambda image, rows: frames.append(rows))
+        self.video.show()
+        self.assertEqual(frames, [(0, self.video.mode.height)])
+
+        # Nothing changed
+        self.video.show()
+        self.assertEqual(len(frames), 1)
+
+        # The frame interval has not passed, so the burst is presented once by flush()
+        self.video.frame_rate = 1e-6
+        self.video.show()
+        self.memory.store_word(self.start + 5 * self.video.line_size, 0)
+        self.video.show()
+        self.memory.store_byte(self.start + 9 * self.video.line_size + 3, 0)
+        self.video.show()
+        self.video.show()
+        self.assertEqual(frames, [(0, self.video.mode.height), (5, 6)])
+        self.video.flush()
+        self.video.flush()
+        self.assertEqual(frames[2:], [(9, 10)])
+        self.assertEqual(self.video.statistics.snapshot(), (3, 2))
+
+        self.video.frame_rate = 0
+        self.memory.store_word(self.memory.video_register_offset_address, 1)
+        self.video.show()
+        self.assertEqual(frames[3:], [(0, self.video.mode.height)])
+
+    def test_present_clear(self):
+        frames = []
+        self.video.set_on_show(lambda image, rows: frames.append(rows))
+        self.video.frame_rate = 0
+        self.video.show()
+        self.memory.store_word(self.start + 30 * self.video.line_size, 0)
+        self.video.show()
+
+        self.memory.store_word(self.memory.video_register_offset_address, 0x8000)
+        self.video.show()
+        self.assertEqual(frames[1:], [(30, 31), (0, self.video.mode.height)])
+        self.assertTrue((self.video.pixels == 1).all())
+
+    def test_snapshot(self):
+        self.memory.store_word(self.start + 0o100, 0o123456)
+        state = self.video.snapshot()
+        self.memory.store_word(self.start + 0o100, 0)
+        self.video.restore(state)
+        self.assertEqual(self.memory.load_word(self.start + 0o100), 0o123456)
+        self.assertEqual(len(state[3]), self.video.size)
+
+
+if __name__ == '__main__':
+    unittest.main()
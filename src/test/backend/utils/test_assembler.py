@@ -0,0 +1,110 @@
+import unittest
+from bitarray import bitarray
+
+from src.backend.engine.cash import CashMemory
+from src.backend.engine.functional import FunctionalEngine
+from src.backend.engine.pipe import Pipe
+from src.backend.engine.pool_registers import PoolRegisters
+from src.backend.model.memory import Memory, MemoryPart
+from src.backend.model.programstatus import ProgramStatus
+from src.backend.model.registers import Register, StackPointer, ProgramCounter
+from src.backend.utils.assembler import Assembler, AssemblerException
+
+
+class AssemblerTest(unittest.TestCase):
+    def test_double_operand(self):
+        self.assertEqual(Assembler.assemble(["MOV R0, R1"]), [0o010001])
+        self.assertEqual(Assembler.assemble(["MOVB #5, @#177560"]), [0o112737, 0o5, 0o177560])
+        self.assertEqual(Assembler.assemble(["ADD -2(R3),(R4)+"]), [0o066324, 0o177776])
+        self.assertEqual(Assembler.assemble(["  XOR R2, @-(R5)  "]), [0o074255])
+
+    def test_single_operand(self):
+        self.assertEqual(Assembler.assemble(["CLRB @(R1)+", "JMP @10(R6)", "RTS R7"]),
+                         [0o105031, 0o000176, 0o10, 0o000207])
+
+    def test_other(self):
+        self.assertEqual(Assembler.assemble(["BR -1", "BNE 10", "SOB R1, 3", "MARK 5", "RTI"]),
+                         [0o000777, 0o001010, 0o077103, 0o006405, 0o000002])
+
+    def test_comments(self):
+        self.assertEqual(Assembler.assemble(["# comment", "", "   ", "TST R0"]), [0o005700])
+
+    def test_wrong(self):
+        for line in ["CLR", "CLRX R0", "MOV R0", "RTS (R1)", "BR 400", "MOV #200000, R0", "SOB R1, 100",
+                     "RTI R0", "MOV R8, R0", "BR 9"]:
+            self.assertRaises(AssemblerException, Assembler.assemble, [line])
+
+
+class ProgramTest(unittest.TestCase):
+    def test_labels(self):
+        program = Assembler.assemble_program([
+            "; sums the table",
+            ". = 1000",
+            "start:  MOV #table, R1",
+            "        MOV #count, R2",
+            "loop:   ADD (R1)+, R0",
+            "        SOB R2, loop",
+            "        MOV R0, result     ; relative",
+            "        BNE start",
+            "        BR .",
+            "result: .word 0",
+            "table:  .word 1, 2, <count*2>!1, -1",
+            "count = <. - table> / 2"])
+
+        self.assertEqual(program.symbols, dict(start=0o1000, loop=0o1010, result=0o1024, table=0o1026, count=4))
+        self.assertEqual(program.segments, [(0o1000, program.image)])
+        self.assertEqual(program.words, [0o012701, 0o1026, 0o012702, 0o4, 0o062100, 0o077202, 0o010067, 0o4,
+                                         0o001367, 0o000777, 0, 1, 2, 0o11, 0o177777])
+
+        listing = program.listing_text().splitlines()
+        self.assertEqual(listing[10], "   11 001026 000001 000002 000011  table:  .word 1, 2, <count*2>!1, -1")
+        self.assertEqual(listing[11], "   11 001034 177777")
+        self.assertIn("count                    000004", program.symbol_map())
+
+    def test_data(self):
+        program = Assembler.assemble_program([
+            ". = 100", ".byte 1, -1, 10.", ".even", "buf: .blkw 2", ".word buf",
+            ". = 200", "data: .word size", "size = 20", "JMP @#data"], symbols=dict(base=0o100))
+
+        self.assertEqual(program.segments, [(0o100, bytes([1, 0o377, 10, 0, 0, 0, 0, 0, 0o104, 0])),
+                                            (0o200, bytes([0o20, 0, 0o137, 0, 0o200, 0]))])
+        self.assertEqual((program.start, program.end, len(program.image)), (0o100, 0o206, 0o106))
+        self.assertEqual(program.symbols["base"], 0o100)
+
+        memory = Memory()
+        Assembler.assemble_program([". = {:o}".format(MemoryPart.RAM.start + 0o1000), "CLR R0"]).load(memory)
+        self.assertEqual(memory.load_word(MemoryPart.RAM.start + 0o1000), 0o005000)
+
+    def test_same_as_lines(self):
+        lines = ["MOV #5, @#177560", "ADD -2(R3),(R4)+", "CLRB @(R1)+", "RTS R7", "MARK 5", "RTI"]
+        self.assertEqual(Assembler.assemble_program(lines).words, Assembler.assemble(lines))
+
+    def test_relative_operands(self):
+        # Both offsets are relative to PC past the whole instruction
+        program = Assembler.assemble_program([". = 400", "MOV a, b", "a: .word 1234", "b: .word 0"])
+        self.assertEqual(program.words, [0o016767, 0, 0o2, 0o1234, 0])
+
+        for engine in ("pipe", "functional"):
+            memory = Memory()
+            program.load(memory)
+            registers = [Register() for _ in range(6)] + [StackPointer(), ProgramCounter()]
+            registers[7].set_word(value=bitarray("{:016b}".format(0o400)))
+            if engine == "pipe":
+                Pipe(dmem=CashMemory(memory, False), imem=CashMemory(memory, False),
+                     pool_registers=PoolRegisters(registers), ps=ProgramStatus(), enabled=False).barrier()
+            else:
+                FunctionalEngine(memory=memory, registers=registers, ps=ProgramStatus()).barrier()
+            self.assertEqual(memory.load_word(program.symbols["b"]), 0o1234, engine)
+
+    def test_wrong(self):
+        for lines in [["BR far"], ["BR 1001"], ["a: CLR R0", "a: CLR R1"], ["x = y", "y = x"], ["RTS #1"],
+                      ["MOV R0"], ["FOO R0"], [". = 1", "CLR R0"], [".word 200000"], ["CLR R0", ". = 0", "CLR R1"],
+                      ["R0 = 1"], [".word <1"], [".blkw later", "later = 1"], ["BR 1000", ". = 2000", "far:"]]:
+            self.assertRaises(AssemblerException, Assembler.assemble_program, lines)
+        with self.assertRaises(AssemblerException) as context:
+            Assembler.assemble_program(["CLR R0", "", "JMP undefined"])
+        self.assertEqual(str(context.exception), "line 3: undefined symbol undefined")
+
+
+if __name__ == '__main__':
+    unittest.main()
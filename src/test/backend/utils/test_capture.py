@@ -0,0 +1,96 @@
+import hashlib
+import pathlib
+import tempfile
+import threading
+import unittest
+import zlib
+
+import numpy
+
+from src.backend.model.memory import Memory, MemoryPart
+from src.backend.utils.capture import FrameCapture, CaptureFormat
+from src.backend.utils.exceptions import CaptureException
+
+
+class FrameCaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+        self.memory = Memory()
+        self.video = self.memory.video
+        self.video.frame_rate = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def present(self, capture: FrameCapture) -> list:
+        # Three frames: the blank screen and two more with a black byte in another row
+        self.video.add_capture(capture)
+        frames = []
+        for row in range(3):
+            if row > 0:
+                self.memory.store_byte(MemoryPart.VRAM.start + row * self.video.line_size, 0)
+            self.video.show()
+            frames.append(self.video.pixels)
+        self.video.remove_capture(capture)
+        capture.close()
+        self.assertEqual(capture.statistics.snapshot(), (3, 0))
+        return frames
+
+    def test_npy(self):
+        frames = self.present(FrameCapture(self.path / "frames.npy", CaptureFormat.NPY))
+        stack = numpy.load(str(self.path / "frames.npy"))
+        self.assertEqual(stack.shape, (3, self.video.mode.height, self.video.mode.width))
+        self.assertTrue((stack == numpy.stack(frames)).all())
+
+    def test_raw(self):
+        frames = self.present(FrameCapture(self.path / "frames.raw", CaptureFormat.RAW))
+        self.assertEqual((self.path / "frames.raw").read_bytes(), b"".join(frame.tobytes() for frame in frames))
+
+    def test_hash(self):
+        frames = self.present(FrameCapture(self.path / "frames.log", CaptureFormat.HASH))
+        self.assertEqual((self.path / "frames.log").read_text().splitlines(),
+                         ["{:6d} {}".format(index, hashlib.sha1(frame.tobytes()).hexdigest())
+                          for index, frame in enumerate(frames)])
+
+    def test_png(self):
+        frames = self.present(FrameCapture(self.path / "frames", CaptureFormat.PNG))
+        self.assertEqual(sorted(path.name for path in (self.path / "frames").iterdir()),
+                         ["frame-000000.png", "frame-000001.png", "frame-000002.png"])
+
+        png = (self.path / "frames" / "frame-000002.png").read_bytes()
+        self.assertTrue(png.startswith(FrameCapture.PNG_SIGNATURE))
+        self.assertIn(b"PLTE\x00\x00\x00\xff\xff\xff", png)
+        start = png.index(b"IDAT") + 4
+        rows = numpy.frombuffer(zlib.decompress(png[start: start + int.from_bytes(png[start - 8: start - 4], "big")]),
+                                dtype=numpy.uint8).reshape(self.video.mode.height, -1)
+        self.assertTrue((rows[:, 0] == 0).all())
+        self.assertTrue((rows[:, 1:] == frames[2]).all())
+
+    def test_dropped(self):
+        release = threading.Event()
+
+        class SlowCapture(FrameCapture):
+            def _write(self, pixels, color_table):
+                release.wait()
+                super(SlowCapture, self)._write(pixels, color_table)
+
+        capture = SlowCapture(self.path / "frames.raw", CaptureFormat.RAW, queue_size=2)
+        pixels = self.video.pixels
+        for _ in range(10):
+            capture.capture(pixels, self.video.color_table)
+        release.set()
+        capture.close()
+
+        captured, dropped = capture.statistics.snapshot()
+        self.assertEqual(captured + dropped, 10)
+        self.assertIn(captured, (2, 3))
+        self.assertEqual((self.path / "frames.raw").stat().st_size, captured * pixels.size)
+
+    def test_wrong_path(self):
+        (self.path / "file").write_bytes(b"")
+        self.assertRaises(CaptureException, FrameCapture, self.path / "file" / "frames.raw", CaptureFormat.RAW)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from src.backend.utils.romfiller import ROMFiller
+
+
+class ROMFillerTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        self.environ = os.environ.get("XDG_CACHE_HOME")
+        os.environ["XDG_CACHE_HOME"] = self.cache.name
+        ROMFiller._loaded.clear()
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ["XDG_CACHE_HOME"]
+        else:
+            os.environ["XDG_CACHE_HOME"] = self.environ
+        ROMFiller._loaded.clear()
+        self.cache.cleanup()
+
+    @staticmethod
+    def pillow() -> bool:
+        try:
+            import PIL
+            return True
+        except ImportError:
+            return False
+
+    def test_prebaked(self):
+        glyphs = ROMFiller.get_glyphs(size=26)
+        self.assertEqual(len(glyphs["data"]), len(ROMFiller.ALPHABET) * glyphs["bitmap_size"])
+        self.assertEqual(os.listdir(self.cache.name), [])
+        if self.pillow():
+            self.assertEqual(glyphs, ROMFiller.rasterize(ROMFiller.resource_path() / ROMFiller.FONT, 26))
+
+    def test_user_cache(self):
+        if not self.pillow():
+            self.skipTest("Pillow is not installed")
+
+        glyphs = ROMFiller.get_glyphs(size=20)
+        path = ROMFiller.cache_path() / "FreeMono-20.glyphs"
+        self.assertTrue(path.exists())
+
+        with open(ROMFiller.resource_path() / ROMFiller.FONT, "rb") as f:
+            digest = hashlib.sha256(f.read()).digest()
+        self.assertEqual(ROMFiller.load(path, digest, 20), glyphs)
+        self.assertIsNone(ROMFiller.load(path, digest, 26))
+        self.assertIsNone(ROMFiller.load(path, bytes(32), 20))
+
+    def test_corrupt_cache(self):
+        bitmap_size = 4 * 6 // 8
+        glyphs = dict(data=bytes(range(len(ROMFiller.ALPHABET) * bitmap_size)), width=4, min_height=5,
+                      max_height=6, bitmap_size=bitmap_size)
+        path = ROMFiller.cache_path() / "glyphs"
+        ROMFiller.save(glyphs, path, bytes(32), 16)
+        self.assertEqual(os.listdir(path.parent), ["glyphs"])
+        self.assertEqual(ROMFiller.load(path, bytes(32), 16), glyphs)
+
+        with open(path, "rb") as f:
+            content = f.read()
+        for blob in (content[:ROMFiller.HEADER.size - 1], content[:-1], content + b"\x00"):
+            with open(path, "wb") as f:
+                f.write(blob)
+            self.assertIsNone(ROMFiller.load(path, bytes(32), 16))
+
+        ROMFiller.save(dict(glyphs, data=glyphs["data"][:-bitmap_size]), path, bytes(32), 16)
+        self.assertIsNone(ROMFiller.load(path, bytes(32), 16))
+        ROMFiller.save(dict(glyphs, bitmap_size=1, data=glyphs["data"][:len(ROMFiller.ALPHABET)]),
+                       path, bytes(32), 16)
+        self.assertIsNone(ROMFiller.load(path, bytes(32), 16))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from src.backend.engine.emulator import Emulator
+from src.backend.utils.romimage import ROMImage
+
+
+class ROMImageTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        self.environ = os.environ.get("XDG_CACHE_HOME")
+        os.environ["XDG_CACHE_HOME"] = self.cache.name
+        ROMImage._loaded.clear()
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ["XDG_CACHE_HOME"]
+        else:
+            os.environ["XDG_CACHE_HOME"] = self.environ
+        ROMImage._loaded.clear()
+        self.cache.cleanup()
+
+    @staticmethod
+    def rom(emu: Emulator) -> tuple:
+        return bytes(emu._memory.data), [(address, instruction.state, instruction.num_next, str(instruction))
+                                         for address, instruction in sorted(emu._instructions.items())]
+
+    def test_cached(self):
+        linked = Emulator()
+        self.assertEqual(len(os.listdir(ROMImage.path(bytes(32)).parent)), 1)
+
+        ROMImage._loaded.clear()
+        loaded = Emulator()
+        self.assertEqual(self.rom(loaded), self.rom(linked))
+
+    def test_key(self):
+        image = dict(start=0o100, code=bytes(range(6)), listing=[])
+        digest = ROMImage.digest([], dict(start=0o100))
+        self.assertNotEqual(digest, ROMImage.digest([], dict(start=0o102)))
+
+        path = ROMImage.path(digest)
+        ROMImage.save(image, path, digest)
+        self.assertEqual(ROMImage.load(path, digest), image)
+        self.assertIsNone(ROMImage.load(path, bytes(32)))
+
+        with open(path, "ab") as f:
+            f.write(b"\x00")
+        self.assertIsNone(ROMImage.load(path, digest))
+
+
+if __name__ == '__main__':
+    unittest.main()
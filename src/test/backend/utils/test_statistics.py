@@ -0,0 +1,42 @@
+import threading
+import unittest
+
+from src.backend.utils.statistics import PipeStatistics
+
+
+class StatisticsTest(unittest.TestCase):
+    def setUp(self):
+        self.statistics = PipeStatistics()
+
+    def test_clear(self):
+        self.statistics.cycles += 10
+        self.statistics.instructions += 3
+        self.assertEqual(self.statistics.snapshot(), (10, 3))
+
+        self.statistics.clear()
+        self.assertEqual(self.statistics.snapshot(), (0, 0))
+        self.statistics.cycles += 2
+        self.assertEqual(self.statistics.snapshot(), (2, 0))
+
+    def test_consistent_snapshot(self):
+        # The writer keeps cycles == 2 * instructions between updates of both counters
+        stop = threading.Event()
+
+        def write():
+            while not stop.is_set():
+                self.statistics.cycles += 2
+                self.statistics.instructions += 1
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(2000):
+                cycles, instructions = self.statistics.snapshot()
+                self.assertIn(cycles - 2 * instructions, (0, 2))
+        finally:
+            stop.set()
+            writer.join()
+
+
+if __name__ == '__main__':
+    unittest.main()